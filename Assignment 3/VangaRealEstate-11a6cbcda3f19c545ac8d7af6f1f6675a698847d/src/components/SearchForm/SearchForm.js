@@ -39,8 +39,12 @@ function SearchForm() {
         setLoading(true); // Start loading when the form is submitted
         setShowError(false); // Hide error if the form is valid
         try {
-            // Make API call to the backend
-            const response = await axios.post('http://localhost:8000/predict', formData);
+            // Make API call to the backend. Median prices are served separately so the browser can cache them,
+            // and both requests are sent together since neither depends on the other
+            const [response, medianResponse] = await Promise.all([
+                axios.post('http://localhost:8000/predict', formData),
+                axios.get('http://localhost:8000/median-price'),
+            ]);
 
             // Navigate to the Prediction page with the response data
             navigate('/predict', { 
@@ -50,7 +54,7 @@ function SearchForm() {
                     distance: response.data.distance_between_cities,
                     houseLocation: response.data.house_location, 
                     cityCenterLocation: response.data.city_center_location,
-                    medianPrice: response.data.median_price,
+                    medianPrice: medianResponse.data,
                     recommendedProperties: response.data.recommended_properties,
                     shapValues: response.data.shap_values   
                 } 
@@ -48,15 +48,13 @@ function Prediction() {
     const uniqueYears = [...new Set(medianPrice.map(data => data[0]))]; 
 
     useEffect(() => {
-        if (recommendedProperties && typeof recommendedProperties === 'object') {
-            const { Longitude, Latitude, Price, Address } = recommendedProperties;
-            const keys = Object.keys(Longitude);
-
-            const convertedArray = keys.map(key => ({
-                latitude: Latitude[key],
-                longitude: Longitude[key],
-                price: Price[key],
-                address: Address[key] || 'Unknown',
+        // The API returns the recommendations as a list, closest match first
+        if (Array.isArray(recommendedProperties)) {
+            const convertedArray = recommendedProperties.map(property => ({
+                latitude: property.latitude,
+                longitude: property.longitude,
+                price: property.price,
+                address: property.address || 'Unknown',
             }));
             setFormattedRecommendedProperties(convertedArray);
         }
@@ -0,0 +1,98 @@
+import os
+import logging
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+from geographyProcess import Geography
+from datasetSnapshot import DatasetSnapshot
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_INDEX_PATH = "model/address_index.pkl"
+ADDRESS_INDEX_PRECISION = 5  # Same rounding as the reverse geocoding cache, roughly 1 m
+
+
+# In-memory index from rounded (lat, lon) pairs to reverse-geocoded addresses for every property in the dataset.
+# It is built once offline so that recommendations never reverse-geocode rows while serving a request.
+class AddressIndex:
+    def __init__(self, addresses=None):
+        # Wraps a dict of {(lat, lon): address}
+        self.addresses = addresses if addresses is not None else {}
+
+    @staticmethod
+    def key(lat, lon):
+        # Rounds coordinates into the key used by the index
+        return (round(float(lat), ADDRESS_INDEX_PRECISION), round(float(lon), ADDRESS_INDEX_PRECISION))
+
+    @classmethod
+    def load(cls, path=ADDRESS_INDEX_PATH):
+        # Loads a saved index, or returns an empty one if it has not been built yet
+        if not os.path.exists(path):
+            return cls()
+        return cls(joblib.load(path))
+
+    def save(self, path=ADDRESS_INDEX_PATH):
+        # Writes the index to a temporary file first and swaps it in, so an interrupted save never corrupts it
+        tmpPath = path + ".tmp"
+        joblib.dump(self.addresses, tmpPath, compress=3)
+        os.replace(tmpPath, path)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def lookup(self, lat, lon):
+        # Returns the address stored for a coordinate pair, or None if the index does not cover it
+        return self.addresses.get(self.key(lat, lon))
+
+    def lookup_many(self, lats, lons):
+        # Returns the addresses for arrays of coordinates, with None for pairs missing from the index
+        lats = np.asarray(lats, dtype=float).tolist()
+        lons = np.asarray(lons, dtype=float).tolist()
+        return [self.addresses.get(self.key(lat, lon)) for lat, lon in zip(lats, lons)]
+
+    def build(self, data_path="dataset/origin_combined_data.csv", path=ADDRESS_INDEX_PATH, delay=1.0, checkpoint_every=50, geography=None):
+        # Reverse-geocodes every distinct property location in the dataset that is not already in the index.
+        # Requests are spaced by `delay` seconds to respect Nominatim's 1 request/second policy, and the index is
+        # saved every `checkpoint_every` lookups, so an interrupted build resumes where it stopped.
+        # Failed requests are left out of the index and retried on the next run.
+        geography = geography if geography is not None else Geography()
+
+        data = DatasetSnapshot.load(data_path).frame(['Lattitude', 'Longtitude'])
+        pending = [
+            (lat, lon) for lat, lon in data.drop_duplicates().itertuples(index=False)
+            if self.key(lat, lon) not in self.addresses
+        ]
+        logger.info("Address index has %d entries, %d locations left to geocode.", len(self.addresses), len(pending))
+
+        lastRequest = 0.0
+        done = 0
+        try:
+            for lat, lon in pending:
+                wait = delay - (time.monotonic() - lastRequest)
+                if wait > 0:
+                    time.sleep(wait)
+                lastRequest = time.monotonic()
+
+                address = geography.address(lat, lon)
+                if not address.startswith("Error:"):
+                    self.addresses[self.key(lat, lon)] = address
+
+                done += 1
+                if done % checkpoint_every == 0:
+                    self.save(path)
+                    logger.info("Geocoded %d/%d locations.", done, len(pending))
+        finally:
+            self.save(path)
+
+        logger.info("Address index saved with %d entries.", len(self.addresses))
+        return self
+
+
+if __name__ == "__main__":
+    # Builds (or resumes building) the address index next to the other model artifacts.
+    from structuredLogging import configure_logging
+
+    configure_logging("text")
+    AddressIndex.load().build()
@@ -0,0 +1,232 @@
+import os
+import json
+import logging
+import time
+import shutil
+import asyncio
+import hashlib
+import threading
+import joblib
+
+from dataclasses import dataclass
+from clusterIndex import ClusterIndex
+from explainer import Explainer
+from inference import BoosterPredictor
+from featurePipeline import FeaturePipeline
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Files that make up one consistent set of trained artifacts, keyed by the ArtifactSet field they load into
+ARTIFACT_FILES = {
+    "model": "xgb_model.pkl",
+    "suburb_encoder": "suburb_encoder.pkl",
+    "city_encoder": "city_encoder.pkl",
+    "council_area_encoder": "council_area_encoder.pkl",
+    "type_encoder": "type_encoder.pkl",
+    "scaler_X": "scaler_X.pkl",
+    "scaler_y": "scaler_y.pkl",
+    "dbscan": "dbscan_model.pkl",
+    "dbscan_scaler": "dbscan_scaler.pkl",
+}
+
+# Artifacts that older training runs did not produce; they are derived from the required ones when missing
+OPTIONAL_ARTIFACT_FILES = {
+    "cluster_index": "dbscan_index.pkl",
+}
+
+
+# Published artifact versions live in <directory>/versions/<version>/, and the CURRENT file names the active one.
+# Without a CURRENT file the artifacts are read from <directory> itself, as produced by older training runs.
+ARTIFACT_VERSIONS_DIRECTORY = "versions"
+ARTIFACT_CURRENT_FILE = "CURRENT"
+ARTIFACT_MANIFEST_FILE = "manifest.json"
+
+# Manifest entries carried over from the parent version when a new version does not set them
+ARTIFACT_INHERITED_MANIFEST_KEYS = ("rows",)
+
+
+# Immutable snapshot of every artifact needed to serve a request.
+# A request reads one ArtifactSet and uses it throughout, so a reload can never mix old and new artifacts.
+@dataclass(frozen=True)
+class ArtifactSet:
+    version: str
+    loaded_at: float
+    model: object
+    suburb_encoder: object
+    city_encoder: object
+    council_area_encoder: object
+    type_encoder: object
+    scaler_X: object
+    scaler_y: object
+    dbscan: object
+    dbscan_scaler: object
+    cluster_index: object
+    explainer: object
+    predictor: object
+    features: object
+
+
+# Loads the model artifacts once and hands the current ArtifactSet to the request path.
+# Reloading deserializes a complete new set first and then swaps a single reference, so requests keep being
+# served from the old set until the new one is ready.
+class ArtifactRegistry:
+    def __init__(self, directory="model"):
+        self.directory = directory
+        self._current = None
+        self._reloadLock = threading.Lock()
+
+    @property
+    def current(self):
+        # Returns the active ArtifactSet, loading it on first use if the startup hook has not run
+        artifactSet = self._current
+        if artifactSet is None:
+            artifactSet = self.load()
+        return artifactSet
+
+    @property
+    def loaded(self):
+        return self._current is not None
+
+    def active_directory(self):
+        # Returns the directory of the active artifact version
+        currentPath = os.path.join(self.directory, ARTIFACT_CURRENT_FILE)
+        if not os.path.exists(currentPath):
+            return self.directory
+        with open(currentPath) as currentFile:
+            return os.path.join(self.directory, ARTIFACT_VERSIONS_DIRECTORY, currentFile.read().strip())
+
+    def signature(self):
+        # Fingerprints the active artifact files by directory, name, size and modification time;
+        # changes whenever any file is replaced or another version is activated
+        directory = self.active_directory()
+        digest = hashlib.sha1(directory.encode())
+        optional = [name for name in OPTIONAL_ARTIFACT_FILES.values() if os.path.exists(os.path.join(directory, name))]
+        for name in sorted(list(ARTIFACT_FILES.values()) + optional):
+            stat = os.stat(os.path.join(directory, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()[:12]
+
+    def manifest(self):
+        # Returns the manifest of the active version, or an empty dict for unversioned artifacts
+        path = os.path.join(self.active_directory(), ARTIFACT_MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as manifestFile:
+            return json.load(manifestFile)
+
+    def versions(self):
+        # Lists the published versions, oldest first
+        path = os.path.join(self.directory, ARTIFACT_VERSIONS_DIRECTORY)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if os.path.exists(os.path.join(path, name, ARTIFACT_MANIFEST_FILE)))
+
+    def publish(self, artifacts, manifest=None, activate=True):
+        # Writes a new artifact version next to the existing ones and returns its name.
+        # The given artifacts ({field: object}) are dumped, and every other file is hard-linked from the active version,
+        # so the previous versions stay untouched and can be activated again. The version becomes active by rewriting
+        # CURRENT, which running servers pick up through reload_if_changed.
+        files = {**ARTIFACT_FILES, **OPTIONAL_ARTIFACT_FILES}
+        unknown = set(artifacts) - set(files)
+        if unknown:
+            raise ValueError(f"Unknown artifacts: {', '.join(sorted(unknown))}")
+
+        source = self.active_directory()
+        parent = self.manifest()
+        versionsDirectory = os.path.join(self.directory, ARTIFACT_VERSIONS_DIRECTORY)
+        version = time.strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while os.path.exists(os.path.join(versionsDirectory, version)):
+            suffix += 1
+            version = time.strftime("%Y%m%d-%H%M%S") + f"-{suffix}"
+
+        target = os.path.join(versionsDirectory, version)
+        tmpTarget = target + ".tmp"
+        os.makedirs(tmpTarget)
+        for field, name in files.items():
+            path = os.path.join(tmpTarget, name)
+            if field in artifacts:
+                joblib.dump(artifacts[field], path)
+            elif os.path.exists(os.path.join(source, name)):
+                try:
+                    os.link(os.path.join(source, name), path)
+                except OSError:
+                    shutil.copy2(os.path.join(source, name), path)
+
+        versionManifest = {key: parent[key] for key in ARTIFACT_INHERITED_MANIFEST_KEYS if key in parent}
+        versionManifest.update(manifest or {})
+        versionManifest.update({
+            "version": version,
+            "parent": parent.get("version"),
+            "created_at": time.time(),
+            "updated": sorted(artifacts),
+        })
+        with open(os.path.join(tmpTarget, ARTIFACT_MANIFEST_FILE), "w") as manifestFile:
+            json.dump(versionManifest, manifestFile, indent=2)
+        os.replace(tmpTarget, target)
+
+        if activate:
+            self.activate(version)
+        logger.info("Published model artifacts version %s.", version)
+        return version
+
+    def activate(self, version):
+        # Makes a published version the active one, e.g. to roll back to an earlier version
+        if not os.path.isdir(os.path.join(self.directory, ARTIFACT_VERSIONS_DIRECTORY, version)):
+            raise ValueError(f"Unknown artifact version: {version}")
+        currentPath = os.path.join(self.directory, ARTIFACT_CURRENT_FILE)
+        with open(currentPath + ".tmp", "w") as currentFile:
+            currentFile.write(version)
+        os.replace(currentPath + ".tmp", currentPath)
+
+    def load(self):
+        # Deserializes every artifact into a new ArtifactSet and makes it the active one
+        with self._reloadLock, stage("artifacts_load"):
+            directory = self.active_directory()
+            version = self.signature()
+            artifacts = {
+                field: joblib.load(os.path.join(directory, name))
+                for field, name in ARTIFACT_FILES.items()
+            }
+            for field, name in OPTIONAL_ARTIFACT_FILES.items():
+                path = os.path.join(directory, name)
+                artifacts[field] = joblib.load(path) if os.path.exists(path) else None
+
+            if artifacts["cluster_index"] is None:
+                artifacts["cluster_index"] = ClusterIndex.from_dbscan(artifacts["dbscan"])
+
+            # The explainer is tied to this exact model, so it is rebuilt with every artifact set
+            artifacts["explainer"] = Explainer(artifacts["model"])
+            artifacts["predictor"] = BoosterPredictor(artifacts["model"])
+            artifacts["features"] = FeaturePipeline.from_artifacts(artifacts)
+
+            artifactSet = ArtifactSet(version=version, loaded_at=time.time(), **artifacts)
+            self._current = artifactSet
+        logger.info("Loaded model artifacts version %s from %s.", version, directory, extra={"artifact_version": version})
+        return artifactSet
+
+    def reload(self):
+        # Loads a fresh artifact set and swaps it in; in-flight requests finish on the set they started with
+        return self.load()
+
+    def reload_if_changed(self):
+        # Reloads only when the files on disk differ from the active set. Returns True if a reload happened.
+        try:
+            version = self.signature()
+        except FileNotFoundError:
+            # A retrain is probably halfway through writing the files; try again on the next check
+            return False
+        if self._current is not None and self._current.version == version:
+            return False
+        self.load()
+        return True
+
+    async def watch(self, interval=30.0):
+        # Polls the artifact files and hot-reloads them when they change. Meant to run as a background task.
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logger.exception("Error reloading model artifacts: %s", e)
@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import platform
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import xgboost
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from model import MLmodel
+from artifacts import ArtifactRegistry
+from addressIndex import AddressIndex
+from gazetteer import Gazetteer
+from geographyProcess import Geography, GeocodeCache
+from structuredLogging import configure_logging
+
+# Times each stage of the backend separately on synthetic datasets of increasing size, fully offline:
+# geocoding goes through a deterministic fake Geography, and every dataset and artifact lives in a temporary directory.
+# Results are written as JSON and can be compared against a saved baseline to flag regressions.
+# Run from the backend directory:
+#   python -m benchmarks.bench_components --sizes 1000 5000 20000
+#   python -m benchmarks.bench_components --update-baseline
+#   python -m benchmarks.bench_components --compare
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIRECTORY = os.path.join(BACKEND_DIRECTORY, "benchmarks", "results")
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIRECTORY, "latest.json")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIRECTORY, "baseline.json")
+
+DEFAULT_SIZES = [1000, 5000, 20000]
+DEFAULT_REPEAT = 200
+
+# A benchmark regresses when its median is this much slower than the baseline and by more than the noise floor
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_FLOOR_US = 5.0
+
+CITIES = {
+    "melbourne": {"center": (-37.8136, 144.9631), "state": "Victoria", "postcodes": (3000, 3999)},
+    "sydney": {"center": (-33.8688, 151.2093), "state": "New South Wales", "postcodes": (2000, 2999)},
+}
+
+
+def synthetic_dataset(rows, seed=42, suburbs_per_city=150, councils_per_city=20):
+    # Generates rows with the columns of origin_combined_data.csv. Properties are spread around suburb centres
+    # around each CBD, and every suburb has one postcode and council area, as in the real data.
+    rng = np.random.default_rng(seed)
+    suburbs = []
+    for city, spec in CITIES.items():
+        for i in range(suburbs_per_city):
+            suburbs.append({
+                "Suburb": f"{city}suburb{i}",
+                "City": city,
+                "Postcode": int(spec["postcodes"][0] + i),
+                "CouncilArea": f"{city}council{i % councils_per_city}",
+                "Lattitude": spec["center"][0] + rng.normal(0, 0.15),
+                "Longtitude": spec["center"][1] + rng.normal(0, 0.15),
+            })
+    suburbs = pd.DataFrame(suburbs)
+
+    picked = suburbs.iloc[rng.integers(len(suburbs), size=rows)].reset_index(drop=True)
+    picked["Lattitude"] += rng.normal(0, 0.01, rows)
+    picked["Longtitude"] += rng.normal(0, 0.01, rows)
+    centers = np.array([CITIES[city]["center"] for city in picked["City"]])
+    distance = np.hypot(picked["Lattitude"] - centers[:, 0], picked["Longtitude"] - centers[:, 1]) * 100
+
+    bedrooms = rng.integers(1, 6, rows)
+    data = pd.DataFrame({
+        "Suburb": picked["Suburb"],
+        "Type": rng.choice(["h", "t", "u"], rows),
+        "Price": (3e5 + 2e5 * bedrooms + 2e6 / (1 + distance) + rng.normal(0, 1e5, rows)).clip(1e5).round(-3),
+        "Distance": distance,
+        "Postcode": picked["Postcode"],
+        "Bedroom": bedrooms,
+        "Bathroom": rng.integers(1, 4, rows),
+        "Car": rng.integers(0, 3, rows),
+        "Landsize": rng.uniform(0, 1000, rows),
+        "BuildingArea": rng.uniform(40, 400, rows),
+        "CouncilArea": picked["CouncilArea"],
+        "Lattitude": picked["Lattitude"],
+        "Longtitude": picked["Longtitude"],
+        "City": picked["City"],
+        "CashRate": rng.choice([0.1, 0.25, 1.5], rows),
+        "Residential Property Price Index": rng.uniform(100, 220, rows),
+        "Attached Dwellings Price Index": rng.uniform(100, 180, rows),
+        "DaySold": rng.integers(1, 29, rows),
+        "MonthSold": rng.integers(1, 13, rows),
+        "YearSold": rng.integers(2016, 2022, rows),
+    })
+    return data
+
+
+# Geography that answers from a synthetic dataset instead of Nominatim. The same address always maps to the same
+# property, and search results have the display name layout Nominatim uses, so parsing is exercised as in production.
+class FakeGeography(Geography):
+    def __init__(self, data, gazetteer):
+        super().__init__(cache=GeocodeCache(path=None), gazetteer=gazetteer)
+        self.data = data.reset_index(drop=True)
+
+    def place(self, address):
+        # Returns the Nominatim search result of an address
+        row = self.data.iloc[zlib.crc32(address.encode()) % len(self.data)]
+        state = CITIES[row["City"]]["state"]
+        return {
+            "lat": str(row["Lattitude"]),
+            "lon": str(row["Longtitude"]),
+            "display_name": f"{address.split(',')[0]}, {row['Suburb']}, {row['City'].title()}, "
+                            f"City of {row['CouncilArea'].title()}, {state}, {row['Postcode']}, Australia",
+        }
+
+    def search(self, address):
+        return [self.place(address)]
+
+    async def search_async(self, address):
+        return self.search(address)
+
+    def address(self, lat, lon):
+        return f"{float(lat):.5f}, {float(lon):.5f}"
+
+    async def address_async(self, lat, lon):
+        return self.address(lat, lon)
+
+
+def summarize(latencies):
+    # Returns the statistics stored for one benchmark, in microseconds
+    latencies = np.asarray(latencies)
+    return {
+        "calls": int(len(latencies)),
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p95_us": float(np.percentile(latencies, 95)),
+        "mean_us": float(np.mean(latencies)),
+    }
+
+
+def time_calls(function, arguments, warmup=10):
+    # Calls function once per entry of arguments (each a tuple) and returns the latency of every call in microseconds
+    for entry in arguments[:warmup]:
+        function(*entry)
+    latencies = np.empty(len(arguments))
+    for i, entry in enumerate(arguments):
+        start = time.perf_counter()
+        function(*entry)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def time_once(function):
+    # Times a single call, for stages such as training that are too slow to repeat
+    start = time.perf_counter()
+    function()
+    return [(time.perf_counter() - start) * 1e6]
+
+
+@contextmanager
+def working_directory(path):
+    # The backend opens its datasets and artifacts relative to the working directory
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def sample_requests(count, seed=42):
+    # Builds prediction inputs: an address plus the property features of the API request
+    rng = np.random.default_rng(seed)
+    return [(
+        f"{rng.integers(1, 400)} Example Street",
+        ["house", "unit", "townhouse"][rng.integers(3)],
+        int(rng.integers(1, 4)),
+        int(rng.integers(1, 6)),
+        int(rng.integers(0, 3)),
+        float(rng.uniform(40, 400)),
+        float(rng.uniform(0, 1000)),
+    ) for _ in range(count)]
+
+
+def benchmark_size(rows, repeat, estimators):
+    # Trains on a synthetic dataset of `rows` properties and times every stage; returns {benchmark: stats}
+    results = {}
+    directory = tempfile.mkdtemp(prefix="bench_components_")
+    try:
+        with working_directory(directory):
+            os.makedirs("dataset")
+            os.makedirs("model")
+            data = synthetic_dataset(rows)
+            data.to_csv("dataset/origin_combined_data.csv")
+            shutil.copy(os.path.join(BACKEND_DIRECTORY, "dataset", "median_price.csv"), "dataset/median_price.csv")
+
+            model = MLmodel()
+            if estimators is not None:
+                model.model.set_params(n_estimators=estimators)
+            results["train_dbscan"] = summarize(time_once(model.train_DBScan))
+            results["train"] = summarize(time_once(model.train))
+
+            gazetteer = Gazetteer.from_sources(sydney_path=None)
+            geography = FakeGeography(data, gazetteer)
+            model.addressIndex = AddressIndex().build(delay=0, geography=geography)
+
+            results["artifacts_load"] = summarize(time_calls(lambda: ArtifactRegistry().load(), [()] * max(repeat // 20, 5), warmup=1))
+            artifacts = model.load_artifacts()
+
+            requests = sample_requests(repeat)
+            places = [(request[0], geography.place(request[0])) for request in requests]
+            fallback = FakeGeography(data, Gazetteer.empty())
+            results["geography_parse"] = summarize(time_calls(geography.parse_result, places))
+            results["geography_parse_fallback"] = summarize(time_calls(fallback.parse_result, places))
+
+            locations = [geography.parse_result(*place) for place in places]
+            suburbs = [location.suburb for location in locations]
+            results["encoder_transform"] = summarize(time_calls(artifacts.suburb_encoder.transform, [([suburb],) for suburb in suburbs]))
+            results["encoder_transform_batch"] = summarize(time_calls(artifacts.suburb_encoder.transform, [(suburbs,)] * 20, warmup=2))
+
+            features = [(
+                location.coordinates, location.distance, location.suburb, location.city, location.council_area, location.postcode,
+                {"house": "h", "unit": "u", "townhouse": "t"}[request[1]], *request[2:],
+            ) for location, request in zip(locations, requests)]
+            results["preprocess"] = summarize(time_calls(lambda *arguments: model.preprocess(*arguments, artifacts=artifacts), features))
+
+            scaled = [(model.preprocess(*arguments, artifacts=artifacts),) for arguments in features]
+            results["xgboost_predict"] = summarize(time_calls(artifacts.model.predict, scaled))
+            results["xgboost_predict_inplace"] = summarize(time_calls(lambda row: artifacts.predictor.predict_one(row[0]), scaled))
+            results["feature_importance"] = summarize(time_calls(lambda row: model.feature_importance(artifacts.model, row, artifacts=artifacts), scaled))
+
+            prices = data["Price"].sample(len(requests), replace=True, random_state=42).tolist()
+            predictions = [(request[0], price, location) for request, price, location in zip(requests, prices, locations)]
+            results["recommend_nearby_houses"] = summarize(time_calls(
+                lambda address, price, location: model.recommend_nearby_houses(address, price, location=location, geography=geography), predictions
+            ))
+            results["predict"] = summarize(time_calls(
+                lambda address, *arguments: model.predict(address, *arguments, location=geography.resolve(address)), requests
+            ))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def run(sizes, repeat, estimators):
+    # Runs every size and returns the JSON document of the run
+    results = {}
+    for rows in sizes:
+        print(f"Benchmarking {rows} rows...", file=sys.stderr)
+        for name, stats in benchmark_size(rows, repeat, estimators).items():
+            results[f"{rows}/{name}"] = stats
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "xgboost": xgboost.__version__,
+        },
+        "parameters": {"sizes": sizes, "repeat": repeat, "estimators": estimators},
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD, floor_us=REGRESSION_FLOOR_US):
+    # Compares the medians of two runs; returns (table lines, names of the regressed benchmarks)
+    lines = [f"{'benchmark':<36}{'baseline p50 (us)':>20}{'current p50 (us)':>20}{'change':>10}"]
+    regressions = []
+    for name, stats in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            lines.append(f"{name:<36}{'-':>20}{stats['p50_us']:>20.1f}{'new':>10}")
+            continue
+        change = stats["p50_us"] / reference["p50_us"] - 1 if reference["p50_us"] > 0 else 0.0
+        regressed = change > threshold and stats["p50_us"] - reference["p50_us"] > floor_us
+        if regressed:
+            regressions.append(name)
+        lines.append(
+            f"{name:<36}{reference['p50_us']:>20.1f}{stats['p50_us']:>20.1f}{change:>+10.1%}" + ("  REGRESSION" if regressed else "")
+        )
+    if current.get("parameters") != baseline.get("parameters") or current.get("environment") != baseline.get("environment"):
+        lines.append("Warning: the baseline was recorded with different parameters or on a different environment.")
+    return lines, regressions
+
+
+def format_results(document):
+    # Formats the results of a run as a table
+    lines = [f"{'benchmark':<36}{'calls':>8}{'p50 (us)':>14}{'p95 (us)':>14}{'mean (us)':>14}"]
+    for name, stats in document["results"].items():
+        lines.append(f"{name:<36}{stats['calls']:>8}{stats['p50_us']:>14.1f}{stats['p95_us']:>14.1f}{stats['mean_us']:>14.1f}")
+    return "\n".join(lines)
+
+
+def write_json(document, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline component benchmarks on synthetic datasets")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="synthetic dataset sizes in rows")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed calls per stage")
+    parser.add_argument("--estimators", type=int, default=None, help="trees to train instead of the production setting")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--input", help="compare an existing results file instead of running the benchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline and exit with 1 on regressions")
+    parser.add_argument("--update-baseline", action="store_true", help="also save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="allowed slowdown of the median, e.g. 0.25")
+    args = parser.parse_args()
+
+    configure_logging("text", level="WARNING")
+
+    if args.input:
+        with open(args.input) as file:
+            document = json.load(file)
+    else:
+        document = run(args.sizes, args.repeat, args.estimators)
+        write_json(document, args.output)
+        print(format_results(document))
+        print(f"Results written to {args.output}")
+        if args.update_baseline:
+            write_json(document, args.baseline)
+            print(f"Baseline updated: {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        lines, regressions = compare(document, baseline, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
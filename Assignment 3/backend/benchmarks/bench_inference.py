@@ -0,0 +1,53 @@
+import time
+import argparse
+import numpy as np
+
+from artifacts import ArtifactRegistry
+from inference import BoosterPredictor
+
+# Compares single-row prediction latency of the sklearn XGBRegressor.predict path used before
+# against the in-place Booster predictor and the flattened trees.
+# Run from the backend directory: python -m benchmarks.bench_inference
+
+
+def time_calls(function, rows, warmup=50):
+    # Calls function on each row and returns the latency of every call in microseconds
+    for row in rows[:warmup]:
+        function(row)
+    latencies = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        function(row)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-row XGBoost inference latency benchmark")
+    parser.add_argument("--rows", type=int, default=2000, help="number of timed predictions per path")
+    parser.add_argument("--threads", type=int, default=1, help="XGBoost threads for the Booster predictor")
+    args = parser.parse_args()
+
+    artifacts = ArtifactRegistry().load()
+    model = artifacts.model
+    rows = np.random.default_rng(42).random((args.rows, model.n_features_in_))
+
+    booster = BoosterPredictor(model, nthread=args.threads, flatten=False)
+    flat = BoosterPredictor(model, nthread=args.threads, flatten=True)
+
+    paths = {
+        "sklearn predict": lambda row: model.predict(row.reshape(1, -1))[0],
+        "booster inplace": booster.predict_one,
+        "flattened trees": flat.predict_one,
+    }
+
+    reference = model.predict(rows)
+    print(f"{'path':<18}{'p50 (us)':>12}{'p99 (us)':>12}{'max abs diff':>16}")
+    for name, function in paths.items():
+        latencies = time_calls(function, rows)
+        difference = np.max(np.abs(np.array([function(row) for row in rows[:200]]) - reference[:200]))
+        print(f"{name:<18}{np.percentile(latencies, 50):>12.1f}{np.percentile(latencies, 99):>12.1f}{difference:>16.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from benchmarks.load_test import free_port, start_fake_nominatim, start_api, stop, run_step, RequestFactory
+from processMemory import memory_usage, child_pids, command_line, format_memory_table
+
+# Compares the memory of `uvicorn --workers N` with the pre-fork server of serve.py at the same worker count.
+# Each server is warmed up with /predict requests against the local Nominatim stand-in, then the RSS, PSS and
+# unique (USS) memory of every worker is read from /proc. Linux only.
+# Run from the backend directory after training: python -m benchmarks.bench_memory --workers 4
+
+SERVERS = ["uvicorn", "prefork"]
+
+
+def worker_pids(pid):
+    # Returns the worker processes of a server: its children, or the server itself when it has none
+    # (uvicorn with one worker). multiprocessing's resource tracker is not a worker.
+    children = [child for child in child_pids(pid) if "resource_tracker" not in command_line(child)]
+    return children or [pid]
+
+
+def measure(server, workers, nominatim_url, args):
+    # Starts a server, warms it up and returns {process label: memory usage}
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="bench_memory_") as directory:
+        process = start_api(workers, port, nominatim_url, args, os.path.join(directory, "geocode_cache.sqlite"), server)
+        try:
+            time.sleep(args.settle)
+            asyncio.run(run_step(f"http://127.0.0.1:{port}", workers * 2, args.warmup, RequestFactory(), False, 60.0))
+            time.sleep(1.0)
+            pids = worker_pids(process.pid)
+            usages = {}
+            if pids != [process.pid]:
+                usages["parent"] = memory_usage(process.pid)
+            usages.update({f"worker {pid}": memory_usage(pid) for pid in pids})
+            return usages
+        finally:
+            stop(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory of uvicorn workers and pre-forked workers")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=SERVERS)
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of /predict traffic before measuring")
+    parser.add_argument("--settle", type=float, default=3.0, help="seconds to let every worker finish starting")
+    parser.add_argument("--nominatim-rate", type=float, default=1000.0)
+    args = parser.parse_args()
+    args.latency, args.jitter, args.error_rate, args.empty_rate = 0.01, 0.0, 0.0, 0.0
+
+    nominatimPort = free_port()
+    nominatim = start_fake_nominatim(args, nominatimPort)
+    try:
+        for server in args.servers:
+            usages = measure(server, args.workers, f"http://127.0.0.1:{nominatimPort}", args)
+            workers = [usage for label, usage in usages.items() if label.startswith("worker") and usage is not None]
+            print(f"\n{server}, {args.workers} worker(s)")
+            print(format_memory_table(usages))
+            if workers:
+                print(f"Mean unique memory per worker: {sum(usage['uss'] for usage in workers) / len(workers) / (1024 * 1024):.1f} MB")
+    finally:
+        stop(nominatim)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import time
+import argparse
+import numpy as np
+
+from datetime import datetime
+from model import MLmodel
+from featurePipeline import MELBOURNE_TZ
+
+# Compares MLmodel.preprocess (DataFrame + scaler_X.transform) with the precompiled FeaturePipeline,
+# checking that both produce identical rows.
+# Run from the backend directory: python -m benchmarks.bench_preprocess
+
+
+def sample_inputs(artifacts, count, seed=42):
+    # Builds preprocess arguments from known and unknown suburbs, cities and council areas
+    rng = np.random.default_rng(seed)
+    suburbs = [" " + name.title() for name in artifacts.suburb_encoder.classes_[:50]] + [" Nowhere"]
+    councils = [" City of " + name.title() + " Council" for name in artifacts.council_area_encoder.classes_[:20]] + [" Unknown Shire"]
+    cities = ["Melbourne", "Sydney"]
+
+    inputs = []
+    for _ in range(count):
+        inputs.append((
+            [rng.uniform(-38.5, -33.0), rng.uniform(144.0, 151.5)],
+            rng.uniform(0, 50),
+            suburbs[rng.integers(len(suburbs))],
+            cities[rng.integers(len(cities))],
+            councils[rng.integers(len(councils))],
+            str(rng.integers(2000, 4000)),
+            ["h", "u", "t"][rng.integers(3)],
+            int(rng.integers(1, 4)),
+            int(rng.integers(1, 6)),
+            int(rng.integers(0, 3)),
+            float(rng.uniform(40, 400)),
+            float(rng.uniform(0, 1000)),
+        ))
+    return inputs
+
+
+def time_calls(function, inputs):
+    # Returns the latency of each call in microseconds
+    latencies = np.empty(len(inputs))
+    for i, arguments in enumerate(inputs):
+        start = time.perf_counter()
+        function(*arguments)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-row preprocessing benchmark")
+    parser.add_argument("--rows", type=int, default=2000, help="number of timed calls per path")
+    args = parser.parse_args()
+
+    model = MLmodel()
+    artifacts = model.load_artifacts()
+    inputs = sample_inputs(artifacts, args.rows)
+
+    date = datetime.now(MELBOURNE_TZ)
+    mismatches = sum(
+        not np.array_equal(model.preprocess(*arguments, artifacts=artifacts), artifacts.features.transform(*arguments, date=date))
+        for arguments in inputs[:500]
+    )
+    print(f"Rows compared: 500, mismatches: {mismatches}")
+
+    paths = {
+        "preprocess": lambda *arguments: model.preprocess(*arguments, artifacts=artifacts),
+        "feature pipeline": artifacts.features.transform,
+    }
+    print(f"{'path':<18}{'p50 (us)':>12}{'p99 (us)':>12}")
+    for name, function in paths.items():
+        latencies = time_calls(function, inputs)
+        print(f"{name:<18}{np.percentile(latencies, 50):>12.1f}{np.percentile(latencies, 99):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import zlib
+import random
+import asyncio
+import argparse
+import uvicorn
+
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Local stand-in for the Nominatim endpoints the backend uses (search.php/search and reverse), for load tests.
+# Every query maps deterministically to a point around the Melbourne or Sydney CBD, answers are delayed by a
+# configurable latency, and a configurable share of requests fails or finds nothing.
+# Run from the backend directory: python -m benchmarks.fake_nominatim --port 8089 --latency 0.2 --error-rate 0.01
+# and start the API with NOMINATIM_URL=http://127.0.0.1:8089 NOMINATIM_RATE=1000
+
+FAKE_NOMINATIM_PORT = 8089
+
+CITIES = [
+    {"name": "Melbourne", "state": "Victoria", "center": (-37.8136, 144.9631), "postcode": 3000},
+    {"name": "Sydney", "state": "New South Wales", "center": (-33.8688, 151.2093), "postcode": 2000},
+]
+
+
+def place(query):
+    # Returns the search result of a query; the same query always gives the same point, within ~15 km of a CBD
+    digest = zlib.crc32(" ".join(query.replace(",", " ").lower().split()).encode())
+    city = CITIES[digest % 2]
+    rng = random.Random(digest)
+    lat = city["center"][0] + rng.uniform(-0.12, 0.12)
+    lon = city["center"][1] + rng.uniform(-0.15, 0.15)
+    return {
+        "lat": f"{lat:.7f}",
+        "lon": f"{lon:.7f}",
+        "display_name": display_name(digest, city),
+    }
+
+
+def display_name(digest, city):
+    # Builds a display name with Nominatim's "number, suburb, city, council, state, postcode, country" layout
+    suburb = digest % 200
+    return (f"{digest % 400 + 1}, Suburb {suburb}, {city['name']}, City of Council {suburb % 30} Council, "
+            f"{city['state']}, {city['postcode'] + suburb}, Australia")
+
+
+def create_app(latency=0.1, jitter=0.0, error_rate=0.0, empty_rate=0.0, error_status=503, seed=None):
+    # Builds the fake server. latency and jitter are in seconds; error_rate and empty_rate are probabilities.
+    app = FastAPI()
+    rng = random.Random(seed)
+    counts = Counter()
+
+    async def respond(kind, answer):
+        # Waits for the simulated latency, then fails, answers empty or answers, counting the outcome
+        delay = max(0.0, rng.gauss(latency, jitter)) if jitter > 0 else latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+        draw = rng.random()
+        if draw < error_rate:
+            counts[(kind, "error")] += 1
+            return JSONResponse({"error": "Simulated failure"}, status_code=error_status)
+        if draw < error_rate + empty_rate:
+            counts[(kind, "empty")] += 1
+            return JSONResponse([] if kind == "search" else {"error": "Unable to geocode"})
+        counts[(kind, "ok")] += 1
+        return JSONResponse(answer())
+
+    @app.get("/search.php")
+    @app.get("/search")
+    async def search(q: str = ""):
+        return await respond("search", lambda: [place(q)])
+
+    @app.get("/reverse")
+    async def reverse(lat: float, lon: float):
+        digest = zlib.crc32(f"{lat:.5f},{lon:.5f}".encode())
+        city = min(CITIES, key=lambda c: abs(c["center"][0] - lat) + abs(c["center"][1] - lon))
+        return await respond("reverse", lambda: {"lat": str(lat), "lon": str(lon), "display_name": display_name(digest, city)})
+
+    @app.get("/stats")
+    async def stats():
+        # Requests served so far by kind and outcome, e.g. {"search:ok": 120}
+        return {f"{kind}:{outcome}": count for (kind, outcome), count in sorted(counts.items())}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Nominatim stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=FAKE_NOMINATIM_PORT)
+    parser.add_argument("--latency", type=float, default=0.1, help="mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="share of requests answered with no result")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.empty_rate, args.error_status, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import httpx
+
+from collections import Counter
+
+# Measures how many /predict requests per second the API sustains, per uvicorn worker count and client concurrency.
+# Geocoding goes to the local Nominatim stand-in (benchmarks/fake_nominatim.py), started here with the configured
+# latency and error rates; the API is started with NOMINATIM_URL pointing at it and a throwaway geocoding cache.
+# Each step keeps `concurrency` requests in flight for `duration` seconds and reports throughput, p50/p95/p99 latency
+# and errors. Run from the backend directory after training:
+#   python -m benchmarks.load_test --workers 1 2 4 --concurrency 1 8 32 64 --duration 15 --latency 0.2 --error-rate 0.01
+# To drive an API that is already running (and already configured), pass --url instead of --workers.
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CONCURRENCY = [1, 4, 16, 64]
+DEFAULT_DURATION = 10.0
+STARTUP_TIMEOUT = 180.0  # Seconds to wait for the API to load its artifacts
+
+PROPERTY_TYPES = ["house", "unit", "townhouse"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout=STARTUP_TIMEOUT):
+    # Polls a URL until it answers, failing early if the server process exits
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before becoming ready: {url}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.25)
+    raise TimeoutError(f"Server not ready after {timeout:.0f}s: {url}")
+
+
+def stop(process):
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def start_fake_nominatim(args, port):
+    command = [
+        sys.executable, "-m", "benchmarks.fake_nominatim", "--port", str(port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate), "--empty-rate", str(args.empty_rate),
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIRECTORY)
+    wait_until_ready(f"http://127.0.0.1:{port}/stats", process)
+    return process
+
+
+def start_api(workers, port, nominatim_url, args, cache_path, server="uvicorn"):
+    # Starts the API with the given worker count against the fake Nominatim server, either through
+    # `uvicorn --workers` or through the pre-fork server of serve.py
+    environment = dict(
+        os.environ,
+        NOMINATIM_URL=nominatim_url,
+        NOMINATIM_RATE=str(args.nominatim_rate),
+        GEOCODE_CACHE_PATH=cache_path,
+        LOG_LEVEL="WARNING",
+    )
+    if server == "prefork":
+        command = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIRECTORY, env=environment)
+    wait_until_ready(f"http://127.0.0.1:{port}/median-price", process)
+    return process
+
+
+# Produces /predict bodies; every address is new unless a pool size is given, so the geocoding and response caches
+# only help as much as they would with that many distinct addresses
+class RequestFactory:
+    def __init__(self, address_pool=0, seed=42):
+        self.addressPool = address_pool
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+
+    def next(self):
+        self.count += 1
+        number = self.rng.integers(self.addressPool) if self.addressPool else self.count
+        return {
+            "address": f"{number} Load Test Street",
+            "houseType": PROPERTY_TYPES[int(self.rng.integers(len(PROPERTY_TYPES)))],
+            "bathrooms": int(self.rng.integers(1, 4)),
+            "bedrooms": int(self.rng.integers(1, 6)),
+            "carpark": int(self.rng.integers(0, 3)),
+            "buildingArea": float(self.rng.uniform(40, 400)),
+            "landsize": float(self.rng.uniform(0, 1000)),
+        }
+
+
+async def run_step(url, concurrency, duration, factory, explain, timeout):
+    # Keeps `concurrency` requests in flight until the duration is over and returns the step report
+    latencies = []
+    outcomes = Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                body = factory.next()
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/predict", params={"explain": str(explain).lower()}, json=body)
+                    outcome = str(response.status_code)
+                except httpx.HTTPError as e:
+                    outcome = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                outcomes[outcome] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    succeeded = outcomes.get("200", 0)
+    latencies = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": int(sum(outcomes.values())),
+        "succeeded": succeeded,
+        "errors": {outcome: count for outcome, count in sorted(outcomes.items()) if outcome != "200"},
+        "throughput_rps": succeeded / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        "seconds": elapsed,
+    }
+
+
+def nominatim_stats(url):
+    # Returns the request counters of the fake Nominatim server, or {} if it is not ours
+    try:
+        return httpx.get(f"{url}/stats", timeout=5.0).json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+def run_steps(url, args, nominatim_url=None):
+    factory = RequestFactory(args.address_pool)
+    reports = []
+    for concurrency in args.concurrency:
+        before = nominatim_stats(nominatim_url) if nominatim_url else {}
+        report = asyncio.run(run_step(url, concurrency, args.duration, factory, args.explain, args.timeout))
+        if nominatim_url:
+            after = nominatim_stats(nominatim_url)
+            report["nominatim"] = {name: count - before.get(name, 0) for name, count in after.items() if count - before.get(name, 0)}
+        reports.append(report)
+        print(format_report(report), flush=True)
+    return reports
+
+
+def format_report(report):
+    errors = ", ".join(f"{outcome}: {count}" for outcome, count in report["errors"].items()) or "-"
+    latencies = "".join(f"{report[name]:>10.1f}" if report[name] is not None else f"{'-':>10}" for name in ("p50_ms", "p95_ms", "p99_ms"))
+    return f"{report['concurrency']:>12}{report['requests']:>10}{report['throughput_rps']:>12.1f}{latencies}   {errors}"
+
+
+def header():
+    return f"{'concurrency':>12}{'requests':>10}{'req/s':>12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}   errors"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of /predict with a local Nominatim stand-in")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="uvicorn worker counts to test")
+    parser.add_argument("--server", choices=["uvicorn", "prefork"], default="uvicorn", help="how the API workers are started")
+    parser.add_argument("--url", help="drive an API that is already running instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="requests in flight per step")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds per step")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request in seconds")
+    parser.add_argument("--address-pool", type=int, default=0, help="cycle through this many addresses (0: every address is new)")
+    parser.add_argument("--explain", action="store_true", help="request SHAP values with every prediction")
+    parser.add_argument("--latency", type=float, default=0.1, help="fake Nominatim mean latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="fake Nominatim latency standard deviation in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake Nominatim requests that fail")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="share of fake Nominatim searches with no result")
+    parser.add_argument("--nominatim-rate", type=float, default=1000.0, help="client-side rate limit passed to the API")
+    parser.add_argument("--output", help="write the reports as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        print(f"Target {args.url}")
+        print(header())
+        results.append({"workers": None, "steps": run_steps(args.url.rstrip("/"), args)})
+    else:
+        nominatimPort = free_port()
+        nominatimUrl = f"http://127.0.0.1:{nominatimPort}"
+        nominatim = start_fake_nominatim(args, nominatimPort)
+        try:
+            for workers in args.workers:
+                port = free_port()
+                with tempfile.TemporaryDirectory(prefix="load_test_") as directory:
+                    api = start_api(workers, port, nominatimUrl, args, os.path.join(directory, "geocode_cache.sqlite"), args.server)
+                    try:
+                        print(f"\n{workers} {args.server} worker(s), Nominatim latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.1%}")
+                        print(header())
+                        results.append({"workers": workers, "steps": run_steps(f"http://127.0.0.1:{port}", args, nominatimUrl)})
+                    finally:
+                        stop(api)
+        finally:
+            stop(nominatim)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"parameters": vars(args), "results": results}, file, indent=2)
+        print(f"Reports written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
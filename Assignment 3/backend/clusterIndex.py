@@ -0,0 +1,48 @@
+import numpy as np
+
+from sklearn.neighbors import KDTree
+
+
+# Precomputed DBSCAN cluster membership plus a KD-tree over the core samples.
+# New points are assigned to the cluster of their nearest core sample within eps (or to noise), the same rule
+# DBSCAN uses for border points, so serving never has to refit the clustering.
+class ClusterIndex:
+    def __init__(self, core_samples, core_labels, labels, eps):
+        # core_samples/core_labels describe the fitted core points, labels holds the cluster of every dataset row
+        self.eps = eps
+        self.coreTree = KDTree(core_samples)
+        self.coreLabels = np.asarray(core_labels)
+        self.labels = np.asarray(labels)
+
+        # Group row indices by cluster once so that membership is a dictionary lookup
+        order = np.argsort(self.labels, kind='stable')
+        clusters, starts = np.unique(self.labels[order], return_index=True)
+        self.members_by_label = dict(zip(clusters.tolist(), np.split(order, starts[1:])))
+
+    @classmethod
+    def from_dbscan(cls, dbscan):
+        # Builds the index from a fitted sklearn DBSCAN model
+        return cls(
+            core_samples=dbscan.components_,
+            core_labels=dbscan.labels_[dbscan.core_sample_indices_],
+            labels=dbscan.labels_,
+            eps=dbscan.eps
+        )
+
+    def predict(self, X):
+        # Returns the cluster label of each (scaled) point, or -1 if no core sample lies within eps
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if len(self.coreLabels) == 0:
+            return np.full(len(X), -1)
+        distances, indices = self.coreTree.query(X, k=1)
+        return np.where(distances[:, 0] <= self.eps, self.coreLabels[indices[:, 0]], -1)
+
+    def members(self, label):
+        # Returns the dataset row indices that belong to a cluster
+        return self.members_by_label.get(int(label), np.array([], dtype=int))
+
+    def extend(self, X):
+        # Returns a new index whose labels also cover rows appended to the dataset, given scaled.
+        # The new rows are assigned with predict; the core samples, and so the clusters themselves, stay the same.
+        labels = np.concatenate([self.labels, self.predict(X)])
+        return ClusterIndex(np.asarray(self.coreTree.data), self.coreLabels, labels, self.eps)
@@ -0,0 +1,223 @@
+import sys
+import math
+import logging
+import time
+import argparse
+import numpy as np
+import scipy.sparse as sp
+
+from sklearn import config_context
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import silhouette_samples
+from sklearn.neighbors import NearestNeighbors, KDTree
+from clusterIndex import ClusterIndex
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+DBSCAN_EPS = 0.3
+DBSCAN_MIN_SAMPLES = 2
+DBSCAN_N_JOBS = -1  # Neighbourhood queries use every core
+
+# DBSCAN keeps the eps-neighbourhood of every row it is fitted on, so its memory grows with rows x neighbours.
+# It is fitted on a sample sized so that those neighbourhoods (8 bytes per neighbour) stay under this cap, estimated
+# from the density of a pilot sample; the other rows are then assigned in chunks to the cluster of their nearest
+# core sample within eps, the rule ClusterIndex applies to new points.
+DBSCAN_FIT_MEMORY_MB = 512
+DBSCAN_PILOT_SIZE = 2000
+DBSCAN_ASSIGN_CHUNK_ROWS = 100000
+
+# Silhouette needs pairwise distances, so it is computed on at most this many clustered rows,
+# in chunks that each use at most this much memory
+SILHOUETTE_SAMPLE_SIZE = 10000
+SILHOUETTE_MEMORY_MB = 256
+
+
+def reset_peak_rss():
+    # Resets the peak RSS the kernel reports for this process, so it can be measured per configuration (Linux only)
+    try:
+        with open("/proc/self/clear_refs", "w") as clearRefs:
+            clearRefs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    # Returns the peak resident set size in MB since the last reset (or since start where it cannot be reset)
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Trains and evaluates DBSCAN on scaled (Longitude, Latitude, Price) rows within a memory cap.
+# DBSCAN runs on a sample whose neighbourhoods fit in DBSCAN_FIT_MEMORY_MB, with KD-tree queries on all cores; the
+# remaining rows are assigned to clusters through the core samples in chunks. Silhouette is computed on a sample in
+# memory-capped chunks, and a parameter sweep computes the radius neighbour graph of the sample once for the largest
+# eps and reuses it for every run.
+class ClusterTrainer:
+    def __init__(self, X, n_jobs=DBSCAN_N_JOBS, silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE,
+                 silhouette_memory_mb=SILHOUETTE_MEMORY_MB, fit_memory_mb=DBSCAN_FIT_MEMORY_MB, random_state=42):
+        self.X = np.ascontiguousarray(X, dtype=float)
+        self.nJobs = n_jobs
+        self.silhouetteSampleSize = silhouette_sample_size
+        self.silhouetteMemoryMb = silhouette_memory_mb
+        self.fitMemoryMb = fit_memory_mb
+        self.randomState = random_state
+
+    def fit_sample(self, eps):
+        # Returns the sorted positions of the rows DBSCAN is fitted on: every row when their neighbourhoods fit in the
+        # memory cap, otherwise the largest random sample whose expected neighbourhoods do
+        n = len(self.X)
+        rng = np.random.default_rng(self.randomState)
+        pilot = self.X[rng.choice(n, min(n, DBSCAN_PILOT_SIZE), replace=False)]
+        if len(pilot) == 0:
+            return np.arange(n)
+        # Share of the rows within eps of an average row
+        density = np.mean(KDTree(pilot).query_radius(pilot, eps, count_only=True)) / len(pilot)
+        budget = self.fitMemoryMb * 1024 * 1024 / 8
+        size = max(int(math.sqrt(budget / density)), len(pilot))
+        if size >= n:
+            return np.arange(n)
+        return np.sort(rng.choice(n, size, replace=False))
+
+    def fit(self, eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES):
+        # Fits DBSCAN and returns (model, cluster index, report). The model is fitted on fit_sample; the cluster index
+        # holds the label of every row and the report the cluster counts, silhouette, wall time and peak RSS.
+        reset_peak_rss()
+        start = time.perf_counter()
+        sample = self.fit_sample(eps)
+        dbscan = DBSCAN(eps=eps, min_samples=min_samples, algorithm='kd_tree', n_jobs=self.nJobs).fit(self.X[sample])
+        coreLabels = dbscan.labels_[dbscan.core_sample_indices_]
+
+        labels = np.full(len(self.X), -1, dtype=dbscan.labels_.dtype)
+        labels[sample] = dbscan.labels_
+        if len(sample) < len(self.X):
+            logger.info("DBSCAN fitted on %d of %d rows; assigning the others through %d core samples.", len(sample), len(self.X), len(coreLabels))
+            cores = ClusterIndex(dbscan.components_, coreLabels, coreLabels, eps)
+            rest = np.setdiff1d(np.arange(len(self.X)), sample, assume_unique=True)
+            for first in range(0, len(rest), DBSCAN_ASSIGN_CHUNK_ROWS):
+                rows = rest[first:first + DBSCAN_ASSIGN_CHUNK_ROWS]
+                labels[rows] = cores.predict(self.X[rows])
+
+        fitSeconds = time.perf_counter() - start
+        report = self.evaluate(labels, eps, min_samples, fitSeconds)
+        report["fit_rows"] = len(sample)
+        return dbscan, ClusterIndex(dbscan.components_, coreLabels, labels, eps), report
+
+    def neighbour_graph(self, X, radius):
+        # Sparse graph of the distances between every pair of rows closer than radius, built with a KD-tree
+        neighbours = NearestNeighbors(radius=radius, algorithm='kd_tree', n_jobs=self.nJobs).fit(X)
+        return neighbours.radius_neighbors_graph(X, mode='distance', sort_results=True)
+
+    @staticmethod
+    def restrict(graph, eps):
+        # Keeps only the edges of a neighbour graph that are at most eps long. Explicit zero distances (duplicate
+        # locations and prices) are kept, which eliminate_zeros would drop.
+        keep = graph.data <= eps
+        rows = np.repeat(np.arange(graph.shape[0]), np.diff(graph.indptr))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[keep], minlength=graph.shape[0]))])
+        return sp.csr_matrix((graph.data[keep], graph.indices[keep], indptr), shape=graph.shape)
+
+    def sweep(self, eps_values, min_samples_values):
+        # Runs DBSCAN for every eps/min_samples pair and returns one report per configuration.
+        # Every configuration runs on the fit sample of the largest eps, whose neighbour graph is built once;
+        # smaller eps values only ignore its longer edges.
+        reset_peak_rss()
+        start = time.perf_counter()
+        sample = self.fit_sample(max(eps_values))
+        X = self.X[sample]
+        graph = self.neighbour_graph(X, max(eps_values))
+        graphSeconds = time.perf_counter() - start
+        graphMb = (graph.data.nbytes + graph.indices.nbytes + graph.indptr.nbytes) / (1024 * 1024)
+        logger.info("Neighbour graph of %d rows: %d edges, %.1f MB, %.2fs, peak RSS %s MB", len(sample), graph.nnz, graphMb, graphSeconds, peak_rss_mb())
+
+        reports = []
+        for eps in sorted(eps_values):
+            epsGraph = self.restrict(graph, eps)
+            for min_samples in sorted(min_samples_values):
+                reset_peak_rss()
+                start = time.perf_counter()
+                labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit_predict(epsGraph)
+                report = self.evaluate(labels, eps, min_samples, time.perf_counter() - start, X)
+                report["fit_rows"] = len(sample)
+                reports.append(report)
+        return reports
+
+    def silhouette(self, labels, X=None):
+        # Silhouette score of the clustered (non-noise) rows of X (all rows by default), or None with fewer than two
+        # clusters. Large inputs are sampled, and the pairwise distances are reduced chunk by chunk within the memory cap.
+        X = self.X if X is None else X
+        clustered = np.flatnonzero(labels != -1)
+        if len(np.unique(labels[clustered])) < 2 or len(clustered) < 3:
+            return None
+        if len(clustered) > self.silhouetteSampleSize:
+            rng = np.random.default_rng(self.randomState)
+            clustered = np.sort(rng.choice(clustered, self.silhouetteSampleSize, replace=False))
+            if len(np.unique(labels[clustered])) < 2:
+                return None
+        with config_context(working_memory=self.silhouetteMemoryMb):
+            return float(np.mean(silhouette_samples(X[clustered], labels[clustered])))
+
+    def evaluate(self, labels, eps, min_samples, fit_seconds, X=None):
+        # Builds the report of one configuration; the peak RSS covers both the fit and the silhouette evaluation
+        start = time.perf_counter()
+        silhouette = self.silhouette(labels, X)
+        return {
+            "eps": eps,
+            "min_samples": min_samples,
+            "clusters": int(len(np.unique(labels[labels != -1]))),
+            "noise": float(np.mean(labels == -1)) if len(labels) else 0.0,
+            "silhouette": silhouette,
+            "fit_seconds": fit_seconds,
+            "silhouette_seconds": time.perf_counter() - start,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def format_reports(reports):
+    # Formats sweep reports as a table
+    lines = [f"{'eps':>8}{'min':>6}{'rows':>10}{'clusters':>10}{'noise':>8}{'silhouette':>12}{'fit (s)':>10}{'sil. (s)':>10}{'peak RSS (MB)':>15}"]
+    for report in reports:
+        silhouette = "-" if report["silhouette"] is None else f"{report['silhouette']:.4f}"
+        peak = "-" if report["peak_rss_mb"] is None else f"{report['peak_rss_mb']:.1f}"
+        lines.append(
+            f"{report['eps']:>8}{report['min_samples']:>6}{report['fit_rows']:>10}{report['clusters']:>10}{report['noise']:>8.3f}"
+            f"{silhouette:>12}{report['fit_seconds']:>10.2f}{report['silhouette_seconds']:>10.2f}{peak:>15}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Sweeps DBSCAN parameters on the dataset, e.g. python clusterTraining.py --eps 0.02 0.05 0.1 --min-samples 2 5 10
+    from sklearn.preprocessing import MinMaxScaler
+    from model import MLmodel
+    from structuredLogging import configure_logging
+
+    configure_logging("text")
+
+    parser = argparse.ArgumentParser(description="DBSCAN parameter sweep")
+    parser.add_argument("--eps", type=float, nargs="+", default=[DBSCAN_EPS])
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[DBSCAN_MIN_SAMPLES])
+    parser.add_argument("--jobs", type=int, default=DBSCAN_N_JOBS)
+    parser.add_argument("--silhouette-sample", type=int, default=SILHOUETTE_SAMPLE_SIZE)
+    parser.add_argument("--silhouette-memory", type=int, default=SILHOUETTE_MEMORY_MB, help="MB per silhouette chunk")
+    parser.add_argument("--fit-memory", type=int, default=DBSCAN_FIT_MEMORY_MB, help="MB of neighbourhoods DBSCAN may hold")
+    args = parser.parse_args()
+
+    dataScaled = MinMaxScaler().fit_transform(MLmodel().properties())
+    trainer = ClusterTrainer(dataScaled, n_jobs=args.jobs, silhouette_sample_size=args.silhouette_sample,
+                             silhouette_memory_mb=args.silhouette_memory, fit_memory_mb=args.fit_memory)
+    print(format_reports(trainer.sweep(args.eps, args.min_samples)))
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 
 # Custom label encoder class to handle unseen labels during transformation
@@ -10,22 +11,64 @@ class CustomLabelEncoder(LabelEncoder):
 
     def fit(self, y):
         # Fits the encoder to the labels and adds a '<unknown>' class for handling unseen labels
-        super().fit(y)
+        # Missing labels are not classes; transform gives them the '<unknown>' code
+        super().fit(self.present(y))
         self.classes_ = np.append(self.classes_, '<unknown>')  # Append unknown label to classes
         return self
 
+    @staticmethod
+    def present(y):
+        # Drops missing labels (None or NaN)
+        y = np.asarray(y)
+        return y[~pd.isna(y)] if y.dtype == object else y
+
+    @property
+    def unknown_code(self):
+        # Code of the '<unknown>' class. It is the last class unless labels were added later with extend.
+        return int(np.flatnonzero(self.classes_ == '<unknown>')[0])
+
+    def _lookup(self):
+        # Returns the known labels in sorted order with their codes, rebuilt whenever classes_ is replaced.
+        # For a freshly fitted encoder the codes are simply 0..n-1, since LabelEncoder sorts its classes.
+        lookup = getattr(self, '_lookup_', None)
+        if lookup is None or lookup[0] is not self.classes_:
+            codes = np.flatnonzero(self.classes_ != '<unknown>')
+            codes = codes[np.argsort(self.classes_[codes], kind='stable')]
+            lookup = (self.classes_, self.classes_[codes], codes, self.unknown_code)
+            self._lookup_ = lookup
+        return lookup
+
     def transform(self, y):
         # Transforms labels into encoded integers, with unseen labels mapped to the '<unknown>' class
-        unseen_label = len(self.classes_) - 1  # Index for the '<unknown>' label
-
-        transformed = []
-        for label in y:
-            if label in self.classes_:
-                transformed.append(super().transform([label])[0])  # Use existing encoding for known labels
-            else:
-                transformed.append(unseen_label)  # Map unseen labels to '<unknown>'
-        
-        return np.array(transformed)
+        # Vectorized with a binary search over the sorted known classes
+        _, known, codes, unseen_label = self._lookup()
+
+        y = np.asarray(y)
+        if y.dtype.kind not in 'US':
+            y = y.astype(str)  # Mixed or missing values are compared as strings, so they fall through to '<unknown>'
+        if len(known) == 0 or len(y) == 0:
+            return np.full(len(y), unseen_label)
+
+        positions = np.searchsorted(known, y)
+        positions = np.minimum(positions, len(known) - 1)
+        return np.where(known[positions] == y, codes[positions], unseen_label)
+
+    def __getstate__(self):
+        # The lookup cache is rebuilt on first use, so it is left out of the pickled encoder
+        state = dict(super().__getstate__())
+        state.pop('_lookup_', None)
+        return state
+
+    def extend(self, y):
+        # Adds labels that were not seen during fit after all existing classes, so that every existing code,
+        # including the '<unknown>' code a trained model relies on, stays the same. Returns the labels added.
+        y = self.present(y)
+        if y.dtype.kind not in 'US':
+            y = y.astype(str)
+        added = np.setdiff1d(np.unique(y), self.classes_)
+        if len(added):
+            self.classes_ = np.append(self.classes_, added)
+        return added
 
     def fit_transform(self, y):
         # Combines fit and transform methods for convenience
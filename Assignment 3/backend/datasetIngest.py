@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datasetSnapshot import SnapshotWriter, SNAPSHOT_DIRECTORY
+from featurePipeline import FEATURE_COLUMNS
+from gazetteer import Gazetteer, GAZETTEER_SYDNEY_PATH
+from macroFeatures import MacroFeatureStore, day_numbers
+
+logger = logging.getLogger(__name__)
+
+# Builds one training set from several sales CSVs with different schemas.
+# Each source is streamed in chunks; a chunk is mapped onto the dataset columns (Price and the 19 model features),
+# deduplicated against every row written so far and appended to a snapshot (see SnapshotWriter), so memory stays
+# bounded by the chunk size whatever the number and size of the sources. Mapping the chunks (date parsing, gazetteer
+# and macro-economic lookups) runs in a pool of worker processes, while reading, deduplication and writing stay in
+# order in this process. Run from the backend directory:
+#   python datasetIngest.py dataset/origin_combined_data.csv "../../Assignment 2/Dataset/Sydney_housing_FULL.csv"
+#   python model.py --dataset dataset/snapshot/training_data
+
+INGEST_SOURCES = ["dataset/origin_combined_data.csv", GAZETTEER_SYDNEY_PATH]
+INGEST_OUTPUT_DIRECTORY = os.path.join(SNAPSHOT_DIRECTORY, "training_data")
+INGEST_CHUNK_ROWS = 50000
+INGEST_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+# Columns of the training set, in the order of dataset/origin_combined_data.csv, and how each is stored
+TRAINING_COLUMNS = FEATURE_COLUMNS[:2] + ['Price'] + FEATURE_COLUMNS[2:]
+TRAINING_DTYPES = {column: np.float64 for column in TRAINING_COLUMNS}
+TRAINING_DTYPES.update({column: "category" for column in ['Suburb', 'Type', 'CouncilArea', 'City']})
+TRAINING_DTYPES.update({column: np.int64 for column in ['DaySold', 'MonthSold', 'YearSold']})
+
+# Columns identifying a sale. Two rows that agree on all of them are the same sale, even when they come from
+# sources that locate it differently (street coordinates in one, suburb centroids in another).
+DEDUP_COLUMNS = ['Suburb', 'Type', 'Price', 'Bedroom', 'Bathroom', 'Car', 'Landsize', 'DaySold', 'MonthSold', 'YearSold']
+
+# Columns of Sydney_housing_FULL.csv that are read
+SYDNEY_HOUSING_COLUMNS = [
+    'price', 'date_sold', 'suburb', 'num_bath', 'num_bed', 'num_parking', 'property_size', 'type',
+    'suburb_lat', 'suburb_lng', 'km_from_cbd',
+]
+
+# Maps the Sydney listing types onto the dataset codes (h: house, cottage, villa, semi-detached, terrace;
+# u: unit, duplex; t: townhouse). Land and development sites have no dwelling and are left out.
+SYDNEY_PROPERTY_TYPES = {
+    'House': 'h', 'Acreage / Semi-Rural': 'h', 'Rural': 'h', 'New House & Land': 'h', 'Villa': 'h',
+    'Semi-Detached': 'h', 'Terrace': 'h',
+    'Apartment / Unit / Flat': 'u', 'Block of Units': 'u', 'New Apartments / Off the Plan': 'u', 'Studio': 'u',
+    'Duplex': 'u',
+    'Townhouse': 't',
+}
+
+
+def map_combined(chunk):
+    # dataset/origin_combined_data.csv and files with the same layout: already in the training schema
+    return chunk[TRAINING_COLUMNS]
+
+
+def map_sydney_housing(chunk):
+    # Assignment 2's Sydney_housing_FULL.csv. Sales are located by their suburb centroid, which also gives the postcode
+    # and council area through the gazetteer; the postcode is stored as log(postcode) like the rest of the dataset.
+    # The macro-economic columns are the ones in force on the sale date, as the API looks them up.
+    # The file has no building area, which is left missing (XGBoost handles missing values).
+    chunk = chunk.assign(Type=chunk['type'].map(SYDNEY_PROPERTY_TYPES))
+    dates = pd.to_datetime(chunk['date_sold'], format='%d/%m/%y', errors='coerce')
+    keep = chunk['Type'].notna() & dates.notna() & chunk[['price', 'suburb_lat', 'suburb_lng']].notna().all(axis=1)
+    chunk = chunk[keep]
+    dates = pd.DatetimeIndex(dates[keep])
+
+    places = Gazetteer.shared().lookup_many(chunk['suburb_lat'].values, chunk['suburb_lng'].values)
+    cities = np.full(len(chunk), 'sydney')
+    macro = MacroFeatureStore.shared().features_many(cities, day_numbers(dates.values))
+
+    return pd.DataFrame({
+        'Suburb': chunk['suburb'].astype(str).str.lower().str.replace(" ", "", regex=False).values,
+        'Type': chunk['Type'].values,
+        'Price': chunk['price'].values,
+        'Distance': chunk['km_from_cbd'].values,
+        'Postcode': np.log(pd.to_numeric(places['Postcode'], errors='coerce').values),
+        'Bedroom': chunk['num_bed'].values,
+        'Bathroom': chunk['num_bath'].values,
+        'Car': chunk['num_parking'].values,
+        'Landsize': chunk['property_size'].values,
+        'BuildingArea': np.nan,
+        'CouncilArea': places['CouncilArea'].values,
+        'Lattitude': chunk['suburb_lat'].values,
+        'Longtitude': chunk['suburb_lng'].values,
+        'City': cities,
+        'CashRate': macro['CashRate'],
+        'Residential Property Price Index': macro['Residential Property Price Index'],
+        'Attached Dwellings Price Index': macro['Attached Dwellings Price Index'],
+        'DaySold': dates.day,
+        'MonthSold': dates.month,
+        'YearSold': dates.year,
+    })
+
+
+# Schema name -> (columns a source must have, columns read, chunk mapper)
+SOURCE_SCHEMAS = {
+    "combined": (TRAINING_COLUMNS, None, map_combined),
+    "sydney_housing": (SYDNEY_HOUSING_COLUMNS, SYDNEY_HOUSING_COLUMNS, map_sydney_housing),
+}
+
+
+def detect_schema(path):
+    # Returns the name of the schema a CSV follows, from its header
+    header = set(pd.read_csv(path, nrows=0).columns)
+    for name, (required, _, _) in SOURCE_SCHEMAS.items():
+        if set(required) <= header:
+            return name
+    raise ValueError(f"{path} does not match any known source schema ({', '.join(SOURCE_SCHEMAS)}).")
+
+
+def sale_hashes(data):
+    # 64-bit hash of the identifying columns of every row
+    return pd.util.hash_pandas_object(data[DEDUP_COLUMNS], index=False).to_numpy()
+
+
+def map_chunk(schema, chunk):
+    # Maps one source chunk onto the training schema. Runs in a worker process.
+    # Rows missing a value the model cannot do without (price, date, location, category) are dropped.
+    data = SOURCE_SCHEMAS[schema][2](chunk)
+    data = data.dropna(subset=['Price', 'Suburb', 'Type', 'CouncilArea', 'City', 'Postcode', 'Lattitude', 'Longtitude', 'DaySold', 'MonthSold', 'YearSold'])
+    data = data.astype({column: dtype for column, dtype in TRAINING_DTYPES.items() if dtype != "category"})
+    return len(chunk), data, sale_hashes(data)
+
+
+def load_lookups():
+    # Loads the gazetteer and the macro series once per process. Forked workers inherit the parent's copies.
+    Gazetteer.shared()
+    MacroFeatureStore.shared()
+
+
+# Hashes of the sales written so far, kept as one sorted uint64 array (8 bytes per row)
+class SeenSales:
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def add_new(self, hashes):
+        # Returns a mask of the hashes that were not seen before, in this call or earlier ones, and records them
+        positions = np.searchsorted(self.hashes, hashes)
+        seen = np.zeros(len(hashes), dtype=bool)
+        inside = positions < len(self.hashes)
+        seen[inside] = self.hashes[positions[inside]] == hashes[inside]
+        new = ~seen & ~pd.Series(hashes).duplicated().to_numpy()
+        self.hashes = np.union1d(self.hashes, hashes[new])
+        return new
+
+
+# Streams the sources into the training set snapshot; see the top of this file
+class DatasetIngest:
+    def __init__(self, output=INGEST_OUTPUT_DIRECTORY, chunk_rows=INGEST_CHUNK_ROWS, workers=INGEST_WORKERS):
+        self.output = output
+        self.chunkRows = chunk_rows
+        self.workers = workers
+
+    def chunks(self, path, schema):
+        # Streams a source CSV as (schema, chunk) pairs
+        usecols = SOURCE_SCHEMAS[schema][1]
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=self.chunkRows):
+            yield schema, chunk
+
+    def map_chunks(self, chunks):
+        # Maps chunks in order. With several workers at most two chunks per worker are in flight, so a fast reader
+        # never queues a whole file in memory.
+        if self.workers <= 1:
+            for schema, chunk in chunks:
+                yield map_chunk(schema, chunk)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=load_lookups) as pool:
+            pending = deque()
+            for schema, chunk in chunks:
+                pending.append(pool.submit(map_chunk, schema, chunk))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def run(self, sources):
+        # Ingests the sources in order into the output snapshot and returns it with per-source counts
+        schemas = [detect_schema(path) for path in sources]
+        load_lookups()
+        seen = SeenSales()
+        reports = []
+        start = time.perf_counter()
+
+        writer = SnapshotWriter(self.output, TRAINING_DTYPES, sources)
+        try:
+            for path, schema in zip(sources, schemas):
+                report = {"source": path, "schema": schema, "read": 0, "invalid": 0, "duplicates": 0, "written": 0}
+                for read, data, hashes in self.map_chunks(self.chunks(path, schema)):
+                    new = seen.add_new(hashes)
+                    writer.append(data[new])
+                    report["read"] += read
+                    report["invalid"] += read - len(data)
+                    report["duplicates"] += int(len(data) - new.sum())
+                    report["written"] += int(new.sum())
+                logger.info("%s (%s): %d rows read, %d invalid, %d duplicates, %d written.",
+                            path, schema, report["read"], report["invalid"], report["duplicates"], report["written"])
+                reports.append(report)
+        except BaseException:
+            writer.abort()
+            raise
+        snapshot = writer.close()
+
+        logger.info("Wrote %d rows to %s in %.1fs.", len(snapshot), snapshot.directory, time.perf_counter() - start)
+        return snapshot, reports
+
+
+if __name__ == "__main__":
+    from structuredLogging import configure_logging
+
+    parser = argparse.ArgumentParser(description="Merge sales CSVs into one training set snapshot")
+    parser.add_argument("sources", nargs="*", help="source CSVs, in priority order (defaults to the dataset and the Sydney sales)")
+    parser.add_argument("--output", default=INGEST_OUTPUT_DIRECTORY, help="snapshot directory to write")
+    parser.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS, help="rows read and mapped at a time")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="processes mapping chunks (1: no pool)")
+    args = parser.parse_args()
+
+    configure_logging("text")
+    sources = args.sources or [path for path in INGEST_SOURCES if os.path.exists(path)]
+    if not sources:
+        sys.exit("No source CSV found.")
+    DatasetIngest(args.output, args.chunk_rows, args.workers).run(sources)
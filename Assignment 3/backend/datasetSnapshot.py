@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import logging
+import shutil
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIRECTORY = "dataset/snapshot"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_COPY_BLOCK = 1 << 20  # Values copied at a time when a written snapshot is finalized
+
+
+def decode_codes(categories, codes):
+    # Maps dictionary codes to their categories. Missing values are stored as code -1, which plain indexing would wrap
+    # around to the last category, so they become None instead.
+    codes = np.asarray(codes)
+    values = np.asarray(categories, dtype=object)[np.maximum(codes, 0)] if len(categories) else np.empty(len(codes), dtype=object)
+    values[codes < 0] = None
+    return values
+
+
+# Typed columnar copy of a dataset CSV, converted once and then opened memory-mapped.
+# The CSV index column is dropped, every numeric column is stored as its own .npy file, and text columns are
+# dictionary-encoded as int32 codes plus a category list in meta.json. Opening a snapshot only maps the files,
+# so startup does not parse the CSV and every worker process reads the same page-cache copy of the columns.
+class DatasetSnapshot:
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.columns = meta["columns"]
+        self.categories = {name: np.asarray(values, dtype=object) for name, values in meta["categories"].items()}
+        self._arrays = {}
+
+    @staticmethod
+    def source_signature(csv_path):
+        # Size and modification time of the source CSV, used to detect a stale snapshot
+        stat = os.stat(csv_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def directory_for(csv_path, root=SNAPSHOT_DIRECTORY):
+        return os.path.join(root, os.path.splitext(os.path.basename(csv_path))[0])
+
+    @classmethod
+    def open(cls, directory):
+        # Opens an existing snapshot; the column files are mapped lazily on first access
+        with open(os.path.join(directory, "meta.json")) as metaFile:
+            meta = json.load(metaFile)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format in {directory}.")
+        return cls(directory, meta)
+
+    @classmethod
+    def build(cls, csv_path, directory=None):
+        # Converts a CSV into a snapshot. The files are written to a temporary directory that is swapped in at the end,
+        # so a reader never sees a half-written snapshot.
+        directory = directory or cls.directory_for(csv_path)
+        signature = cls.source_signature(csv_path)
+
+        data = pd.read_csv(csv_path)
+        data = data.drop(columns=[column for column in data.columns if column.startswith("Unnamed:")])
+
+        tmpDirectory = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(tmpDirectory, ignore_errors=True)
+        os.makedirs(tmpDirectory)
+
+        categories = {}
+        for column in data.columns:
+            values = data[column]
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                array = values.to_numpy()
+            else:
+                codes, uniques = pd.factorize(values.astype(object), sort=True)
+                array = codes.astype(np.int32)
+                categories[column] = [str(value) for value in uniques]
+            np.save(os.path.join(tmpDirectory, cls.file_name(data.columns.get_loc(column))), array)
+
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "source": os.path.basename(csv_path),
+            "source_signature": signature,
+            "rows": len(data),
+            "columns": list(data.columns),
+            "categories": categories,
+        }
+        with open(os.path.join(tmpDirectory, "meta.json"), "w") as metaFile:
+            json.dump(meta, metaFile)
+
+        cls.replace_directory(tmpDirectory, directory)
+        return cls(directory, meta)
+
+    @staticmethod
+    def replace_directory(tmpDirectory, directory):
+        # Swaps a finished snapshot directory in place of the previous one
+        oldDirectory = f"{directory}.old-{os.getpid()}"
+        if os.path.exists(directory):
+            os.replace(directory, oldDirectory)
+        os.replace(tmpDirectory, directory)
+        shutil.rmtree(oldDirectory, ignore_errors=True)
+
+    @classmethod
+    def load(cls, csv_path, directory=None):
+        # Opens the snapshot of a CSV, converting it first when the snapshot is missing or older than the CSV.
+        # Without the CSV an existing snapshot is used as is.
+        directory = directory or cls.directory_for(csv_path)
+        if os.path.exists(os.path.join(directory, "meta.json")):
+            snapshot = cls.open(directory)
+            if not os.path.exists(csv_path) or snapshot.meta["source_signature"] == cls.source_signature(csv_path):
+                return snapshot
+            logger.info("Snapshot of %s is out of date, rebuilding it.", csv_path)
+        return cls.build(csv_path, directory)
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @staticmethod
+    def file_name(position):
+        # Columns are stored by position, since column names such as "Residential Property Price Index" contain spaces
+        return f"column_{position}.npy"
+
+    def array(self, column):
+        # Returns the read-only memory-mapped values of a numeric column, or the codes of a categorical column
+        array = self._arrays.get(column)
+        if array is None:
+            array = np.load(os.path.join(self.directory, self.file_name(self.columns.index(column))), mmap_mode="r")
+            self._arrays[column] = array
+        return array
+
+    def decode(self, column, rows=None, categories=None):
+        # Returns the text values of a categorical column, optionally only for some row positions, with None for
+        # missing values (code -1). `categories` replaces the stored category list, e.g. with cleaned-up names.
+        codes = self.array(column) if rows is None else self.array(column)[rows]
+        return decode_codes(self.categories[column] if categories is None else categories, codes)
+
+    def frame(self, columns=None):
+        # Returns a DataFrame view of the snapshot. Numeric columns stay backed by the mapped files
+        # and categorical columns are pandas Categoricals built on the stored codes.
+        data = {}
+        for column in columns or self.columns:
+            if column in self.categories:
+                data[column] = pd.Categorical.from_codes(self.array(column), categories=self.categories[column])
+            else:
+                data[column] = self.array(column)
+        return pd.DataFrame(data, copy=False)
+
+
+# Writes a snapshot chunk by chunk, for datasets that are built incrementally rather than converted from one CSV.
+# Every appended chunk is written straight to one raw file per column, and text columns are dictionary-encoded
+# against the categories seen so far, so memory stays bounded by the chunk size. close() converts the raw files
+# into the .npy columns of the snapshot format, with the categories sorted as build() stores them, and swaps
+# the finished directory in.
+class SnapshotWriter:
+    def __init__(self, directory, dtypes, sources=None):
+        # dtypes maps every column, in order, to a NumPy dtype or to "category" for a text column
+        self.directory = directory
+        self.columns = list(dtypes)
+        self.dtypes = {column: dtype if dtype == "category" else np.dtype(dtype) for column, dtype in dtypes.items()}
+        self.sources = sources or []
+        self.rows = 0
+        self.codes = {column: {} for column, dtype in self.dtypes.items() if dtype == "category"}
+
+        self.tmpDirectory = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(self.tmpDirectory, ignore_errors=True)
+        os.makedirs(self.tmpDirectory)
+        self.files = {column: open(self.part_path(column), "wb") for column in self.columns}
+
+    def part_path(self, column):
+        return os.path.join(self.tmpDirectory, DatasetSnapshot.file_name(self.columns.index(column)) + ".part")
+
+    def encode(self, column, values):
+        # Returns the int32 codes of text values, giving new values the next free codes. Missing values get code -1,
+        # as in build(): factorize gives them -1, which picks the -1 appended to the mapping.
+        codes = self.codes[column]
+        local, uniques = pd.factorize(values.astype(object))
+        mapping = np.array([codes.setdefault(str(value), len(codes)) for value in uniques] + [-1], dtype=np.int32)
+        return mapping[local]
+
+    def append(self, data):
+        # Appends the rows of a DataFrame holding every column of the snapshot
+        for column in self.columns:
+            if self.dtypes[column] == "category":
+                array = self.encode(column, data[column])
+            else:
+                array = data[column].to_numpy(dtype=self.dtypes[column])
+            self.files[column].write(np.ascontiguousarray(array).tobytes())
+        self.rows += len(data)
+
+    def close(self):
+        # Converts the raw column files into the snapshot and swaps it in. Returns the opened snapshot.
+        for file in self.files.values():
+            file.close()
+
+        categories = {}
+        for column in self.columns:
+            dtype = self.dtypes[column]
+            remap = None
+            if dtype == "category":
+                values = list(self.codes[column])
+                order = sorted(range(len(values)), key=values.__getitem__)
+                categories[column] = [values[i] for i in order]
+                # The trailing -1 keeps missing values (code -1) missing
+                remap = np.full(len(values) + 1, -1, dtype=np.int32)
+                remap[order] = np.arange(len(values), dtype=np.int32)
+                dtype = np.dtype(np.int32)
+            self.convert_part(column, dtype, remap)
+
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "source": ", ".join(os.path.basename(path) for path in self.sources),
+            "source_signature": None,
+            "rows": self.rows,
+            "columns": self.columns,
+            "categories": categories,
+        }
+        with open(os.path.join(self.tmpDirectory, "meta.json"), "w") as metaFile:
+            json.dump(meta, metaFile)
+
+        DatasetSnapshot.replace_directory(self.tmpDirectory, self.directory)
+        return DatasetSnapshot(self.directory, meta)
+
+    def convert_part(self, column, dtype, remap=None, block=SNAPSHOT_COPY_BLOCK):
+        # Copies a raw column file into a .npy file block by block, mapping category codes to their sorted position
+        partPath = self.part_path(column)
+        target = np.lib.format.open_memmap(partPath[:-len(".part")], mode="w+", dtype=dtype, shape=(self.rows,))
+        if self.rows:
+            source = np.memmap(partPath, dtype=dtype, mode="r", shape=(self.rows,))
+            for start in range(0, self.rows, block):
+                values = source[start:start + block]
+                target[start:start + block] = remap[values] if remap is not None else values
+            del source
+        target.flush()
+        del target
+        os.remove(partPath)
+
+    def abort(self):
+        for file in self.files.values():
+            file.close()
+        shutil.rmtree(self.tmpDirectory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # One-time conversion: python datasetSnapshot.py [csv ...]
+    from structuredLogging import configure_logging
+
+    configure_logging("text")
+    for csvPath in sys.argv[1:] or ["dataset/origin_combined_data.csv", "dataset/median_price.csv"]:
+        snapshot = DatasetSnapshot.build(csvPath)
+        logger.info("Wrote %d rows and %d columns of %s to %s.", len(snapshot), len(snapshot.columns), csvPath, snapshot.directory)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import shap
+import xgboost as xgb
+
+# Features shown to users and their column positions in the model input
+ATTRIBUTION_FEATURES = ['Type', 'Bedroom', 'Bathroom', 'Car', 'Landsize', 'BuildingArea', 'Latitude', 'Longitude']
+ATTRIBUTION_COLUMNS = [1, 4, 5, 6, 7, 8, 10, 11]
+
+# Attribution methods: "native" uses XGBoost's built-in TreeSHAP (pred_contribs), "shap" uses shap.TreeExplainer
+ATTRIBUTION_METHODS = ("native", "shap")
+
+
+# Per-feature attributions for one loaded XGBoost model.
+# Built once per artifact set; the shap.TreeExplainer is only created the first time the "shap" method is used.
+class Explainer:
+    def __init__(self, model):
+        self.model = model
+        self.booster = model.get_booster()
+        self._shapExplainer = None
+
+    @property
+    def shap_explainer(self):
+        if self._shapExplainer is None:
+            self._shapExplainer = shap.TreeExplainer(self.model)
+        return self._shapExplainer
+
+    def contributions(self, X, method="native"):
+        # Returns an (n_rows, n_features) array of SHAP values for the scaled feature matrix X
+        if method == "native":
+            # The last column of pred_contribs is the bias term, which shap reports separately as expected_value
+            return self.booster.predict(xgb.DMatrix(np.asarray(X)), pred_contribs=True)[:, :-1]
+        if method == "shap":
+            return self.shap_explainer.shap_values(X)
+        raise ValueError(f"Unknown attribution method: {method}")
+
+    def to_frame(self, contributions):
+        # Builds the Feature / SHAP Value table returned to the frontend for one row of contributions
+        return pd.DataFrame({
+            'Feature': ATTRIBUTION_FEATURES,
+            'SHAP Value': np.abs(contributions[ATTRIBUTION_COLUMNS])
+        })
+
+    def max_difference(self, X):
+        # Largest absolute difference between the native and shap attributions on X, used to check that they agree
+        return float(np.max(np.abs(self.contributions(X, "native") - self.contributions(X, "shap"))))
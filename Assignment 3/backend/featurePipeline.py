@@ -0,0 +1,172 @@
+import re
+import math
+import logging
+import threading
+import numpy as np
+import pytz
+
+from datetime import datetime
+from functools import lru_cache
+from macroFeatures import MacroFeatureStore
+
+logger = logging.getLogger(__name__)
+
+# Words stripped from Nominatim council names so they match the names the council area encoder was trained on
+COUNCIL_AREA_WORDS = r'\b(City|Council|of|city|Of)\b'
+COUNCIL_AREA_PATTERN = re.compile(COUNCIL_AREA_WORDS)
+
+# Column order of the model input, as seen by scaler_X during training
+FEATURE_COLUMNS = [
+    'Suburb', 'Type', 'Distance', 'Postcode', 'Bedroom', 'Bathroom', 'Car', 'Landsize', 'BuildingArea',
+    'CouncilArea', 'Lattitude', 'Longtitude', 'City', 'CashRate', 'Residential Property Price Index',
+    'Attached Dwellings Price Index', 'DaySold', 'MonthSold', 'YearSold'
+]
+
+MELBOURNE_TZ = pytz.timezone('Australia/Melbourne')
+
+# Macro-economic model inputs, looked up as of the sale date. New observations can fall outside the range scaler_X
+# was fitted on (the cash rate was 0.1-2.0 in the training data), so they are clamped to that range.
+MACRO_COLUMNS = ['CashRate', 'Residential Property Price Index', 'Attached Dwellings Price Index']
+MACRO_POSITIONS = [FEATURE_COLUMNS.index(column) for column in MACRO_COLUMNS]
+
+# Macro columns already reported as out of range, so the warning is logged once per column and process
+warnedMacroColumns = set()
+
+# The dataset stores Postcode as log(postcode), and scaler_X was fitted on those values.
+# Postcode values below this limit are logs; real postcodes are above it.
+LOG_POSTCODE_LIMIT = 100.0
+
+
+@lru_cache(maxsize=4096)
+def normalize_name(name):
+    # Lower-cases a suburb or city name and removes spaces, as done for the encoder classes
+    return name.lower().replace(" ", "")
+
+
+@lru_cache(maxsize=1024)
+def normalize_council_area(councilArea):
+    # Strips "City", "Council" and "of" from a council name before normalizing it like other names
+    return COUNCIL_AREA_PATTERN.sub('', councilArea).strip().lower().replace(" ", "")
+
+
+def dataset_postcodes(values):
+    # Returns the real 4-digit postcodes of a dataset Postcode column, undoing the log transform where it was applied
+    values = np.array(values, dtype=np.float64)
+    logs = values < LOG_POSTCODE_LIMIT
+    values[logs] = np.exp(values[logs])
+    return [f"{int(round(value)):04d}" for value in values]
+
+
+def uses_log_postcode(scaler_X):
+    # True when a model's scaler was fitted on log postcodes, as stored in the dataset, rather than on postcodes
+    return float(scaler_X.data_max_[FEATURE_COLUMNS.index('Postcode')]) < LOG_POSTCODE_LIMIT
+
+
+def postcode_feature(postcode, log):
+    # Model input for a real postcode such as "3000"
+    return math.log(float(postcode)) if log else float(postcode)
+
+
+def macro_limits(scaler_X):
+    # Lowest and highest values of the macro columns in the data scaler_X was fitted on
+    return np.asarray(scaler_X.data_min_)[MACRO_POSITIONS], np.asarray(scaler_X.data_max_)[MACRO_POSITIONS]
+
+
+def clamp_macro(values, low, high):
+    # Clamps the macro columns of an (n x 3 or 3) array in place to the training range, warning about each column
+    # the first time one of its values is out of range. Returns the array.
+    outside = (values < low) | (values > high)
+    if outside.any():
+        for position in np.flatnonzero(outside.reshape(-1, len(MACRO_COLUMNS)).any(axis=0)):
+            column = MACRO_COLUMNS[position]
+            if column not in warnedMacroColumns:
+                warnedMacroColumns.add(column)
+                logger.warning("%s is outside the range the model was trained on (%s to %s); clamping it to that range.",
+                               column, low[position], high[position])
+        np.clip(values, low, high, out=values)
+    return values
+
+
+# Precompiled single-row version of MLmodel.preprocess for one artifact set.
+# Categorical encoders become dictionary lookups, the row is written into a preallocated per-thread buffer
+# in the fixed column order, and scaler_X is applied in place as row * scale_ + min_, exactly as
+# MinMaxScaler.transform computes it. Produces the same values as preprocess without building a DataFrame.
+class FeaturePipeline:
+    def __init__(self, suburb_encoder, city_encoder, council_area_encoder, type_encoder, scaler_X):
+        if hasattr(scaler_X, "feature_names_in_") and list(scaler_X.feature_names_in_) != FEATURE_COLUMNS:
+            raise ValueError("scaler_X was fitted on a different column order than FEATURE_COLUMNS.")
+
+        self.suburbCodes = self.codes(suburb_encoder)
+        self.cityCodes = self.codes(city_encoder)
+        self.councilAreaCodes = self.codes(council_area_encoder)
+        self.typeCodes = self.codes(type_encoder)
+        self.unknown = {
+            "suburb": suburb_encoder.unknown_code,
+            "city": city_encoder.unknown_code,
+            "councilArea": council_area_encoder.unknown_code,
+            "type": type_encoder.unknown_code,
+        }
+
+        self.logPostcode = uses_log_postcode(scaler_X)
+        self.macroLow, self.macroHigh = macro_limits(scaler_X)
+        self.scale_ = np.asarray(scaler_X.scale_, dtype=np.float64)
+        self.min_ = np.asarray(scaler_X.min_, dtype=np.float64)
+        self.clip = getattr(scaler_X, "clip", False)
+        self.featureRange = scaler_X.feature_range
+        self._buffers = threading.local()
+
+    @classmethod
+    def from_artifacts(cls, artifacts):
+        # Builds the pipeline from a dict or ArtifactSet holding the encoders and scaler_X
+        get = artifacts.get if isinstance(artifacts, dict) else lambda name: getattr(artifacts, name)
+        return cls(get("suburb_encoder"), get("city_encoder"), get("council_area_encoder"), get("type_encoder"), get("scaler_X"))
+
+    @staticmethod
+    def codes(encoder):
+        # Maps every known class of a CustomLabelEncoder to its code, leaving out '<unknown>'
+        return {label: code for code, label in enumerate(encoder.classes_.tolist()) if label != '<unknown>'}
+
+    def _row_buffer(self):
+        row = getattr(self._buffers, "row", None)
+        if row is None:
+            row = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float64)
+            self._buffers.row = row
+        return row
+
+    def transform(self, coordinates, distance, suburb, city, councilArea, postcode, type, bathrooms, bedrooms, cars, building_area, land_size, date=None):
+        # Takes the same arguments as MLmodel.preprocess and returns the scaled 1 x 19 feature row.
+        # The row is a per-thread buffer that the next call on the same thread overwrites.
+        if date is None:
+            date = datetime.now(MELBOURNE_TZ)
+
+        cityCode = self.cityCodes.get(normalize_name(city), self.unknown["city"])
+        cashRate, residentialIndex, attachedIndex = MacroFeatureStore.shared().features(city, date)
+
+        row = self._row_buffer()
+        values = row[0]
+        values[0] = self.suburbCodes.get(normalize_name(suburb), self.unknown["suburb"])
+        values[1] = self.typeCodes.get(type, self.unknown["type"])
+        values[2] = distance
+        values[3] = postcode_feature(postcode, self.logPostcode)
+        values[4] = bedrooms
+        values[5] = bathrooms
+        values[6] = cars
+        values[7] = land_size
+        values[8] = building_area
+        values[9] = self.councilAreaCodes.get(normalize_council_area(councilArea), self.unknown["councilArea"])
+        values[10] = float(coordinates[0])
+        values[11] = float(coordinates[1])
+        values[12] = cityCode
+        values[13] = cashRate
+        values[14] = residentialIndex
+        values[15] = attachedIndex
+        values[16] = date.day
+        values[17] = date.month
+        values[18] = date.year
+        clamp_macro(values[13:16], self.macroLow, self.macroHigh)
+
+        np.multiply(row, self.scale_, out=row)
+        np.add(row, self.min_, out=row)
+        if self.clip:
+            np.clip(row, self.featureRange[0], self.featureRange[1], out=row)
+        return row
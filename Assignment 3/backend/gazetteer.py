@@ -0,0 +1,184 @@
+import os
+import math
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass
+from scipy.spatial import cKDTree
+from datasetSnapshot import DatasetSnapshot
+from featurePipeline import normalize_name, dataset_postcodes
+from neighbourIndex import haversine_km, EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Local sources of suburb locations: the training dataset (suburb, postcode, council area and city of every sale)
+# and the Sydney sales of Assignment 2, which add suburb centroids for Sydney suburbs missing from the dataset
+GAZETTEER_DATASET_PATH = "dataset/origin_combined_data.csv"
+GAZETTEER_SYDNEY_PATH = os.path.join("..", "..", "Assignment 2", "Dataset", "Sydney_housing_FULL.csv")
+
+# Points further than this from every known suburb centroid are resolved from Nominatim's display name instead
+GAZETTEER_MAX_KM = 5.0
+
+# CBD coordinates used for the distance feature, so that resolving an address never geocodes the city centre
+CITY_CENTERS = {
+    "melbourne": (-37.8136, 144.9631),
+    "sydney": (-33.8688, 151.2093),
+}
+
+
+# Suburb-level attributes of a point, as resolved by the gazetteer
+@dataclass(frozen=True)
+class GazetteerEntry:
+    suburb: str
+    postcode: str
+    council_area: str
+    city: str
+    distance: float
+    center_coordinates: tuple
+    suburb_distance: float  # km from the point to the centroid of the suburb it was assigned to
+
+
+def unit_vectors(latitude, longitude):
+    # Maps coordinates onto the unit sphere, where the straight-line nearest neighbour is also the great-circle one
+    lat = np.radians(np.asarray(latitude, dtype=float))
+    lon = np.radians(np.asarray(longitude, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+# In-memory gazetteer of suburb centroids with their postcode (the real one, e.g. "3000"), council area and city.
+# A point is assigned to the suburb with the nearest centroid through a KD-tree, so suburb, postcode, council area
+# and CBD distance are resolved locally in microseconds; only the street-to-coordinates step needs Nominatim.
+class Gazetteer:
+    _shared = None
+    _sharedLock = threading.Lock()
+
+    def __init__(self, suburbs):
+        # suburbs is a DataFrame with Suburb, Latitude, Longitude, Postcode, CouncilArea and City columns
+        self.suburbs = suburbs['Suburb'].astype(str).tolist()
+        self.latitude = suburbs['Latitude'].to_numpy(dtype=float)
+        self.longitude = suburbs['Longitude'].to_numpy(dtype=float)
+        self.postcodes = suburbs['Postcode'].astype(str).tolist()
+        self.councilAreas = suburbs['CouncilArea'].astype(str).tolist()
+        self.cities = suburbs['City'].astype(str).tolist()
+        self.tree = cKDTree(unit_vectors(self.latitude, self.longitude)) if len(self.suburbs) else None
+
+        # Suburb/postcode table in both directions
+        self.postcodeBySuburb = dict(zip(self.suburbs, self.postcodes))
+        self.suburbsByPostcode = {}
+        for suburb, postcode in zip(self.suburbs, self.postcodes):
+            self.suburbsByPostcode.setdefault(postcode, []).append(suburb)
+
+    def __len__(self):
+        return len(self.suburbs)
+
+    @classmethod
+    def shared(cls):
+        # Returns the gazetteer shared by every Geography object in this process, built from the default sources.
+        # Without the dataset it is empty, and every address is resolved from Nominatim as before.
+        with cls._sharedLock:
+            if cls._shared is None:
+                try:
+                    cls._shared = cls.from_sources()
+                except (OSError, KeyError, ValueError) as e:
+                    logger.warning("Gazetteer unavailable, falling back to Nominatim address parsing: %s", e)
+                    cls._shared = cls.empty()
+            return cls._shared
+
+    @classmethod
+    def empty(cls):
+        return cls(pd.DataFrame(columns=['Suburb', 'Latitude', 'Longitude', 'Postcode', 'CouncilArea', 'City']))
+
+    @staticmethod
+    def most_common(data, column):
+        # Returns the most frequent value of a column for each suburb
+        counts = data.groupby(['Suburb', column], observed=True).size().reset_index(name='count')
+        counts = counts.sort_values(['Suburb', 'count'], ascending=[True, False], kind='stable')
+        return counts.drop_duplicates('Suburb').set_index('Suburb')[column]
+
+    @classmethod
+    def from_sources(cls, dataset_path=GAZETTEER_DATASET_PATH, sydney_path=GAZETTEER_SYDNEY_PATH):
+        # Builds the gazetteer from the dataset snapshot and, when present, the Sydney housing file
+        data = DatasetSnapshot.load(dataset_path).frame(['Suburb', 'Postcode', 'CouncilArea', 'City', 'Lattitude', 'Longtitude'])
+        data = data.rename(columns={'Lattitude': 'Latitude', 'Longtitude': 'Longitude'})
+        data['Suburb'] = data['Suburb'].astype(str)
+
+        suburbs = data.groupby('Suburb')[['Latitude', 'Longitude']].mean()
+        for column in ['Postcode', 'CouncilArea', 'City']:
+            suburbs[column] = cls.most_common(data, column)
+        suburbs = suburbs.reset_index()
+        suburbs['Postcode'] = dataset_postcodes(suburbs['Postcode'])
+
+        if sydney_path and os.path.exists(sydney_path):
+            suburbs = pd.concat([suburbs, cls.sydney_suburbs(sydney_path, suburbs)], ignore_index=True)
+
+        gazetteer = cls(suburbs)
+        logger.info("Gazetteer built with %d suburbs.", len(gazetteer))
+        return gazetteer
+
+    @staticmethod
+    def sydney_suburbs(path, known):
+        # Reads the suburb centroids of the Sydney sales file that the dataset does not already cover.
+        # The file has no postcode or council area, so they are taken from the nearest dataset suburb.
+        sydney = pd.read_csv(path, usecols=['suburb', 'suburb_lat', 'suburb_lng'])
+        sydney['Suburb'] = sydney['suburb'].astype(str).map(normalize_name)
+        sydney = sydney.groupby('Suburb')[['suburb_lat', 'suburb_lng']].mean().reset_index()
+        sydney = sydney[~sydney['Suburb'].isin(known['Suburb'])]
+        if sydney.empty or known.empty:
+            return sydney.iloc[0:0].reindex(columns=known.columns)
+
+        _, nearest = cKDTree(unit_vectors(known['Latitude'], known['Longitude'])).query(unit_vectors(sydney['suburb_lat'], sydney['suburb_lng']))
+        return pd.DataFrame({
+            'Suburb': sydney['Suburb'].values,
+            'Latitude': sydney['suburb_lat'].values,
+            'Longitude': sydney['suburb_lng'].values,
+            'Postcode': known['Postcode'].values[nearest],
+            'CouncilArea': known['CouncilArea'].values[nearest],
+            'City': 'sydney',
+        })
+
+    def lookup(self, latitude, longitude):
+        # Returns the GazetteerEntry of the suburb nearest to a point, or None when no suburb is within GAZETTEER_MAX_KM
+        if self.tree is None:
+            return None
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        chord, i = self.tree.query((math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)))
+        suburbDistance = 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+        if suburbDistance > GAZETTEER_MAX_KM:
+            return None
+
+        city = self.cities[i]
+        center = CITY_CENTERS.get(city)
+        distance = float(haversine_km(center[0], center[1], latitude, longitude)) if center is not None else None
+        return GazetteerEntry(
+            suburb=self.suburbs[i],
+            postcode=self.postcodes[i],
+            council_area=self.councilAreas[i],
+            city=city.title(),
+            distance=distance,
+            center_coordinates=center,
+            suburb_distance=suburbDistance,
+        )
+
+    def lookup_many(self, latitude, longitude):
+        # Vectorized lookup for arrays of points: returns a DataFrame with the Suburb, Postcode, CouncilArea and City
+        # of the nearest suburb centroid and the km to it (SuburbDistance), with no GAZETTEER_MAX_KM cut-off
+        if self.tree is None:
+            raise ValueError("The gazetteer is empty.")
+        chords, positions = self.tree.query(unit_vectors(latitude, longitude))
+        return pd.DataFrame({
+            'Suburb': np.asarray(self.suburbs, dtype=object)[positions],
+            'Postcode': np.asarray(self.postcodes, dtype=object)[positions],
+            'CouncilArea': np.asarray(self.councilAreas, dtype=object)[positions],
+            'City': np.asarray(self.cities, dtype=object)[positions],
+            'SuburbDistance': 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chords / 2, 1.0)),
+        })
+
+    def postcode(self, suburb):
+        # Returns the postcode of a suburb, or None if it is not in the gazetteer
+        return self.postcodeBySuburb.get(normalize_name(suburb))
+
+    def suburbs_in(self, postcode):
+        # Returns the suburbs sharing a postcode
+        return self.suburbsByPostcode.get(str(postcode), [])
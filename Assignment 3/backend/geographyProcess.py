@@ -1,27 +1,321 @@
+import os
 import pandas as pd
 import numpy as np
 import requests
+import httpx
+import asyncio
+import sqlite3
+import threading
+import json
+import time
+import logging
+import weakref
 
+from collections import OrderedDict
+from dataclasses import dataclass
 from geopy import distance
+from metrics import stage, GEOCODE_REQUESTS, GEOCODE_CACHE_LOOKUPS
+from gazetteer import Gazetteer, CITY_CENTERS
 
-# Class to handle geographical data and perform geocoding using external APIs
+logger = logging.getLogger(__name__)
+
+# Nominatim endpoint and client settings. The URL and rate can be overridden by environment, e.g. to point the
+# backend at the local stand-in server used by the load tests (benchmarks/fake_nominatim.py)
+NOMINATIM_URL = os.environ.get("NOMINATIM_URL", "https://nominatim.openstreetmap.org").rstrip("/")
+NOMINATIM_HEADERS = {
+    "User-Agent": "MyGeocodingApp/1.0 (caominh418@gmail.com)"
+}
+NOMINATIM_TIMEOUT = 10.0  # Seconds before a single request is abandoned
+NOMINATIM_RETRIES = 2  # Extra attempts after timeouts, connection errors, 429 and 5xx responses
+NOMINATIM_BACKOFF = 0.5  # Seconds before the first retry, doubled for each following one
+NOMINATIM_RATE = float(os.environ.get("NOMINATIM_RATE", "1.0"))  # Nominatim's usage policy allows at most one request per second
+NOMINATIM_MAX_CONNECTIONS = 10
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Default location and limits of the geocoding cache
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "dataset/geocode_cache.sqlite")
+GEOCODE_CACHE_MEMORY_ENTRIES = 2048
+GEOCODE_CACHE_DISK_ENTRIES = 200000
+GEOCODE_CACHE_TTL = 30 * 24 * 3600  # Addresses rarely move, so positive results are kept for 30 days
+GEOCODE_CACHE_NEGATIVE_TTL = 24 * 3600  # "No results found" answers are retried after a day
+
+# Two-tier cache for Nominatim lookups: an in-process LRU for hot keys backed by an SQLite file that survives restarts.
+# The memory tier and the SQLite tier have separate locks, so a memory lookup never waits behind a disk write.
+# The async lookups answer memory hits on the event loop and run every SQLite read and write in a worker thread.
+class GeocodeCache:
+    _shared = None
+    _sharedLock = threading.Lock()
+    _instances = weakref.WeakSet()
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, memory_entries=GEOCODE_CACHE_MEMORY_ENTRIES, disk_entries=GEOCODE_CACHE_DISK_ENTRIES,
+                 ttl=GEOCODE_CACHE_TTL, negative_ttl=GEOCODE_CACHE_NEGATIVE_TTL):
+        # Opens (or creates) the SQLite tier and sets up the in-memory LRU and hit/miss counters
+        self.memoryEntries = memory_entries
+        self.diskEntries = disk_entries
+        self.ttl = ttl
+        self.negativeTtl = negative_ttl
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()  # Guards the memory tier and the counters
+        self.dbLock = threading.Lock()  # Guards the SQLite connection
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "negative_hits": 0, "evictions": 0}
+
+        self.path = path
+        self.db = None
+        self._connect()
+        GeocodeCache._instances.add(self)
+
+    def _connect(self):
+        # Opens the SQLite tier, creating its table if needed
+        if self.path is not None:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, negative INTEGER NOT NULL, "
+                "expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS geocode_accessed ON geocode (accessed)")
+            self.db.commit()
+
+    @classmethod
+    def reopen_after_fork(cls):
+        # A forked worker (see serve.py) must not share the parent's SQLite connection or a lock another thread held,
+        # so every cache gets fresh locks and a fresh connection in the child; the in-memory entries stay valid
+        for cache in list(cls._instances):
+            cache.lock = threading.Lock()
+            cache.dbLock = threading.Lock()
+            cache._connect()
+
+    @classmethod
+    def shared(cls):
+        # Returns the cache instance shared by every Geography object in this process
+        with cls._sharedLock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def forward_key(address):
+        # Normalizes an address so that case, commas and repeated whitespace do not create separate entries
+        return "forward:" + " ".join(address.replace(",", " ").lower().split())
+
+    @staticmethod
+    def reverse_key(lat, lon, precision=5):
+        # Rounds coordinates (5 decimals is roughly 1 m) so that nearly identical points share an entry
+        return f"reverse:{round(float(lat), precision)},{round(float(lon), precision)}"
+
+    def _count(self, key, result, negative=False):
+        # Updates the counters for one lookup; called with self.lock held
+        self.counters[{"memory_hit": "memory_hits", "disk_hit": "disk_hits", "miss": "misses"}[result]] += 1
+        if negative:
+            self.counters["negative_hits"] += 1
+        GEOCODE_CACHE_LOOKUPS.inc(kind=key.split(":", 1)[0], result=result)
+
+    def get_memory(self, key):
+        # Looks a key up in the memory tier only. Returns (True, value) on a hit and (False, None) otherwise;
+        # a miss is not counted, since the caller goes on to the SQLite tier.
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, negative, expires = entry
+                if expires > now:
+                    self.memory.move_to_end(key)
+                    self._count(key, "memory_hit", negative)
+                    return True, value
+                del self.memory[key]
+        return False, None
+
+    def get(self, key):
+        # Looks a key up in memory first, then on disk, promoting disk hits into memory
+        # Returns (True, value) on a hit and (False, None) on a miss or an expired entry
+        found, value = self.get_memory(key)
+        if found:
+            return True, value
+
+        if self.db is not None:
+            now = time.time()
+            with self.dbLock:
+                row = self.db.execute("SELECT value, negative, expires FROM geocode WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[2] <= now:
+                    self.db.execute("DELETE FROM geocode WHERE key = ?", (key,))
+                    self.db.commit()
+                    row = None
+                elif row is not None:
+                    self.db.execute("UPDATE geocode SET accessed = ? WHERE key = ?", (now, key))
+                    self.db.commit()
+            if row is not None:
+                value, negative, expires = json.loads(row[0]), bool(row[1]), row[2]
+                with self.lock:
+                    self._remember(key, value, negative, expires)
+                    self._count(key, "disk_hit", negative)
+                return True, value
+
+        with self.lock:
+            self._count(key, "miss")
+        return False, None
+
+    def set(self, key, value, negative=False):
+        # Stores a value in both tiers; negative entries ("No results found") use the shorter negative TTL
+        now = time.time()
+        expires = now + (self.negativeTtl if negative else self.ttl)
+        with self.lock:
+            self._remember(key, value, negative, expires)
+
+        if self.db is not None:
+            with self.dbLock:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO geocode (key, value, negative, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(value), int(negative), expires, now)
+                )
+                excess = self.db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0] - self.diskEntries
+                if excess > 0:
+                    # Evict the least recently accessed rows once the disk tier is over its size limit
+                    self.db.execute(
+                        "DELETE FROM geocode WHERE key IN (SELECT key FROM geocode ORDER BY accessed LIMIT ?)", (excess,)
+                    )
+                self.db.commit()
+            if excess > 0:
+                with self.lock:
+                    self.counters["evictions"] += excess
+
+    async def get_async(self, key):
+        # get for the event loop: memory hits are answered directly, the SQLite tier is read in a worker thread
+        found, value = self.get_memory(key)
+        if found:
+            return True, value
+        if self.db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key, value, negative=False):
+        # set for the event loop: the SQLite write and commit run in a worker thread
+        if self.db is None:
+            self.set(key, value, negative)
+        else:
+            await asyncio.to_thread(self.set, key, value, negative)
+
+    def _remember(self, key, value, negative, expires):
+        # Inserts into the in-memory LRU and drops the least recently used keys beyond the memory limit;
+        # called with self.lock held
+        self.memory[key] = (value, negative, expires)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memoryEntries:
+            self.memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def stats(self):
+        # Returns the hit/miss counters together with the current size of each tier
+        with self.lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self.memory)
+        with self.dbLock:
+            stats["disk_entries"] = self.db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0] if self.db is not None else 0
+        return stats
+
+    def clear(self):
+        # Empties both tiers
+        with self.lock:
+            self.memory.clear()
+        if self.db is not None:
+            with self.dbLock:
+                self.db.execute("DELETE FROM geocode")
+                self.db.commit()
+
+if hasattr(os, "register_at_fork"):  # Not available on Windows
+    os.register_at_fork(after_in_child=GeocodeCache.reopen_after_fork)
+
+# Token bucket that spaces requests to an external service across all threads and coroutines in the process.
+# A caller reserves the next token under a lock and then waits until it is due, so sync and async callers share one
+# schedule and are served in arrival order.
+class TokenBucket:
+    def __init__(self, rate=NOMINATIM_RATE, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token, possibly one that only becomes available later, and returns the seconds to wait for it
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire_sync(self):
+        # Blocks the calling thread until its token is due
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self):
+        # Waits without blocking the event loop until the caller's token is due
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# Immutable record of everything the model needs to know about a geocoded address
+@dataclass(frozen=True)
+class GeocodeResult:
+    address: str
+    latitude: float
+    longitude: float
+    suburb: str
+    city: str
+    council_area: str
+    postcode: str
+    distance: float
+    center_coordinates: tuple
+
+    @property
+    def coordinates(self):
+        # Returns the coordinates in the [lat, lon] order used by the rest of the backend
+        return [self.latitude, self.longitude]
+
+# Class to handle geographical data and perform geocoding using external APIs.
+# Nominatim is only asked for the coordinates of an address; suburb, city, council area, postcode and the distance to
+# the CBD come from the local gazetteer, with the display name parsed as a fallback for points outside it.
 class Geography:
-    def __init__(self):
-        # Initializes the central addresses for Melbourne and Sydney
-        self.melbourneCenterAddress = "Melbourne CBD, Victoria, Australia" 
-        self.sydneyCenterAddress = "Sydney CBD, New South Wales, Australia" 
+    # Connection pool shared by the async lookups, and the rate limiter shared by every Nominatim request in the process
+    _async_client = None
+    rateLimiter = TokenBucket()
+
+    def __init__(self, cache=None, gazetteer=None):
+        # Uses the geocoding cache and gazetteer shared by the process unless others are given
+        self.cache = cache if cache is not None else GeocodeCache.shared()
+        self._gazetteer = gazetteer
+
+    @property
+    def gazetteer(self):
+        # The shared gazetteer is built on first use, so creating a Geography object stays cheap
+        if self._gazetteer is None:
+            self._gazetteer = Gazetteer.shared()
+        return self._gazetteer
+
+    @staticmethod
+    def request(kind, url):
+        # Sends one synchronous request to Nominatim, counting it by kind ("search" or "reverse") and outcome.
+        # Waits for the rate limiter shared with the async lookups first, so batch geocoding stays within the usage policy.
+        Geography.rateLimiter.acquire_sync()
+        try:
+            with stage("nominatim"):
+                response = requests.get(url, headers=NOMINATIM_HEADERS, timeout=NOMINATIM_TIMEOUT)
+        except requests.RequestException:
+            GEOCODE_REQUESTS.inc(kind=kind, outcome="transport_error")
+            raise
+        GEOCODE_REQUESTS.inc(kind=kind, outcome="ok" if response.status_code == 200 else "error")
+        return response
 
     def get_address_attributes(self, address):
         # Sends a request to the Nominatim API to retrieve address details in JSON format
         address = address.replace(",", "")
         address = address.replace(" ", "+")
-        url = f"https://nominatim.openstreetmap.org/search.php?q={address}&format=jsonv2"
+        url = f"{NOMINATIM_URL}/search.php?q={address}&format=jsonv2"
 
-        headers = {
-            "User-Agent": "MyGeocodingApp/1.0 (caominh418@gmail.com)"  
-        }
-
-        response = requests.get(url, headers=headers)
+        response = self.request("search", url)
 
         if response.status_code == 200:
             if response:
@@ -30,137 +324,285 @@ class Geography:
                 return "No results found for the given address."
         else:
             return f"Error: Request failed with status code {response.status_code}"
+
+    def search(self, address):
+        # Returns the list of Nominatim search results for an address, answering from the cache when possible
+        # Empty results are cached as negative entries; request failures are returned as error strings and not cached
+        key = GeocodeCache.forward_key(address)
+        found, data = self.cache.get(key)
+        if found:
+            return data
+
+        response = self.get_address_attributes(address)
+        if isinstance(response, str):
+            return response
+        if response.status_code != 200:
+            return f"Error: Request failed with status code {response.status_code}"
+
+        data = response.json()
+        self.cache.set(key, data, negative=not data)
+        return data
         
     def get_coordinates(self, address):
         # Gets latitude and longitude coordinates of an address using the Nominatim API
-        response = self.get_address_attributes(address)
+        data = self.search(address)
 
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                coordinates = [data[0]["lat"], data[0]["lon"]]
-                return coordinates
-            else:
-                return "No results found for the given address."
+        if isinstance(data, str):
+            return data
+        if data:
+            coordinates = [data[0]["lat"], data[0]["lon"]]
+            return coordinates
         else:
-            return f"Error: Request failed with status code {response.status_code}"
+            return "No results found for the given address."
         
     def get_suburb(self, address):
-        # Retrieves the suburb name from an address using the Nominatim API
-        response = self.get_address_attributes(address)
+        # Returns the suburb name of an address, resolved locally from its coordinates where the gazetteer covers them
+        location = self.resolve(address)
+        if isinstance(location, str):
+            return location
+        return location.suburb
 
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                suburb = data[0]["display_name"].split(",")[1]
-                return suburb
-            else:
-                return "No results found for the given address."
-        else:
-            return f"Error: Request failed with status code {response.status_code}"
-        
     def get_city(self, address):
-        # Identifies the city (Sydney or Melbourne) from an address using the Nominatim API
-        response = self.get_address_attributes(address)
+        # Returns the city (Sydney or Melbourne) of an address, resolved like get_suburb
+        location = self.resolve(address)
+        if isinstance(location, str):
+            return location
+        return location.city
 
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                parts = data[0]["display_name"].split(",")
-                city = None
-                for part in parts:
-                    part = part.strip()  # Clean up whitespace
-                    if part.lower() == "sydney" or part.lower() == "melbourne":
-                        city = part
-                        break  # Stop once the city is found
-                return city if city else "City not found."
-            else:
-                return "No results found for the given address."
-        else:
-            return f"Error: Request failed with status code {response.status_code}"
-
-        
     def get_council_area(self, address):
-        # Retrieves the council area from an address using the Nominatim API
-        response = self.get_address_attributes(address)
+        # Returns the council area of an address, resolved like get_suburb
+        location = self.resolve(address)
+        if isinstance(location, str):
+            return location
+        return location.council_area
 
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                council_area = data[0]["display_name"].split(",")[3]
-                return council_area
-            else:
-                return "No results found for the given address."
-        else:
-            return f"Error: Request failed with status code {response.status_code}"
-        
     def get_postcode(self, address):
-        # Extracts the postal code from an address using the Nominatim API
-        response = self.get_address_attributes(address)
+        # Returns the postal code of an address, resolved like get_suburb
+        location = self.resolve(address)
+        if isinstance(location, str):
+            return location
+        return location.postcode
 
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                parts = data[0]["display_name"].split(",")
-                postcode = None
-                for part in parts:
-                    part = part.strip()  
-                    if part.isdigit() and len(part) == 4:  # Check for a 4-digit postal code
-                        postcode = part  
-                        break  
-                return postcode if postcode else "Postal code not found."
-            else:
-                return "No results found for the given address."
-        else:
-            return f"Error: Request failed with status code {response.status_code}"
+    @staticmethod
+    def parse_suburb(displayName):
+        # Takes the suburb from the second comma-separated part of a Nominatim display name
+        return displayName.split(",")[1]
+
+    @staticmethod
+    def parse_city(displayName):
+        # Finds Sydney or Melbourne among the parts of a Nominatim display name
+        for part in displayName.split(","):
+            part = part.strip()  # Clean up whitespace
+            if part.lower() == "sydney" or part.lower() == "melbourne":
+                return part
+        return "City not found."
+
+    @staticmethod
+    def parse_council_area(displayName):
+        # Takes the council area from the fourth comma-separated part of a Nominatim display name
+        return displayName.split(",")[3]
+
+    @staticmethod
+    def parse_postcode(displayName):
+        # Finds the 4-digit postal code among the parts of a Nominatim display name
+        for part in displayName.split(","):
+            part = part.strip()
+            if part.isdigit() and len(part) == 4:
+                return part
+        return "Postal code not found."
+
+    def get_center_coordinates(self, city):
+        # Returns the coordinates of a city centre (Melbourne or Sydney CBD)
+        return CITY_CENTERS.get(city.strip().lower(), "No results found for the given address.")
 
-                
     def get_melbourne_center_coordinates(self):
         # Returns the coordinates of Melbourne's city center
-        coor = self.get_coordinates(self.melbourneCenterAddress)
-        return coor
+        return self.get_center_coordinates("melbourne")
     
     def get_sydney_center_coordinates(self):
         # Returns the coordinates of Sydney's city center
-        coor = self.get_coordinates(self.sydneyCenterAddress)
-        return coor
+        return self.get_center_coordinates("sydney")
 
     def get_distance(self, address):
         # Calculates the distance between the given address and the city center (Melbourne or Sydney)
-        addressCity = self.get_city(address)
-        addressCity = addressCity.replace(" ", "")
-        addressSearchCoor = self.get_coordinates(address)
+        location = self.resolve(address)
+        if isinstance(location, str):
+            return None
+        return location.distance
 
-        if addressCity == "Melbourne":
-            centerAddress = self.get_melbourne_center_coordinates()
-            return distance.distance(centerAddress, addressSearchCoor).km 
-        
-        elif addressCity == "Sydney":
-            centerAddress = self.get_sydney_center_coordinates()
-            return distance.distance(centerAddress, addressSearchCoor).km
+    def resolve(self, address):
+        # Geocodes an address with a single Nominatim request and parses every attribute the model needs
+        # (coordinates, suburb, city, council area, postcode and distance to the CBD) into one GeocodeResult
+        data = self.search(address)
+
+        if isinstance(data, str):
+            return data
+        if not data:
+            return "No results found for the given address."
+
+        return self.parse_result(address, data[0])
+
+    def parse_result(self, address, place):
+        # Builds a GeocodeResult from one Nominatim search result.
+        # Only its coordinates are used when they fall within the gazetteer; otherwise the display name is parsed.
+        displayName = place["display_name"]
+        latitude, longitude = float(place["lat"]), float(place["lon"])
+
+        entry = self.gazetteer.lookup(latitude, longitude)
+        if entry is not None and entry.distance is not None:
+            return GeocodeResult(
+                address=address,
+                latitude=latitude,
+                longitude=longitude,
+                suburb=entry.suburb,
+                city=entry.city,
+                council_area=entry.council_area,
+                postcode=entry.postcode,
+                distance=entry.distance,
+                center_coordinates=entry.center_coordinates
+            )
+
+        city = self.parse_city(displayName)
+
+        centerCoordinates = None
+        addressDistance = None
+        if city.lower() in CITY_CENTERS:
+            centerCoordinates = self.get_center_coordinates(city)
+            addressDistance = distance.distance(centerCoordinates, (latitude, longitude)).km
+
+        return GeocodeResult(
+            address=address,
+            latitude=latitude,
+            longitude=longitude,
+            suburb=self.parse_suburb(displayName),
+            city=city,
+            council_area=self.parse_council_area(displayName),
+            postcode=self.parse_postcode(displayName),
+            distance=addressDistance,
+            center_coordinates=centerCoordinates
+        )
         
     def address(self, lat, lon):
         # Uses reverse geocoding to get an address from latitude and longitude coordinates
+        # Results, including "Unknown" answers, are cached by rounded coordinates
         try:
             lat = float(lat)
             lon = float(lon)
+
+            key = GeocodeCache.reverse_key(lat, lon)
+            found, displayName = self.cache.get(key)
+            if found:
+                return displayName
             
-            url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=jsonv2"
-            headers = {
-                "User-Agent": "MyGeocodingApp/1.0 (caominh418@gmail.com)"  
-            }
+            url = f"{NOMINATIM_URL}/reverse?lat={lat}&lon={lon}&format=jsonv2"
 
-            response = requests.get(url, headers=headers)
+            response = self.request("reverse", url)
 
             if response.status_code == 200:
                 data = response.json()
                 if data and 'display_name' in data:
+                    self.cache.set(key, data['display_name'])
                     return data['display_name']
                 else:
+                    self.cache.set(key, "Unknown", negative=True)
                     return "Unknown"
             else:
                 return f"Error: Request failed with status code {response.status_code}"
 
         except Exception as e:
-            print(f"Error retrieving address: {e}")
+            logger.warning("Error retrieving address: %s", e)
             return "Unknown"
+
+    def cached_address(self, lat, lon):
+        # Returns the reverse-geocoded address of a point if it is in the cache, or None, without querying Nominatim
+        found, displayName = self.cache.get(GeocodeCache.reverse_key(lat, lon))
+        return displayName if found else None
+
+    @classmethod
+    def get_async_client(cls):
+        # Returns the pooled HTTP client used by the async lookups, creating it on first use
+        if cls._async_client is None:
+            cls._async_client = httpx.AsyncClient(
+                base_url=NOMINATIM_URL,
+                headers=NOMINATIM_HEADERS,
+                timeout=NOMINATIM_TIMEOUT,
+                limits=httpx.Limits(max_connections=NOMINATIM_MAX_CONNECTIONS, max_keepalive_connections=NOMINATIM_MAX_CONNECTIONS)
+            )
+        return cls._async_client
+
+    @classmethod
+    async def close_async_client(cls):
+        # Closes the pooled HTTP client, typically from the API shutdown hook
+        if cls._async_client is not None:
+            await cls._async_client.aclose()
+            cls._async_client = None
+
+    async def request_json_async(self, path, params):
+        # Sends a rate-limited GET to Nominatim and returns the decoded JSON, retrying timeouts, connection errors,
+        # 429 and 5xx responses with exponential backoff. Returns an error string once the retries are used up.
+        client = self.get_async_client()
+        kind = path.strip("/").split(".")[0]
+        error = None
+        for attempt in range(NOMINATIM_RETRIES + 1):
+            if attempt > 0:
+                await asyncio.sleep(NOMINATIM_BACKOFF * 2 ** (attempt - 1))
+            await Geography.rateLimiter.acquire()
+            try:
+                with stage("nominatim"):
+                    response = await client.get(path, params=params)
+            except httpx.TransportError as e:
+                GEOCODE_REQUESTS.inc(kind=kind, outcome="transport_error")
+                error = f"Error: Request failed ({type(e).__name__})"
+                continue
+
+            GEOCODE_REQUESTS.inc(kind=kind, outcome="ok" if response.status_code == 200 else "error")
+            if response.status_code == 200:
+                return response.json()
+            error = f"Error: Request failed with status code {response.status_code}"
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+        return error
+
+    async def search_async(self, address):
+        # Async version of search: answers from the cache or queries Nominatim through the shared client
+        key = GeocodeCache.forward_key(address)
+        found, data = await self.cache.get_async(key)
+        if found:
+            return data
+
+        data = await self.request_json_async("/search.php", {"q": address.replace(",", ""), "format": "jsonv2"})
+        if isinstance(data, str):
+            return data
+
+        await self.cache.set_async(key, data, negative=not data)
+        return data
+
+    async def resolve_async(self, address):
+        # Async version of resolve; the event loop stays free while Nominatim answers
+        data = await self.search_async(address)
+
+        if isinstance(data, str):
+            return data
+        if not data:
+            return "No results found for the given address."
+
+        return self.parse_result(address, data[0])
+
+    async def address_async(self, lat, lon):
+        # Async version of address (reverse geocoding)
+        lat = float(lat)
+        lon = float(lon)
+
+        key = GeocodeCache.reverse_key(lat, lon)
+        found, displayName = await self.cache.get_async(key)
+        if found:
+            return displayName
+
+        data = await self.request_json_async("/reverse", {"lat": lat, "lon": lon, "format": "jsonv2"})
+        if isinstance(data, str):
+            return data
+        if data and 'display_name' in data:
+            await self.cache.set_async(key, data['display_name'])
+            return data['display_name']
+        await self.cache.set_async(key, "Unknown", negative=True)
+        return "Unknown"
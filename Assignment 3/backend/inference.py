@@ -0,0 +1,129 @@
+import os
+import copy
+import json
+import threading
+import numpy as np
+
+# XGBoost threads per worker process. One thread is fastest for single rows and avoids oversubscribing the
+# cores when several uvicorn workers run side by side.
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "1"))
+
+# Whether to also export the trees to flat arrays and traverse them with NumPy instead of calling XGBoost
+INFERENCE_FLATTEN = os.environ.get("INFERENCE_FLATTEN", "0") == "1"
+
+
+# Low-latency predictor around the raw XGBoost Booster.
+# Skips the sklearn wrapper and DMatrix construction by running in-place prediction on a reusable float32 buffer.
+class BoosterPredictor:
+    def __init__(self, model, nthread=INFERENCE_THREADS, flatten=INFERENCE_FLATTEN):
+        # A private copy, so pinning its threads leaves the model's own Booster (used by batch prediction, the
+        # explainer and training) on its default thread count
+        self.booster = copy.copy(model.get_booster())
+        self.booster.set_param({"nthread": nthread})
+        self.n_features = self.booster.num_features()
+        self.flat = FlatForest.from_booster(self.booster) if flatten else None
+        self._buffers = threading.local()
+
+    def _row_buffer(self):
+        # Each thread gets its own contiguous 1 x n_features float32 buffer
+        buffer = getattr(self._buffers, "row", None)
+        if buffer is None:
+            buffer = np.empty((1, self.n_features), dtype=np.float32)
+            self._buffers.row = buffer
+        return buffer
+
+    def predict_one(self, row):
+        # Predicts a single (scaled) feature row and returns the prediction as a float
+        buffer = self._row_buffer()
+        buffer[0] = row
+        if self.flat is not None:
+            return float(self.flat.predict(buffer)[0])
+        return float(self.booster.inplace_predict(buffer)[0])
+
+    def predict(self, X):
+        # Predicts a (scaled) feature matrix
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.flat is not None:
+            return self.flat.predict(X)
+        return self.booster.inplace_predict(X)
+
+
+# The trees of a Booster exported to flat NumPy arrays.
+# All trees are walked together one level at a time, so a prediction costs max_depth vectorized steps.
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, missing, value, roots, base_score, depth):
+        self.feature = feature  # Split feature of each node, -1 for leaves
+        self.threshold = threshold
+        self.left = left  # Child taken when x < threshold
+        self.right = right
+        self.missing = missing  # Child taken when x is NaN
+        self.value = value  # Leaf values, 0 for split nodes
+        self.roots = roots
+        self.base_score = base_score
+        self.depth = depth
+
+    @classmethod
+    def from_booster(cls, booster):
+        # Parses the JSON tree dump of a regression Booster
+        feature, threshold, left, right, missing, value, roots = [], [], [], [], [], [], []
+        maxDepth = 0
+
+        for dump in booster.get_dump(dump_format="json"):
+            offset = len(feature)
+            nodes = {}
+            stack = [(json.loads(dump), 0)]
+            while stack:
+                node, depth = stack.pop()
+                nodes[node["nodeid"]] = node
+                maxDepth = max(maxDepth, depth)
+                for child in node.get("children", []):
+                    stack.append((child, depth + 1))
+
+            # Node ids are dense within a tree, so they map directly to positions after the offset
+            for nodeId in range(len(nodes)):
+                node = nodes[nodeId]
+                if "leaf" in node:
+                    feature.append(-1)
+                    threshold.append(0.0)
+                    left.append(offset + nodeId)
+                    right.append(offset + nodeId)
+                    missing.append(offset + nodeId)
+                    value.append(node["leaf"])
+                else:
+                    feature.append(int(str(node["split"]).lstrip("f")))
+                    threshold.append(node["split_condition"])
+                    left.append(offset + node["yes"])
+                    right.append(offset + node["no"])
+                    missing.append(offset + node["missing"])
+                    value.append(0.0)
+            roots.append(offset)
+
+        config = json.loads(booster.save_config())
+        baseScore = float(str(config["learner"]["learner_model_param"]["base_score"]).strip("[]"))
+
+        return cls(
+            feature=np.array(feature, dtype=np.int32),
+            threshold=np.array(threshold, dtype=np.float32),
+            left=np.array(left, dtype=np.int32),
+            right=np.array(right, dtype=np.int32),
+            missing=np.array(missing, dtype=np.int32),
+            value=np.array(value, dtype=np.float32),
+            roots=np.array(roots, dtype=np.int32),
+            base_score=baseScore,
+            depth=maxDepth
+        )
+
+    def predict(self, X):
+        # Walks every tree for every row and sums the leaf values
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+
+        for _ in range(self.depth):
+            feature = self.feature[nodes]
+            values = X[rows, np.maximum(feature, 0)]
+            nextNodes = np.where(values < self.threshold[nodes], self.left[nodes], self.right[nodes])
+            nextNodes = np.where(np.isnan(values), self.missing[nodes], nextNodes)
+            nodes = np.where(feature < 0, nodes, nextNodes)
+
+        return self.value[nodes].sum(axis=1, dtype=np.float32) + np.float32(self.base_score)
@@ -0,0 +1,236 @@
+import os
+import re
+import csv
+import asyncio
+import bisect
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from datetime import date as Date
+
+logger = logging.getLogger(__name__)
+
+# Published macro-economic series: the RBA cash rate target (daily, dd/mm/yyyy) and the ABS residential property
+# price indexes (quarterly, one column per index and city, below the ABS header rows)
+CASH_RATE_PATH = os.path.join("..", "..", "Assignment 2", "Dataset", "cash_rate_melbourne.csv")
+PROPERTY_INDEX_PATH = os.path.join("..", "..", "Assignment 2", "Dataset", "property_index_Q4_2021.csv")
+
+# Model columns filled from the property index file, and the index names they are read from
+PROPERTY_INDEX_COLUMNS = {
+    "Residential Property Price Index": "Residential Property Price Index",
+    "Attached Dwellings Price Index": "Attached Dwellings Price Index",
+}
+
+# A quarterly index value applies from this many months before the end of its quarter, counted from the day after
+# the quarter ends. With three months a value covers the quarter it measures (the Jun-2016 value applies from 1 April
+# to 30 June 2016), and the last published value is held after its quarter ends.
+PROPERTY_INDEX_LEAD_MONTHS = 3
+
+# Cities without their own index use this one's, as the model did before the series were loaded
+MACRO_DEFAULT_CITY = "melbourne"
+
+# Seconds between checks for updated series files; 0 disables the watcher
+MACRO_WATCH_INTERVAL = 300
+
+# Values used when the series files are not available: the cash rate and Q4 2021 indexes the model was served with
+MACRO_FALLBACK = {
+    "CashRate": 0.1,
+    "melbourne": {"Residential Property Price Index": 185.7, "Attached Dwellings Price Index": 144.4},
+    "sydney": {"Residential Property Price Index": 218.7, "Attached Dwellings Price Index": 179.4},
+}
+
+# Offset between proleptic Gregorian ordinals and NumPy day numbers (days since 1970-01-01)
+EPOCH_ORDINAL = Date(1970, 1, 1).toordinal()
+
+
+def normalize_city(city):
+    # Lower-cases a city name and removes spaces, as done for the city encoder classes
+    return str(city).lower().replace(" ", "")
+
+
+def day_numbers(dates):
+    # Converts dates (datetime64 values, strings or date objects) into int64 ordinals
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+
+
+# One time series as two sorted arrays: the day (proleptic ordinal) from which each value applies, and the values.
+# A lookup returns the value in force on a day, i.e. the last one starting on or before it; days before the first
+# observation get the first value.
+class MacroSeries:
+    def __init__(self, days, values):
+        order = np.argsort(days, kind="stable")
+        self.days = np.asarray(days, dtype=np.int64)[order]
+        self.values = np.asarray(values, dtype=np.float64)[order]
+        self._days = self.days.tolist()
+        self._values = self.values.tolist()
+
+    def __len__(self):
+        return len(self.days)
+
+    def at(self, day):
+        # Value in force on one day, by binary search over the start days
+        return self._values[max(bisect.bisect_right(self._days, day) - 1, 0)]
+
+    def at_many(self, days):
+        # Values in force on an array of days, with one vectorized binary search
+        positions = np.searchsorted(self.days, np.asarray(days, dtype=np.int64), side="right") - 1
+        return self.values[np.maximum(positions, 0)]
+
+    @classmethod
+    def constant(cls, value):
+        return cls([Date(1900, 1, 1).toordinal()], [value])
+
+
+# As-of-date lookups of the macro-economic model inputs (CashRate and the property price indexes) for any city.
+# The series are parsed once into sorted arrays; refresh_if_changed re-reads them when the files change, so new
+# observations reach the API without a redeploy.
+class MacroFeatureStore:
+    _shared = None
+    _sharedLock = threading.Lock()
+
+    def __init__(self, cash_rate, indexes, signature=None):
+        # cash_rate is a MacroSeries; indexes maps model column -> {city: MacroSeries}
+        self.cashRate = cash_rate
+        self.indexes = indexes
+        self.signature = signature
+
+    @staticmethod
+    def file_signature(cash_rate_path, property_index_path):
+        # Size and modification time of both files, or None if either is missing
+        try:
+            return tuple((os.path.getsize(path), os.stat(path).st_mtime_ns) for path in (cash_rate_path, property_index_path))
+        except OSError:
+            return None
+
+    @classmethod
+    def load(cls, cash_rate_path=CASH_RATE_PATH, property_index_path=PROPERTY_INDEX_PATH):
+        # Parses both series files
+        signature = cls.file_signature(cash_rate_path, property_index_path)
+        return cls(cls.read_cash_rate(cash_rate_path), cls.read_property_indexes(property_index_path), signature)
+
+    @classmethod
+    def fallback(cls):
+        # Store answering the constant values the API used before the series were loaded
+        indexes = {
+            column: {city: MacroSeries.constant(MACRO_FALLBACK[city][column]) for city in ("melbourne", "sydney")}
+            for column in PROPERTY_INDEX_COLUMNS
+        }
+        return cls(MacroSeries.constant(MACRO_FALLBACK["CashRate"]), indexes)
+
+    @staticmethod
+    def read_cash_rate(path):
+        data = pd.read_csv(path, usecols=["date", "value"])
+        data = data.dropna()
+        days = day_numbers(pd.to_datetime(data["date"], format="%d/%m/%Y").values)
+        return MacroSeries(days, data["value"].astype(float).values)
+
+    @staticmethod
+    def read_property_indexes(path):
+        # Reads the ABS table: the first row names each column "<index> ;  <city> ;", the rows up to "Series ID" are
+        # metadata, and each following row is a quarter such as "Mar-2002" with empty cells before a series starts
+        with open(path, newline="", encoding="latin-1") as file:
+            rows = list(csv.reader(file))
+        header = rows[0]
+        start = next(i for i, row in enumerate(rows) if row and row[0].strip() == "Series ID") + 1
+
+        quarters = []
+        for row in rows[start:]:
+            if not row or not row[0].strip():
+                continue
+            # "Jun-2016" parses to the 1st of the quarter's last month; the quarter ends on the last day of that month
+            quarterEnd = pd.Timestamp(pd.to_datetime(row[0].strip(), format="%b-%Y")) + pd.offsets.MonthEnd(0)
+            applies = (quarterEnd + pd.Timedelta(days=1) - pd.DateOffset(months=PROPERTY_INDEX_LEAD_MONTHS)).date().toordinal()
+            quarters.append((applies, row))
+
+        indexes = {column: {} for column in PROPERTY_INDEX_COLUMNS}
+        for position, name in enumerate(header):
+            match = re.match(r"\s*(.+?)\s*;\s*(.+?)\s*;", name)
+            if match is None:
+                continue
+            column = next((column for column, index in PROPERTY_INDEX_COLUMNS.items() if index == match.group(1)), None)
+            if column is None:
+                continue
+            observations = [(applies, float(row[position])) for applies, row in quarters if position < len(row) and row[position].strip()]
+            if observations:
+                days, values = zip(*observations)
+                indexes[column][normalize_city(match.group(2))] = MacroSeries(days, values)
+
+        for column, cities in indexes.items():
+            if MACRO_DEFAULT_CITY not in cities:
+                raise ValueError(f"{path} has no {column} for {MACRO_DEFAULT_CITY}.")
+        return indexes
+
+    @classmethod
+    def shared(cls):
+        # Returns the store shared by the process, loading the series on first use.
+        # Without the series files it falls back to the constants the model was served with before.
+        store = cls._shared
+        if store is not None:
+            return store
+        with cls._sharedLock:
+            if cls._shared is None:
+                try:
+                    cls._shared = cls.load()
+                except (OSError, KeyError, ValueError) as e:
+                    logger.warning("Macro series unavailable, using fixed values: %s", e)
+                    cls._shared = cls.fallback()
+            return cls._shared
+
+    @classmethod
+    def refresh_if_changed(cls):
+        # Reloads the shared store when the series files changed, swapping a single reference so that lookups in
+        # progress finish on the old arrays. Returns True if a reload happened.
+        current = cls.shared()
+        signature = cls.file_signature(CASH_RATE_PATH, PROPERTY_INDEX_PATH)
+        if signature is None or signature == current.signature:
+            return False
+        store = cls.load()
+        with cls._sharedLock:
+            cls._shared = store
+        logger.info("Reloaded macro series; cash rate up to %s.", Date.fromordinal(int(store.cashRate.days[-1])))
+        return True
+
+    @classmethod
+    async def watch(cls, interval=MACRO_WATCH_INTERVAL):
+        # Polls the series files and reloads them when they change. Meant to run as a background task.
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(cls.refresh_if_changed)
+            except Exception as e:
+                logger.exception("Error reloading macro series: %s", e)
+
+    def city_series(self, column, city):
+        cities = self.indexes[column]
+        return cities.get(city, cities[MACRO_DEFAULT_CITY])
+
+    def features(self, city, date):
+        # Returns (CashRate, residential index, attached dwellings index) in force in a city on a date
+        day = date.toordinal()
+        city = normalize_city(city)
+        return (
+            self.cashRate.at(day),
+            self.city_series("Residential Property Price Index", city).at(day),
+            self.city_series("Attached Dwellings Price Index", city).at(day),
+        )
+
+    def features_many(self, cities, days):
+        # Vectorized features: cities is an array of normalized city names and days an array of ordinals
+        # (see day_numbers). Returns {model column: values}.
+        cities = np.asarray(cities).astype(str)
+        days = np.asarray(days, dtype=np.int64)
+        columns = {"CashRate": self.cashRate.at_many(days)}
+        for column in PROPERTY_INDEX_COLUMNS:
+            values = np.empty(len(days))
+            known = np.zeros(len(days), dtype=bool)
+            for city in np.unique(cities):
+                if city in self.indexes[column]:
+                    mask = cities == city
+                    values[mask] = self.indexes[column][city].at_many(days[mask])
+                    known |= mask
+            values[~known] = self.indexes[column][MACRO_DEFAULT_CITY].at_many(days[~known])
+            columns[column] = values
+        return columns
+
@@ -1,11 +1,69 @@
-from fastapi import FastAPI
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from model import MLmodel
+from geographyProcess import Geography
 from fastapi import HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional, Union
+from explainer import ATTRIBUTION_METHODS
+from featurePipeline import MELBOURNE_TZ
+from responseCache import ResponseCache
+from metrics import MetricsMiddleware, registry, stage
+from structuredLogging import configure_logging
+from processMemory import memory_usage
+from macroFeatures import MacroFeatureStore, MACRO_WATCH_INTERVAL
+from recommendations import RecommendationQuery, RECOMMENDATION_PAGE_SIZE, RECOMMENDATION_MAX_PAGE_SIZE, RECOMMENDATION_STREAM_LIMIT
+
+# Log one JSON object per line unless LOG_FORMAT=text
+configure_logging()
+logger = logging.getLogger("api")
+
+# Instantiate the ML model and the geocoder shared by every request
+model = MLmodel()
+geography = Geography()
+
+# Cache of /predict responses; each key covers the normalized request, the Melbourne date and the model version
+response_cache = ResponseCache()
+
+# Number of rows scored together by /predict/batch before the results are streamed back
+BATCH_CHUNK_SIZE = 1000
+
+# Seconds between checks for retrained artifacts on disk; 0 disables the file watcher
+ARTIFACT_WATCH_INTERVAL = 30
+
+# Load the model artifacts once at startup and optionally watch them for changes
+@asynccontextmanager
+async def lifespan(app):
+    # Workers forked by serve.py start with the artifacts their parent loaded, shared instead of loaded again
+    if not model.artifacts.loaded:
+        await run_in_threadpool(model.load_artifacts)
+    # Build the gazetteer and parse the macro-economic series before the first request instead of during it
+    await run_in_threadpool(lambda: geography.gazetteer)
+    await run_in_threadpool(MacroFeatureStore.shared)
+    watchers = []
+    if ARTIFACT_WATCH_INTERVAL > 0:
+        watchers.append(asyncio.create_task(model.artifacts.watch(ARTIFACT_WATCH_INTERVAL)))
+    if MACRO_WATCH_INTERVAL > 0:
+        watchers.append(asyncio.create_task(MacroFeatureStore.watch(MACRO_WATCH_INTERVAL)))
+    yield
+    for watcher in watchers:
+        watcher.cancel()
+    await Geography.close_async_client()
 
 # Initialize FastAPI application
-app = FastAPI() 
+app = FastAPI(lifespan=lifespan) 
 
 # Configure CORS settings to allow requests from the React frontend
 app.add_middleware(
@@ -14,10 +72,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["Server-Timing"],  # Lets the frontend read the per-stage timings
 )
 
-# Instantiate the ML model
-model = MLmodel()
+# Record per-endpoint latency histograms and attach a Server-Timing header to every response
+app.add_middleware(MetricsMiddleware)
+
+# Gauges refreshed from the response cache counters whenever /metrics is scraped
+RESPONSE_CACHE_GAUGE = registry.gauge("response_cache", "Response cache counters and size", ["stat"])
+PROCESS_MEMORY_GAUGE = registry.gauge("process_memory_bytes", "Resident memory of the worker that answered: rss, pss and uss (unique)", ["pid", "kind"])
 
 # Define the schema for the request body using Pydantic to validate input
 class PredictionRequest(BaseModel):
@@ -28,57 +91,265 @@ class PredictionRequest(BaseModel):
     carpark: int
     buildingArea: float
     landsize: float
+    dateSold: Optional[date] = None  # Sale date the cash rate and price indices are taken for; today if omitted
 
 # Define a root endpoint for basic connection testing
 @app.get("/")
 async def root():
     return {"message": "Welcome to the House Price Prediction API"}
 
+# Endpoint serving the monthly median price series, optionally for one city or suburb
+# The series are serialized once at startup and served with an ETag, so unchanged data costs a 304
+@app.get("/median-price")
+async def median_price(request: Request, city: str = None, suburb: str = None):
+    try:
+        body, etag = model.medianPrices.serialized(city=city, suburb=suburb)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No median prices for the given city or suburb.")
+
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Endpoint exposing the latency histograms and counters in the Prometheus text format
+@app.get("/metrics")
+async def metrics():
+    for name, value in response_cache.stats().items():
+        RESPONSE_CACHE_GAUGE.set(value, stat=name)
+    for kind, value in (memory_usage() or {}).items():
+        PROCESS_MEMORY_GAUGE.set(value, pid=os.getpid(), kind=kind)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# Endpoint to reload the model artifacts, and the macro-economic series if their files changed, without restarting the server
+@app.post("/reload")
+async def reload_artifacts():
+    try:
+        artifacts = await run_in_threadpool(model.artifacts.reload)
+        macroReloaded = await run_in_threadpool(MacroFeatureStore.refresh_if_changed)
+        return {"version": artifacts.version, "loaded_at": artifacts.loaded_at, "macro_reloaded": macroReloaded}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Endpoint to handle POST requests for predicting house price
+# Pass ?explain=false to skip the SHAP values when the client does not display them
+# Identical requests on the same day are answered from the response cache, and concurrent ones share one computation
 @app.post("/predict")
-async def predict_price(data: PredictionRequest):
+async def predict_price(data: PredictionRequest, explain: bool = True):
+    today = datetime.now(MELBOURNE_TZ).date()
+    key = ResponseCache.key(data.model_dump(), explain, today, model.artifacts.current.version, MacroFeatureStore.shared().signature)
+    body = await response_cache.get_or_compute(key, lambda: predict_response(data, explain))
+    return Response(content=body, media_type="application/json")
+
+# Computes a /predict response and serializes it for the response cache
+async def predict_response(data: PredictionRequest, explain: bool):
     try:
+        # Geocode the address once and share the result between prediction and recommendations
+        # Geocoding is awaited and the model runs in the thread pool, so concurrent requests do not block each other
+        with stage("geocode"):
+            location = await geography.resolve_async(data.address)
+
         # Use the data from the JSON request body to make a prediction
-        prediction, distance, propertyCoordinates, centerCoordinates, median_price, shap_df = model.predict(
+        prediction, distance, propertyCoordinates, centerCoordinates, _, shap_df = await run_in_threadpool(
+            model.predict,
             data.address, 
             data.houseType, 
             data.bathrooms, 
             data.bedrooms, 
             data.carpark, 
             data.buildingArea, 
-            data.landsize
+            data.landsize,
+            location=location,
+            explain=explain,
+            date=data.dateSold
         )
         
         error = False
 
-        print(prediction)
         if prediction == "No results found for the given address.":
             error = True
             
         if error == False:    
-            # Get nearby house recommendations based on the prediction
-            recommendation = model.recommend_nearby_houses(data.address, prediction)
+            # Get the first page of nearby house recommendations based on the prediction
+            query = RecommendationQuery(location.longitude, location.latitude, float(prediction), model.artifacts.current.version)
+            recommendation, nextQuery, total = await run_in_threadpool(model.recommendation_page, query, geography=geography)
 
         # Log the prediction and other key data for debugging purposes
-        print(round(float(prediction), 2))
-        print(round(distance, 2))
-        print(propertyCoordinates[0], propertyCoordinates[1])
-        print(centerCoordinates[0], centerCoordinates[1])
+        logger.info("Prediction", extra={
+            "predicted_price": round(float(prediction), 2),
+            "distance": round(distance, 2),
+            "house_location": propertyCoordinates,
+            "city_center_location": centerCoordinates,
+            "recommendations_total": total,
+        })
 
         # Return the prediction results and additional details
-        return {
+        response = {
             "predicted_price": round(float(prediction), 2),
             "distance_between_cities": round(distance, 2),  
             "house_location": {"lat": propertyCoordinates[0], "lng": propertyCoordinates[1]},
             "city_center_location": {"lat": centerCoordinates[0], "lng": centerCoordinates[1]},
-            "median_price": median_price,
-            "recommended_properties": recommendation,
-            "shap_values": shap_df.to_dict(orient="records")  # SHAP values for feature importance
+            "recommended_properties": recommendation_records(recommendation),
+            "recommendations_total": total,
+            "recommendations_next": nextQuery.encode() if nextQuery is not None else None
         }
+        if shap_df is not None:
+            response["shap_values"] = shap_df.to_dict(orient="records")  # SHAP values for feature importance
+        return json.dumps(jsonable_encoder(response), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
     except Exception as e:
         # Return a 500 error if an exception occurs during prediction
+        logger.exception("Prediction failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Serializes a page of recommendations as a list of properties, in ranked order
+def recommendation_records(page):
+    return [
+        {"longitude": row.Longitude, "latitude": row.Latitude, "price": row.Price, "address": row.Address}
+        for row in page.itertuples(index=False)
+    ]
+
+# Decodes a recommendations cursor, rejecting cursors issued before the model artifacts were reloaded
+def recommendation_query(cursor: str):
+    try:
+        query = RecommendationQuery.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if query.version != model.artifacts.current.version:
+        raise HTTPException(status_code=410, detail="The model was updated since this cursor was issued; request a new prediction.")
+    return query
+
+# Endpoint returning the next page of recommendations for the cursor given in a /predict response
+# Each page holds at most `limit` properties, ranked by combined location and price distance
+@app.get("/recommendations")
+async def recommendations(cursor: str, limit: int = RECOMMENDATION_PAGE_SIZE):
+    if not 1 <= limit <= RECOMMENDATION_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {RECOMMENDATION_MAX_PAGE_SIZE}.")
+    query = recommendation_query(cursor)
+    page, nextQuery, total = await run_in_threadpool(model.recommendation_page, query, limit, geography=geography)
+    return {
+        "recommended_properties": recommendation_records(page),
+        "recommendations_total": total,
+        "recommendations_next": nextQuery.encode() if nextQuery is not None else None
+    }
+
+# Yields recommended properties as newline-delimited JSON, one page at a time, until `limit` rows have been sent
+async def stream_recommendations(query, limit):
+    sent = 0
+    while query is not None and sent < limit:
+        pageSize = min(RECOMMENDATION_MAX_PAGE_SIZE, limit - sent)
+        page, query, _ = await run_in_threadpool(model.recommendation_page, query, pageSize, geography=geography)
+        lines = [json.dumps(record, ensure_ascii=False) for record in recommendation_records(page)]
+        sent += len(lines)
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+# Endpoint streaming the recommendations after a cursor as newline-delimited JSON, up to RECOMMENDATION_STREAM_LIMIT rows
+@app.get("/recommendations/stream")
+async def recommendations_stream(cursor: str, limit: int = RECOMMENDATION_STREAM_LIMIT):
+    if not 1 <= limit <= RECOMMENDATION_STREAM_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {RECOMMENDATION_STREAM_LIMIT}.")
+    query = recommendation_query(cursor)
+    return StreamingResponse(stream_recommendations(query, limit), media_type="application/x-ndjson")
+
+# Endpoint to compute SHAP feature attributions for one property or a list of properties
+# method=native uses XGBoost's built-in TreeSHAP; method=shap uses the shap package (same values, slower)
+@app.post("/explain")
+async def explain(data: Union[PredictionRequest, List[PredictionRequest]], method: str = "native"):
+    if method not in ATTRIBUTION_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(ATTRIBUTION_METHODS)}.")
+
+    rows = data if isinstance(data, list) else [data]
+    try:
+        results = await run_in_threadpool(model.explain_many, [row.model_dump() for row in rows], method)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return results if isinstance(data, list) else results[0]
+
+# Yields the decoded lines of a request body as it is uploaded, each with its line ending
+async def upload_lines(request):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        lines = buffer.splitlines(keepends=True)
+        buffer = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+# Yields the rows of a CSV request body as it is uploaded, without buffering the raw file
+# The first line is the header and must use the PredictionRequest field names
+# Lines are joined until their quotes balance, so a quoted field may hold commas and line breaks
+async def csv_rows(request):
+    header = None
+    record = ""
+    async for line in upload_lines(request):
+        record += line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values:
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+        else:
+            yield dict(zip(header, values))
+    # An unterminated quoted field runs to the end of the upload
+    values = next(csv.reader([record]), []) if record else []
+    if values and header is not None:
+        yield dict(zip(header, values))
+
+# Validates rows and scores them chunk by chunk, streaming one JSON line per row back to the client
+async def stream_batch_predictions(rows):
+    index = 0
+    chunk = []
+    chunkIndices = []
+    errors = []
+
+    async def flush():
+        results = await run_in_threadpool(model.predict_many, chunk) if chunk else []
+        predictions = [{"row": i, **result} for i, result in zip(chunkIndices, results)]
+        lines = sorted(predictions + errors, key=lambda item: item["row"])
+        return "".join(json.dumps(line) + "\n" for line in lines)
+
+    for row in rows:
+        try:
+            request = PredictionRequest(**row)
+            chunk.append(request.model_dump())
+            chunkIndices.append(index)
+        except (ValidationError, TypeError) as e:
+            errors.append({"row": index, "error": str(e)})
+        index += 1
+
+        if len(chunk) + len(errors) >= BATCH_CHUNK_SIZE:
+            yield await flush()
+            chunk, chunkIndices, errors = [], [], []
+
+    if chunk or errors:
+        yield await flush()
+
+# Endpoint to predict many properties at once from a JSON array or a CSV upload (Content-Type: text/csv)
+# Results are streamed back as newline-delimited JSON, one object per input row, in chunks of BATCH_CHUNK_SIZE rows
+# The upload is parsed before streaming starts, because a streaming response cannot read the request body
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        rows = [row async for row in csv_rows(request)]
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or a CSV file.")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array of properties.")
+        rows = body
+
+    return StreamingResponse(stream_batch_predictions(rows), media_type="application/x-ndjson")
+
 # Run the application using Uvicorn
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,54 @@
+import json
+import hashlib
+
+from featurePipeline import normalize_name
+
+# Whether to also derive per-city and per-suburb monthly medians from the training dataset at startup
+DERIVE_MEDIANS_FROM_DATASET = True
+
+
+# Monthly median price series, serialized once so that the /median-price endpoint only returns prepared bytes.
+# Each series is a list of [year, month, median price] rows, the format the frontend charts.
+class MedianPrices:
+    def __init__(self, series, by_city=None, by_suburb=None):
+        self.series = series
+        self.byCity = by_city or {}
+        self.bySuburb = by_suburb or {}
+        self._serialized = {}
+        self.serialized()
+
+    @classmethod
+    def load(cls, medianPrice, data=None):
+        # Builds the overall series from median_price.csv and, when the dataset is given, the per-city and
+        # per-suburb series with one groupby each
+        series = medianPrice[['YearSold', 'MonthSold', 'Price']].values.tolist()
+        if data is None:
+            return cls(series)
+        return cls(series, cls.group_medians(data, 'City'), cls.group_medians(data, 'Suburb'))
+
+    @staticmethod
+    def group_medians(data, column):
+        # Returns {normalized name: [[year, month, median price], ...]} for every value of a column, sorted by month
+        medians = data.groupby([column, 'YearSold', 'MonthSold'], sort=True, observed=True)['Price'].median().reset_index()
+        medians['Name'] = medians[column].astype(str).map(normalize_name)
+        values = medians[['YearSold', 'MonthSold', 'Price']].astype(float)
+        return {
+            name: values.loc[rows].values.tolist()
+            for name, rows in medians.groupby('Name', sort=False).groups.items()
+        }
+
+    def serialized(self, city=None, suburb=None):
+        # Returns (body, etag) for the overall series or one city/suburb series; raises KeyError for unknown names
+        key = ("suburb", normalize_name(suburb)) if suburb else ("city", normalize_name(city)) if city else ("all", "")
+        cached = self._serialized.get(key)
+        if cached is None:
+            if key[0] == "suburb":
+                series = self.bySuburb[key[1]]
+            elif key[0] == "city":
+                series = self.byCity[key[1]]
+            else:
+                series = self.series
+            body = json.dumps(series, separators=(",", ":")).encode("utf-8")
+            cached = (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+            self._serialized[key] = cached
+        return cached
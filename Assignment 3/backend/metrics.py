@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+import contextvars
+
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Whether responses carry a Server-Timing header with the duration of each stage of the request
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1") == "1"
+
+
+def format_labels(names, values, extra=None):
+    # Renders a Prometheus label set such as {stage="geocode",le="0.5"}
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = [
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+# Thread-safe counter with labels, rendered in the Prometheus text format
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, format_labels(self.labels, key), value) for key, value in sorted(self.values.items())]
+
+
+# Value that can go up and down, such as the number of cached responses
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self.lock:
+            self.values[key] = value
+
+
+# Cumulative histogram with fixed buckets, one series per label set
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucketCount in zip(self.buckets, counts):
+                    cumulative += bucketCount
+                    samples.append((self.name + "_bucket", format_labels(self.labels, key, [("le", repr(bound))]), cumulative))
+                samples.append((self.name + "_bucket", format_labels(self.labels, key, [("le", "+Inf")]), count))
+                samples.append((self.name + "_sum", format_labels(self.labels, key), total))
+                samples.append((self.name + "_count", format_labels(self.labels, key), count))
+        return samples
+
+
+# Collection of metrics exposed together on /metrics
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        # Returns every metric in the Prometheus text exposition format
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram("stage_duration_seconds", "Time spent in each stage of a request", ["stage"])
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "Time to the first response byte per endpoint", ["method", "path", "status"])
+GEOCODE_REQUESTS = registry.counter("geocode_requests_total", "HTTP requests sent to Nominatim", ["kind", "outcome"])
+GEOCODE_CACHE_LOOKUPS = registry.counter("geocode_cache_lookups_total", "Geocoding cache lookups", ["kind", "result"])
+
+# Stage durations of the current request, collected for its Server-Timing header.
+# The list is shared with the worker threads the request runs code in, since they copy the context.
+_requestTimings = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name):
+    # Times a block of code into the stage histogram and the Server-Timing entries of the current request
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _requestTimings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing(timings, total):
+    # Formats stage durations as a Server-Timing header value; repeated stages (e.g. two geocoding calls) are summed
+    durations = {}
+    for name, elapsed in timings:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in durations.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+# ASGI middleware that records the latency of every HTTP request per route and adds the Server-Timing header.
+# It wraps `send` directly instead of using BaseHTTPMiddleware, so streaming responses and request bodies are untouched.
+class MetricsMiddleware:
+    def __init__(self, app, server_timing_header=SERVER_TIMING):
+        self.app = app
+        self.serverTimingHeader = server_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _requestTimings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                route = scope.get("route")
+                path = getattr(route, "path", "unmatched")
+                REQUEST_SECONDS.observe(elapsed, method=scope["method"], path=path, status=message["status"])
+                if self.serverTimingHeader:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(timings, elapsed).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _requestTimings.reset(token)
@@ -1,27 +1,55 @@
 import pandas as pd
 import numpy as np
 import pytz
-import joblib
 import re
-import shap
+import logging
+import copy
+import argparse
 
 from datetime import datetime
 from custom_encoder import CustomLabelEncoder
 from geographyProcess import Geography
-from sklearn.metrics import mean_squared_error, r2_score, silhouette_score
+from addressIndex import AddressIndex
+from artifacts import ArtifactRegistry
+from clusterTraining import ClusterTrainer, format_reports, DBSCAN_EPS, DBSCAN_MIN_SAMPLES
+from neighbourIndex import NeighbourIndex
+from explainer import Explainer, ATTRIBUTION_METHODS
+from datasetSnapshot import DatasetSnapshot
+from recommendations import RecommendationQuery, rank, RECOMMENDATION_PAGE_SIZE
+from metrics import stage
+from structuredLogging import configure_logging
+from medianPrices import MedianPrices, DERIVE_MEDIANS_FROM_DATASET
+from featurePipeline import COUNCIL_AREA_WORDS, MACRO_COLUMNS, uses_log_postcode, postcode_feature, macro_limits, clamp_macro
+from macroFeatures import MacroFeatureStore, day_numbers
+from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
 from xgboost import XGBRegressor
-from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import euclidean_distances
+
+logger = logging.getLogger(__name__)
+
+# Number of trees added on top of the saved model by an incremental training run
+INCREMENTAL_ROUNDS = 100
+
+# Maps the property types accepted by the API to the codes used in the dataset
+PROPERTY_TYPES = {'house': 'h', 'unit': 'u', 'apartment': 'u', 'townhouse': 't'}
 
 
 class MLmodel:
 
     # Initializes the MLmodel class by loading datasets and configuring the XGBRegressor model with specific hyperparameters.
-    def __init__(self):
-        self.originData = pd.read_csv("dataset/origin_combined_data.csv")
-        self.medianPrice = pd.read_csv("dataset/median_price.csv")
+    # The datasets are opened from their memory-mapped snapshots, which are converted from the CSVs on first use.
+    # `dataset` is the directory of another snapshot to train on, such as the one written by datasetIngest.py.
+    def __init__(self, dataset=None):
+        self.dataset = DatasetSnapshot.open(dataset) if dataset else DatasetSnapshot.load("dataset/origin_combined_data.csv")
+        self.originData = self.dataset.frame()
+        self.medianPrice = DatasetSnapshot.load("dataset/median_price.csv").frame()
+        self.medianPrices = MedianPrices.load(self.medianPrice, self.originData if DERIVE_MEDIANS_FROM_DATASET else None)
+        self.addressIndex = AddressIndex.load()
+        if not len(self.addressIndex):
+            logger.warning("No address index found; recommendations only get addresses already in the geocoding cache. Run addressIndex.py to build it.")
+        self.artifacts = ArtifactRegistry()
+        self.neighbourIndex = None
 
         self.model = XGBRegressor(
             tree_method='auto',
@@ -37,109 +65,130 @@ class MLmodel:
             random_state=42
         )
 
+    def load_artifacts(self):
+        # Loads every trained artifact once, typically from the API startup hook, and builds the neighbour index
+        artifacts = self.artifacts.load()
+        self.get_neighbour_index(artifacts)
+        return artifacts
+
     def train_DBScan(self):
         # Trains a DBSCAN clustering model to group properties based on their geographical coordinates and price.
         # It scales data, applies DBSCAN clustering, calculates the silhouette score if there are enough clusters, 
         # and saves the trained model and scaler for later use.
+        # ClusterTrainer fits DBSCAN on a sample sized to a memory cap, assigns the other rows through the core samples
+        # and samples the silhouette evaluation, so memory stays bounded as the dataset grows.
+        # Also saves a ClusterIndex with the per-row cluster labels and a KD-tree over the core samples,
+        # which recommend_nearby_houses uses to assign new points to clusters without refitting.
 
-        dataTemp = self.originData.copy()
-        dataTemp = dataTemp.drop(columns=['Unnamed: 0']) 
-
-        dataTemp = dataTemp.rename(columns={'Longtitude': 'Longitude', 'Lattitude': 'Latitude'})
-
-        dataTemp = dataTemp[['Longitude', 'Latitude', 'Price']]  
+        dataTemp = self.properties()
 
         dbscanScaler = MinMaxScaler()
         dataScaled = dbscanScaler.fit_transform(dataTemp)
 
-        dbscan = DBSCAN(eps=0.3, min_samples=2)
-        labels = dbscan.fit_predict(dataScaled)
-        dataTemp['Cluster'] = labels
+        dbscan, clusterIndex, report = ClusterTrainer(dataScaled).fit(eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES)
+        dataTemp['Cluster'] = clusterIndex.labels
 
-        core_samples_mask = labels != -1
-        if np.sum(core_samples_mask) > 1:
-                silhouette = silhouette_score(dataScaled[core_samples_mask], labels[core_samples_mask])
-                print(f"DBScan model trained. Silhouette score: {silhouette}")
+        if report["silhouette"] is not None:
+                logger.info("DBScan model trained. Silhouette score: %s", report['silhouette'])
         else:
-                print("Not enough clusters to calculate silhouette score.")
+                logger.info("Not enough clusters to calculate silhouette score.")
+        logger.info("DBSCAN training report\n%s", format_reports([report]))
 
-        joblib.dump(dbscan, 'model/dbscan_model.pkl')
-        joblib.dump(dbscanScaler, 'model/dbscan_scaler.pkl')
+        self.artifacts.publish({
+            "dbscan": dbscan,
+            "dbscan_scaler": dbscanScaler,
+            "cluster_index": clusterIndex,
+        }, manifest={"dbscan_rows": len(dataTemp), "dbscan_fit_rows": report["fit_rows"], "dbscan_eps": DBSCAN_EPS, "dbscan_min_samples": DBSCAN_MIN_SAMPLES, "silhouette": report["silhouette"]})
 
 
-    def recommend_nearby_houses(self, address, price):
+    def recommend_nearby_houses(self, address, price, location=None, limit=RECOMMENDATION_PAGE_SIZE, geography=None):
         # Recommends nearby properties based on the provided address and price.
-        # Uses the DBSCAN model to find properties within the same cluster as the input property.
-        # If the input property is noise (not part of any cluster), it finds the closest properties by distance.
+        # Returns the first page of recommendation_page, i.e. the `limit` properties of the input's DBSCAN cluster
+        # closest in location and price, or the closest properties overall if the input is noise.
+        # An already resolved GeocodeResult can be passed in to avoid geocoding the address again.
 
-        addressDataDBScan = Geography()
+        if geography is None:
+            geography = Geography()
+        if location is None:
+            location = geography.resolve(address)
 
-        coordinates = addressDataDBScan.get_coordinates(address)
-
-        if coordinates == "No results found for the given address.":
+        if isinstance(location, str):
             return "No results found for the given address."
 
-        lat, long = coordinates[0], coordinates[1]
-
-        dbscan = joblib.load('model/dbscan_model.pkl')
-        dbscanScaler = joblib.load('model/dbscan_scaler.pkl')
-
-        input_data = np.array([[long, lat, price]])
-        input_scaled = dbscanScaler.transform(input_data)
-
-        input_label = dbscan.fit_predict(input_scaled)[0]
-
-        if input_label == -1:
-                print("Input data is considered noise. Searching for closest properties.")
-
-                dataTemp = self.originData.copy()
-                dataTemp = dataTemp.drop(columns=['Unnamed: 0'])
-
-                dataTemp = dataTemp.rename(columns={'Longtitude': 'Longitude', 'Lattitude': 'Latitude'})
-
-                dataTemp = dataTemp[['Longitude', 'Latitude', 'Price']]
-                dataScaled = dbscanScaler.transform(dataTemp)
-
-                distances = euclidean_distances(input_scaled, dataScaled)
-                dataTemp['Distance'] = distances[0]
-
-                recommended_closest = dataTemp.sort_values(by='Distance').head(5)
-
-                recommended_closest['Address'] = recommended_closest.apply(
-                        lambda row: addressDataDBScan.address(row['Latitude'], row['Longitude']), axis=1
-                )
-
-                return recommended_closest[['Longitude', 'Latitude', 'Price', 'Address']]
-
-        dataTemp = self.originData.copy()
-        dataTemp = dataTemp.drop(columns=['Unnamed: 0'])
-
-        dataTemp = dataTemp.rename(columns={'Longtitude': 'Longitude', 'Lattitude': 'Latitude'})
-
-        dataTemp = dataTemp[['Longitude', 'Latitude', 'Price']]
-        dataScaled = dbscanScaler.transform(dataTemp)
-        labels = dbscan.fit_predict(dataScaled)
-        dataTemp['Cluster'] = labels
-
-        recommended_houses = dataTemp[dataTemp['Cluster'] == input_label]
-
-        if recommended_houses.empty:
-                print("No similar properties found in the cluster. Searching for closest properties.")
-                distances = euclidean_distances(input_scaled, dataScaled)
-                dataTemp['Distance'] = distances[0]
-                recommended_closest = dataTemp.sort_values(by='Distance').head(5)
-
-                recommended_closest['Address'] = recommended_closest.apply(
-                        lambda row: addressDataDBScan.address(row['Latitude'], row['Longitude']), axis=1
-                )
-
-                return recommended_closest[['Longitude', 'Latitude', 'Price', 'Address']]
-
-        recommended_houses['Address'] = recommended_houses.apply(
-                lambda row: addressDataDBScan.address(row['Latitude'], row['Longitude']), axis=1
-        )
-
-        return recommended_houses[['Longitude', 'Latitude', 'Price', 'Address']]
+        artifacts = self.artifacts.current
+        query = RecommendationQuery(float(location.longitude), float(location.latitude), float(price), artifacts.version)
+        recommended_houses, _, _ = self.recommendation_page(query, limit, artifacts, geography)
+        return recommended_houses
+
+    def recommendation_page(self, query, limit=RECOMMENDATION_PAGE_SIZE, artifacts=None, geography=None):
+        # Returns (page, next query or None, total) for a RecommendationQuery.
+        # Candidates are the members of the cluster the input falls in, ranked by distance in the DBSCAN-scaled
+        # (Longitude, Latitude, Price) space. If the input is noise, the KD-tree returns the offset + limit properties
+        # closest overall instead, so no page scores the whole dataset. Only the returned page is looked up in the
+        # address index.
+
+        if artifacts is None:
+            artifacts = self.artifacts.current
+        if geography is None:
+            geography = Geography()
+
+        with stage("recommend"):
+            neighbours = self.get_neighbour_index(artifacts)
+            point = neighbours.transform([[query.longitude, query.latitude, query.price]])[0]
+
+            input_label = artifacts.cluster_index.predict(point)[0]
+            rows = artifacts.cluster_index.members(input_label) if input_label != -1 else np.array([], dtype=int)
+            rows = rows[rows < len(neighbours)]
+
+            if len(rows):
+                total = len(rows)
+                stop = min(query.offset + limit, total)
+                pageRows = rank(neighbours.scaled, point, rows, stop)[query.offset:] if query.offset < stop else np.array([], dtype=int)
+            else:
+                logger.debug("Input data is considered noise. Returning the closest properties.")
+                total = len(neighbours)
+                stop = min(query.offset + limit, total)
+                closest, _ = neighbours.query(query.longitude, query.latitude, query.price, k=stop)
+                pageRows = closest[query.offset:]
+
+        recommended_houses = self.properties(pageRows)
+        with stage("address_lookup"):
+            recommended_houses['Address'] = self.lookup_addresses(recommended_houses, geography)
+
+        nextQuery = query.advance(len(pageRows)) if stop < total else None
+        return recommended_houses, nextQuery, total
+
+
+    def properties(self, rows=None):
+        # Returns the Longitude, Latitude and Price of the dataset rows at the given positions (all rows by default),
+        # indexed by row position
+        longitude = self.dataset.array('Longtitude')
+        latitude = self.dataset.array('Lattitude')
+        price = self.dataset.array('Price')
+        if rows is None:
+            rows = np.arange(len(self.dataset))
+        else:
+            longitude, latitude, price = longitude[rows], latitude[rows], price[rows]
+        return pd.DataFrame({'Longitude': longitude, 'Latitude': latitude, 'Price': price}, index=rows)
+
+    def get_neighbour_index(self, artifacts):
+        # Returns the KD-tree over the dataset scaled with the active DBSCAN scaler, rebuilding it after a reload
+        neighbourIndex = self.neighbourIndex
+        if neighbourIndex is None or neighbourIndex[0] != artifacts.version:
+            neighbourIndex = (artifacts.version, NeighbourIndex.from_dataframe(self.originData, artifacts.dbscan_scaler))
+            self.neighbourIndex = neighbourIndex
+        return neighbourIndex[1]
+
+    def lookup_addresses(self, houses, geography):
+        # Returns the addresses of the recommended houses from the precomputed address index.
+        # Rows missing from the index (e.g. when it has not been built yet) are answered from the geocoding cache only,
+        # and are None when it has no entry: reverse geocoding them here would hold the thread for a second per row
+        # behind the Nominatim rate limit that forward geocoding also waits on. Build the index with addressIndex.py.
+        addresses = self.addressIndex.lookup_many(houses['Latitude'].values, houses['Longitude'].values)
+        return [
+            address if address is not None else geography.cached_address(lat, lon)
+            for address, lat, lon in zip(addresses, houses['Latitude'].values, houses['Longitude'].values)
+        ]
 
 
     def train(self):
@@ -148,8 +197,6 @@ class MLmodel:
         # and saves the trained model, encoders, and scalers for future predictions.
         # It also prints evaluation metrics for model performance (MSE and R²).
 
-        self.originData = self.originData.drop(columns='Unnamed: 0')
-
         suburb_encoder = CustomLabelEncoder()
         city_encoder = CustomLabelEncoder()
         council_area_encoder = CustomLabelEncoder()
@@ -157,16 +204,15 @@ class MLmodel:
         scaler_X = MinMaxScaler()  
         scaler_y = MinMaxScaler()  
 
-        for i in self.originData.select_dtypes(include='object').columns:
-                self.originData[i] = self.originData[i].str.replace('city', '')
+        data = self.training_frame()
 
-        self.originData['Suburb'] = suburb_encoder.fit_transform(self.originData['Suburb'])
-        self.originData['City'] = city_encoder.fit_transform(self.originData['City'])
-        self.originData['CouncilArea'] = council_area_encoder.fit_transform(self.originData['CouncilArea'])
-        self.originData['Type'] = type_encoder.fit_transform(self.originData['Type'])
+        data['Suburb'] = suburb_encoder.fit_transform(data['Suburb'])
+        data['City'] = city_encoder.fit_transform(data['City'])
+        data['CouncilArea'] = council_area_encoder.fit_transform(data['CouncilArea'])
+        data['Type'] = type_encoder.fit_transform(data['Type'])
 
-        X = self.originData.drop(columns=["Price"])
-        y = self.originData["Price"].values.reshape(-1, 1)
+        X = data.drop(columns=["Price"])
+        y = data["Price"].values.reshape(-1, 1)
 
         X_scaled = scaler_X.fit_transform(X)
         y_scaled = scaler_y.fit_transform(y)
@@ -175,47 +221,139 @@ class MLmodel:
 
         self.model.fit(X_train, y_train.ravel())
 
-        joblib.dump(self.model, 'model/xgb_model.pkl')
-        joblib.dump(suburb_encoder, 'model/suburb_encoder.pkl')
-        joblib.dump(city_encoder, 'model/city_encoder.pkl')
-        joblib.dump(council_area_encoder, 'model/council_area_encoder.pkl')
-        joblib.dump(type_encoder, 'model/type_encoder.pkl')
-        joblib.dump(scaler_X, 'model/scaler_X.pkl')
-        joblib.dump(scaler_y, 'model/scaler_y.pkl')
-
         predictions = self.model.predict(X_test)
         mse = mean_squared_error(y_test, predictions)
         r2 = r2_score(y_test, predictions)
 
-        print(f"Model trained. MSE: {mse}, R²: {r2}")
+        logger.info("Model trained. MSE: %s, R²: %s", mse, r2)
+
+        # The row count lets a later incremental run find the sales added after this training
+        self.artifacts.publish({
+            "model": self.model,
+            "suburb_encoder": suburb_encoder,
+            "city_encoder": city_encoder,
+            "council_area_encoder": council_area_encoder,
+            "type_encoder": type_encoder,
+            "scaler_X": scaler_X,
+            "scaler_y": scaler_y,
+        }, manifest={"mode": "full", "rows": len(data), "mse": float(mse), "r2": float(r2)})
+
+        # Check that the fast native attributions agree with the shap package on the retrained model
+        attributionDifference = Explainer(self.model).max_difference(X_test[:200])
+        logger.info("Max difference between native and shap attributions: %s", attributionDifference)
+
+
+    def training_frame(self, rows=None):
+        # Returns the dataset rows at the given positions (all rows by default) with the text columns decoded.
+        # The text columns are dictionary-encoded in the snapshot, so 'city' is removed once per category.
+        # Missing text values stay missing, and the encoders give them the '<unknown>' code.
+        data = self.dataset.frame()
+        if rows is not None:
+            data = data.iloc[rows].reset_index(drop=True)
+        for i in self.dataset.categories:
+                categories = pd.Series(self.dataset.categories[i]).str.replace('city', '').values
+                data[i] = self.dataset.decode(i, rows, categories)
+        return data
+
+    def train_incremental(self, since=None, rounds=INCREMENTAL_ROUNDS):
+        # Continues training the active model on the sales appended to the dataset since it was trained,
+        # instead of retraining from scratch. `since` is the position of the first new row and defaults to the row
+        # count recorded in the active artifact manifest.
+        # The encoders only gain the new labels, so existing codes never change, and both scalers are kept as they are,
+        # so the existing trees still see the inputs they were trained on. `rounds` trees are boosted on top of the
+        # saved model and the result is published as a new artifact version next to the old one.
+
+        artifacts = self.artifacts.current
+        if since is None:
+            since = self.artifacts.manifest().get("rows")
+            if since is None:
+                raise ValueError("The active artifacts do not record how many rows they were trained on; pass since.")
+
+        rows = np.arange(since, len(self.dataset))
+        if len(rows) == 0:
+            logger.info("No new sales to train on.")
+            return None
+
+        data = self.training_frame(rows)
+        encoders = {}
+        for field, column in [('suburb_encoder', 'Suburb'), ('city_encoder', 'City'), ('council_area_encoder', 'CouncilArea'), ('type_encoder', 'Type')]:
+            encoder = copy.deepcopy(getattr(artifacts, field))
+            added = encoder.extend(data[column])
+            if len(added):
+                logger.info("Added %d new %s labels: %s", len(added), column, ', '.join(added[:10]))
+            data[column] = encoder.transform(data[column])
+            encoders[field] = encoder
+
+        X_scaled = artifacts.scaler_X.transform(data.drop(columns=["Price"]))
+        y_scaled = artifacts.scaler_y.transform(data["Price"].values.reshape(-1, 1))
+
+        outside = int(np.sum(np.any((X_scaled < 0) | (X_scaled > 1), axis=1)))
+        if outside:
+            logger.warning("%d of %d new rows fall outside the range the scaler was fitted on; consider a full retrain soon.", outside, len(rows))
+
+        # Hold out part of the new rows to compare the old and the updated model on unseen recent sales
+        if len(rows) >= 10:
+            X_train, X_test, y_train, y_test = train_test_split(X_scaled, y_scaled, test_size=0.2, random_state=42)
+        else:
+            X_train, X_test, y_train, y_test = X_scaled, X_scaled, y_scaled, y_scaled
+
+        model = XGBRegressor(**artifacts.model.get_params())
+        model.set_params(n_estimators=rounds)
+        model.fit(X_train, y_train.ravel(), xgb_model=artifacts.model.get_booster())
+
+        mseBefore = mean_squared_error(y_test, artifacts.model.predict(X_test))
+        mseAfter = mean_squared_error(y_test, model.predict(X_test))
+        logger.info("Model updated with %d new sales and %d more trees. MSE on new sales: %s -> %s", len(rows), rounds, mseBefore, mseAfter)
 
+        updated = {"model": model, **encoders}
 
-    def preprocess(self, coordinates, distance, suburb, city, councilArea, postcode, type, bathrooms, bedrooms, cars, building_area, land_size):
+        # Assign the new rows to the existing clusters so that they can be recommended without refitting DBSCAN
+        clusterIndex = artifacts.cluster_index
+        if len(clusterIndex.labels) == since:
+            updated["cluster_index"] = clusterIndex.extend(artifacts.dbscan_scaler.transform(self.properties(rows)))
+        else:
+            logger.warning("Cluster labels do not match the dataset; run train_DBScan to include the new sales in recommendations.")
+
+        return self.artifacts.publish(updated, manifest={
+            "mode": "incremental",
+            "rows": len(self.dataset),
+            "new_rows": len(rows),
+            "rounds": rounds,
+            "mse_before": float(mseBefore),
+            "mse_after": float(mseAfter),
+        })
+
+    def preprocess(self, coordinates, distance, suburb, city, councilArea, postcode, type, bathrooms, bedrooms, cars, building_area, land_size, artifacts=None, date=None):
         # Preprocesses input data for prediction by encoding categorical variables, scaling numerical features, 
-        # and organizing data into a structured DataFrame for model input. Adjusts for specific property indices based on city.
+        # and organizing data into a structured DataFrame for model input.
+        # The cash rate and the city's property price indices are the ones in force on the sale date (today by default),
+        # clamped to the range the model was trained on.
+        # Uses the given ArtifactSet so that a whole request is served from one consistent set of artifacts.
+
+        if artifacts is None:
+            artifacts = self.artifacts.current
 
-        cashrate = 0.1
-        property_index_melbourne = [185.7, 144.4]
-        property_index_sydney = [218.7, 179.4]
         latitude = coordinates[0]
         longitude = coordinates[1]
 
-        councilArea = re.sub(r'\b(City|Council|of|city|Of)\b', '', councilArea).strip()
+        councilArea = re.sub(COUNCIL_AREA_WORDS, '', councilArea).strip()
         suburb = suburb.lower().replace(" ", "")
         city = city.lower().replace(" ", "")
         councilArea = councilArea.lower().replace(" ", "")
 
-        melbourne_tz = pytz.timezone('Australia/Melbourne')
-        date = datetime.now(melbourne_tz)
+        if date is None:
+            melbourne_tz = pytz.timezone('Australia/Melbourne')
+            date = datetime.now(melbourne_tz)
         daySold = date.day
         monthSold = date.month
         yearSold = date.year
+        cashrate, residential_index, attached_index = MacroFeatureStore.shared().features(city, date)
 
-        suburb_encoder = joblib.load('model/suburb_encoder.pkl')
-        city_encoder = joblib.load('model/city_encoder.pkl')
-        council_area_encoder = joblib.load('model/council_area_encoder.pkl')
-        type_encoder = joblib.load('model/type_encoder.pkl')
-        scaler_X = joblib.load('model/scaler_X.pkl')
+        suburb_encoder = artifacts.suburb_encoder
+        city_encoder = artifacts.city_encoder
+        council_area_encoder = artifacts.council_area_encoder
+        type_encoder = artifacts.type_encoder
+        scaler_X = artifacts.scaler_X
 
         suburb_encoded = suburb_encoder.transform([suburb])[0]
         city_encoded = city_encoder.transform([city])[0]
@@ -226,7 +364,7 @@ class MLmodel:
                 'Suburb': [suburb_encoded],
                 'Type': [type_encoded],
                 'Distance': [distance],
-                'Postcode': [postcode],
+                'Postcode': [postcode_feature(postcode, uses_log_postcode(scaler_X))],
                 'Bedroom': [bedrooms],
                 'Bathroom': [bathrooms],
                 'Car': [cars],
@@ -237,98 +375,247 @@ class MLmodel:
                 'Longtitude': [longitude],
                 'City': [city_encoded],
                 'CashRate': [cashrate],
-                'Residential Property Price Index': [property_index_melbourne[0]],  
-                'Attached Dwellings Price Index': [property_index_melbourne[1]],          
+                'Residential Property Price Index': [residential_index],
+                'Attached Dwellings Price Index': [attached_index],
                 'DaySold': [daySold],
                 'MonthSold': [monthSold],
                 'YearSold': [yearSold]
         }
 
         data = pd.DataFrame(data_dict)
-
-        if city_encoded == 1:  
-                data['Residential Property Price Index'] = property_index_sydney[0]
-                data['Attached Dwellings Price Index'] = property_index_sydney[1]
+        data[MACRO_COLUMNS] = clamp_macro(data[MACRO_COLUMNS].to_numpy(dtype=float), *macro_limits(scaler_X))
 
         data_scaled = scaler_X.transform(data)
 
         return data_scaled
     
-    def feature_importance(self, model, single_prediction):
+    def preprocess_many(self, rows, artifacts=None):
+        # Vectorized version of preprocess for many properties at once.
+        # `rows` is a DataFrame with latitude, longitude, distance, suburb, city, councilArea, postcode, type,
+        # bathrooms, bedrooms, cars, building_area and land_size columns, and optionally the sale `date` of each row
+        # (today where it is missing); returns the scaled feature matrix.
+        # The macro-economic columns of every row are looked up in one vectorized pass over the sale dates.
+
+        if artifacts is None:
+            artifacts = self.artifacts.current
+
+        councilArea = rows['councilArea'].str.replace(COUNCIL_AREA_WORDS, '', regex=True).str.strip()
+        suburb = rows['suburb'].str.lower().str.replace(" ", "", regex=False)
+        city = rows['city'].str.lower().str.replace(" ", "", regex=False)
+        councilArea = councilArea.str.lower().str.replace(" ", "", regex=False)
+
+        melbourne_tz = pytz.timezone('Australia/Melbourne')
+        today = datetime.now(melbourne_tz).date()
+        dates = pd.to_datetime(rows['date'], errors='coerce') if 'date' in rows else pd.Series(pd.NaT, index=rows.index)
+        dates = pd.DatetimeIndex(dates.fillna(pd.Timestamp(today)))
+        macro = MacroFeatureStore.shared().features_many(city.values, day_numbers(dates.values))
+
+        city_encoded = artifacts.city_encoder.transform(city.values)
+        postcode = pd.to_numeric(rows['postcode'], errors='coerce').values
+        if uses_log_postcode(artifacts.scaler_X):
+            postcode = np.log(postcode)
+
+        data = pd.DataFrame({
+                'Suburb': artifacts.suburb_encoder.transform(suburb.values),
+                'Type': artifacts.type_encoder.transform(rows['type'].values),
+                'Distance': rows['distance'].values,
+                'Postcode': postcode,
+                'Bedroom': rows['bedrooms'].values,
+                'Bathroom': rows['bathrooms'].values,
+                'Car': rows['cars'].values,
+                'Landsize': rows['land_size'].values,
+                'BuildingArea': rows['building_area'].values,
+                'CouncilArea': artifacts.council_area_encoder.transform(councilArea.values),
+                'Lattitude': rows['latitude'].values,
+                'Longtitude': rows['longitude'].values,
+                'City': city_encoded,
+                'CashRate': macro['CashRate'],
+                'Residential Property Price Index': macro['Residential Property Price Index'],
+                'Attached Dwellings Price Index': macro['Attached Dwellings Price Index'],
+                'DaySold': dates.day,
+                'MonthSold': dates.month,
+                'YearSold': dates.year
+        })
+        data[MACRO_COLUMNS] = clamp_macro(data[MACRO_COLUMNS].to_numpy(dtype=float), *macro_limits(artifacts.scaler_X))
+
+        return artifacts.scaler_X.transform(data)
+
+    def feature_importance(self, model, single_prediction, artifacts=None, method="native"):
         # Computes feature importance using SHAP (SHapley Additive exPlanations) for a single prediction.
         # Filters SHAP values for selected features and returns them in a structured DataFrame for interpretability.
+        # Uses the explainer cached with the loaded model; "native" is XGBoost's own TreeSHAP, "shap" uses the shap package.
 
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(single_prediction)
-        
-        filtered_feature_names = ['Type', 'Bedroom', 'Bathroom', 'Car', 'Landsize', 'BuildingArea', 'Latitude', 'Longitude']
-        filtered_shap_values = [shap_values[0][1], shap_values[0][4], shap_values[0][5], shap_values[0][6], shap_values[0][7], shap_values[0][8], shap_values[0][10], shap_values[0][11]]
+        if artifacts is None or artifacts.model is not model:
+            artifacts = self.artifacts.current
+        explainer = artifacts.explainer
 
-        shap_df = pd.DataFrame({
-                'Feature': filtered_feature_names,
-                'SHAP Value': np.abs(filtered_shap_values)
-        })
+        shap_values = explainer.contributions(single_prediction, method)
+        shap_df = explainer.to_frame(shap_values[0])
 
         return shap_df
         
 
-    def predict(self, address, type, bathrooms, bedrooms, cars, building_area, land_size):
+    def predict(self, address, type, bathrooms, bedrooms, cars, building_area, land_size, location=None, explain=True, date=None):
         # Predicts the price of a property based on input details like address, type, and features.
         # Preprocesses the input data, loads the trained XGBoost model, and predicts the property price.
         # Returns the predicted price, distance to the city center, and SHAP values for feature importance analysis.
+        # The address is geocoded once through Geography.resolve unless a GeocodeResult is passed in.
+        # With explain=False the SHAP values are skipped and None is returned in their place.
+        # `date` is the sale date the macro-economic inputs are looked up for; it defaults to today.
 
-        model = joblib.load('model/xgb_model.pkl')
+        artifacts = self.artifacts.current
+        model = artifacts.model
 
-        addressData = Geography()
+        if location is None:
+            location = Geography().resolve(address)
 
-        coordinates = addressData.get_coordinates(address)
-        suburb = addressData.get_suburb(address)
-        city = addressData.get_city(address)
-        councilArea = addressData.get_council_area(address)
-        postcode = addressData.get_postcode(address)
-        distance = addressData.get_distance(address)
+        if isinstance(location, str):
+            return location, location, location, location, location, location
 
-        type = type.lower().strip()
-        if type == 'house':
-            type = 'h'
-        elif type == 'unit' or type == 'apartment':
-            type = 'u'
-        elif type == 'townhouse':
-            type = 't'
-        else:
-            return "Invalid property type."
+        coordinates = location.coordinates
+        suburb = location.suburb
+        city = location.city
+        councilArea = location.council_area
+        postcode = location.postcode
+        distance = location.distance
 
-        print(city)
+        type = PROPERTY_TYPES.get(type.lower().strip())
+        if type is None:
+            return "Invalid property type."
 
-        if city.lower() == "melbourne":
-            centerCoordinates = addressData.get_melbourne_center_coordinates()
-        elif city.lower() == "sydney":
-            centerCoordinates = addressData.get_sydney_center_coordinates()
+        if location.center_coordinates is not None:
+            centerCoordinates = location.center_coordinates
         else:
             return "No results found for the given address.", "No results found for the given address.", "No results found for the given address.", "No results found for the given address.", "No results found for the given address.", "No results found for the given address."
 
 
-        data_scaled = self.preprocess(coordinates, distance, suburb, city, councilArea, postcode, type, bathrooms, bedrooms, cars, building_area, land_size)
-
-        prediction_scaled = model.predict(data_scaled)
-
-        scaler_y = joblib.load('model/scaler_y.pkl')
-        prediction_original_scale = scaler_y.inverse_transform(prediction_scaled.reshape(-1, 1))
-
-        median_price_cop = self.medianPrice.copy()
-        median_price_cop = median_price_cop.drop(columns='Unnamed: 0')
-
-        median_price_cop = pd.DataFrame(median_price_cop)
-
-        median_price_cop = median_price_cop.values.tolist()
-
-        shap_df = self.feature_importance(model, data_scaled)
-
-        return prediction_original_scale[0, 0], distance, coordinates, centerCoordinates, median_price_cop, shap_df
+        with stage("preprocess"):
+            data_scaled = artifacts.features.transform(coordinates, distance, suburb, city, councilArea, postcode, type, bathrooms, bedrooms, cars, building_area, land_size, date=date)
+
+        with stage("inference"):
+            prediction_scaled = np.array([artifacts.predictor.predict_one(data_scaled[0])])
+
+            scaler_y = artifacts.scaler_y
+            prediction_original_scale = scaler_y.inverse_transform(prediction_scaled.reshape(-1, 1))
+
+        shap_df = None
+        if explain:
+            with stage("explain"):
+                shap_df = self.feature_importance(model, data_scaled, artifacts=artifacts)
+
+        return prediction_original_scale[0, 0], distance, coordinates, centerCoordinates, self.medianPrices.series, shap_df
+
+    def prepare_many(self, rows, artifacts, geography=None):
+        # Geocodes and preprocesses many properties for predict_many and explain_many.
+        # `rows` is a list of dicts with the PredictionRequest fields (address, houseType, bathrooms, bedrooms,
+        # carpark, buildingArea, landsize, and optionally dateSold). Returns the per-row results with errors filled in, the indices and
+        # features of the valid rows, and their scaled feature matrix (None if no row is valid).
+
+        if geography is None:
+            geography = Geography()
+
+        results = [None] * len(rows)
+        locations = {}
+        features = []
+        valid = []
+
+        for i, row in enumerate(rows):
+            address = row['address']
+            if address not in locations:
+                with stage("geocode"):
+                    locations[address] = geography.resolve(address)
+            location = locations[address]
+
+            type = PROPERTY_TYPES.get(str(row['houseType']).lower().strip())
+            if isinstance(location, str):
+                results[i] = {"error": location}
+            elif location.center_coordinates is None:
+                results[i] = {"error": "No results found for the given address."}
+            elif type is None:
+                results[i] = {"error": "Invalid property type."}
+            else:
+                valid.append(i)
+                features.append({
+                    'latitude': location.latitude,
+                    'longitude': location.longitude,
+                    'distance': location.distance,
+                    'suburb': location.suburb,
+                    'city': location.city,
+                    'councilArea': location.council_area,
+                    'postcode': location.postcode,
+                    'type': type,
+                    'bathrooms': row['bathrooms'],
+                    'bedrooms': row['bedrooms'],
+                    'cars': row['carpark'],
+                    'building_area': row['buildingArea'],
+                    'land_size': row['landsize'],
+                    'date': row.get('dateSold')
+                })
+
+        with stage("preprocess"):
+            data_scaled = self.preprocess_many(pd.DataFrame(features), artifacts=artifacts) if valid else None
+
+        return results, valid, features, data_scaled
+
+    def predict_many(self, rows, artifacts=None, geography=None):
+        # Predicts the prices of many properties with one scaler transform and one XGBoost call.
+        # Returns one dict per row, holding either the prediction or an error.
+
+        if artifacts is None:
+            artifacts = self.artifacts.current
+
+        results, valid, features, data_scaled = self.prepare_many(rows, artifacts, geography)
+
+        if valid:
+            with stage("inference"):
+                prediction_scaled = artifacts.predictor.predict(data_scaled)
+            prices = artifacts.scaler_y.inverse_transform(prediction_scaled.reshape(-1, 1))[:, 0]
+
+            for i, price, feature in zip(valid, prices, features):
+                results[i] = {
+                    "predicted_price": round(float(price), 2),
+                    "distance_between_cities": round(feature['distance'], 2),
+                    "house_location": {"lat": feature['latitude'], "lng": feature['longitude']}
+                }
+
+        return results
+
+    def explain_many(self, rows, method="native", artifacts=None, geography=None):
+        # Computes the feature attributions of many properties with one explainer call.
+        # Returns one dict per row, holding either the SHAP values or an error.
+
+        if method not in ATTRIBUTION_METHODS:
+            raise ValueError(f"Unknown attribution method: {method}")
+        if artifacts is None:
+            artifacts = self.artifacts.current
+
+        results, valid, features, data_scaled = self.prepare_many(rows, artifacts, geography)
+
+        if valid:
+            with stage("explain"):
+                contributions = artifacts.explainer.contributions(data_scaled, method)
+            for i, rowContributions in zip(valid, contributions):
+                results[i] = {"shap_values": artifacts.explainer.to_frame(rowContributions).to_dict(orient="records")}
+
+        return results
 
 if __name__ == "__main__":
     # Instantiates the MLmodel class, trains the DBSCAN clustering model, and trains the XGBoost price prediction model.
-
-    model = MLmodel()
-    model.train_DBScan()
-    model.train()
\ No newline at end of file
+    # With --incremental only the sales added since the last training are used to update the existing model.
+    parser = argparse.ArgumentParser(description="Train the clustering and price prediction models")
+    parser.add_argument("--incremental", action="store_true", help="continue training the active model on new sales only")
+    parser.add_argument("--since", type=int, default=None, help="position of the first new row (defaults to the manifest row count)")
+    parser.add_argument("--rounds", type=int, default=INCREMENTAL_ROUNDS, help="trees to add in incremental mode")
+    parser.add_argument("--dataset", default=None, help="snapshot directory to train on (defaults to the dataset CSV's snapshot)")
+    args = parser.parse_args()
+
+    configure_logging("text")
+    model = MLmodel(dataset=args.dataset)
+    if args.incremental:
+        model.train_incremental(since=args.since, rounds=args.rounds)
+    elif args.dataset:
+        # The clusters index the rows the API recommends from, so only the price model is trained on another dataset
+        model.train()
+    else:
+        model.train_DBScan()
+        model.train()
\ No newline at end of file
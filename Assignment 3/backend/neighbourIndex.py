@@ -0,0 +1,73 @@
+import numpy as np
+
+from sklearn.neighbors import KDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    # Great-circle distance in km between one point and arrays of points
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+# KD-tree over the dataset's (Longitude, Latitude, Price) scaled with the DBSCAN scaler.
+# Answers "closest properties" queries with optional filters without copying or sorting the dataset.
+class NeighbourIndex:
+    def __init__(self, longitude, latitude, price, types, scaler):
+        # Keeps the raw columns as arrays for filtering and building results, and indexes the scaled matrix
+        self.longitude = np.asarray(longitude, dtype=float)
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.price = np.asarray(price, dtype=float)
+        self.types = np.asarray(types).astype(str)
+        self.min_ = np.asarray(scaler.min_, dtype=float)
+        self.scale_ = np.asarray(scaler.scale_, dtype=float)
+
+        self.scaled = self.transform(np.column_stack([self.longitude, self.latitude, self.price]))
+        self.tree = KDTree(self.scaled)
+
+    @classmethod
+    def from_dataframe(cls, data, scaler):
+        # Builds the index from the dataset as stored in origin_combined_data.csv
+        data = data.rename(columns={'Longtitude': 'Longitude', 'Lattitude': 'Latitude'})
+        return cls(data['Longitude'].values, data['Latitude'].values, data['Price'].values, data['Type'].values, scaler)
+
+    def __len__(self):
+        return len(self.scaled)
+
+    def transform(self, X):
+        # Applies the MinMaxScaler transform directly, without sklearn's per-call validation
+        return np.asarray(X, dtype=float) * self.scale_ + self.min_
+
+    def query(self, longitude, latitude, price, k=5, max_km=None, property_type=None, min_price=None, max_price=None):
+        # Returns (row indices, scaled distances) of the k nearest properties that pass the filters, closest first.
+        # max_km limits the great-circle distance from the input, property_type keeps one type ('h', 'u' or 't'),
+        # and min_price/max_price restrict the price band. With filters the search widens until k matches are found.
+        n = len(self.scaled)
+        if n == 0 or k <= 0:
+            return np.array([], dtype=int), np.array([])
+
+        point = self.transform([[longitude, latitude, price]])
+        filtered = max_km is not None or property_type is not None or min_price is not None or max_price is not None
+        want = min(n, k * 4 if filtered else k)
+
+        while True:
+            distances, indices = self.tree.query(point, k=want)
+            distances, indices = distances[0], indices[0]
+
+            if filtered:
+                mask = np.ones(len(indices), dtype=bool)
+                if property_type is not None:
+                    mask &= self.types[indices] == property_type
+                if min_price is not None:
+                    mask &= self.price[indices] >= min_price
+                if max_price is not None:
+                    mask &= self.price[indices] <= max_price
+                if max_km is not None:
+                    mask &= haversine_km(latitude, longitude, self.latitude[indices], self.longitude[indices]) <= max_km
+                distances, indices = distances[mask], indices[mask]
+
+            if len(indices) >= k or want == n:
+                return indices[:k], distances[:k]
+            want = min(n, want * 4)
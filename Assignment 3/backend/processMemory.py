@@ -0,0 +1,80 @@
+import os
+
+# Memory figures of a process, in bytes, read from /proc (Linux):
+#   rss    resident pages, including pages shared with other processes
+#   pss    proportional set size: shared pages divided by the number of processes sharing them
+#   uss    unique set size: pages only this process uses, i.e. what would be freed if it exited
+#   shared resident pages shared with at least one other process
+SMAPS_FIELDS = {
+    "Rss:": "rss",
+    "Pss:": "pss",
+    "Private_Clean:": "uss",
+    "Private_Dirty:": "uss",
+    "Shared_Clean:": "shared",
+    "Shared_Dirty:": "shared",
+}
+
+
+def memory_usage(pid="self"):
+    # Returns {"rss", "pss", "uss", "shared"} of a process, or None where /proc is not available.
+    # smaps_rollup (Linux 4.14+) is already summed; older kernels list every mapping in smaps.
+    usage = {"rss": 0, "pss": 0, "uss": 0, "shared": 0}
+    for name in ("smaps_rollup", "smaps"):
+        try:
+            with open(f"/proc/{pid}/{name}") as smaps:
+                for line in smaps:
+                    parts = line.split()
+                    field = SMAPS_FIELDS.get(parts[0])
+                    if field is not None:
+                        usage[field] += int(parts[1]) * 1024
+            return usage
+        except (OSError, IndexError, ValueError):
+            continue
+    return None
+
+
+def child_pids(pid):
+    # Returns the ids of the direct children of a process
+    children = []
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return children
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as stat:
+                # The command name in parentheses may contain spaces, so the fields are read after its closing bracket
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(name))
+    return sorted(children)
+
+
+def command_line(pid):
+    # Returns the command line of a process as one string
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+            return cmdline.read().replace(b"\0", b" ").decode(errors="replace").strip()
+    except OSError:
+        return ""
+
+
+def format_memory_table(usages):
+    # Formats {label: memory_usage(...)} as a table in MB, with a total row. The total PSS is the real footprint of
+    # the processes together, since shared pages are only counted once across them.
+    mb = 1024 * 1024
+    lines = [f"{'process':<16}{'RSS (MB)':>12}{'PSS (MB)':>12}{'USS (MB)':>12}{'shared (MB)':>14}"]
+    totals = {"rss": 0, "pss": 0, "uss": 0, "shared": 0}
+    for label, usage in usages.items():
+        if usage is None:
+            lines.append(f"{label:<16}{'-':>12}{'-':>12}{'-':>12}{'-':>14}")
+            continue
+        for field in totals:
+            totals[field] += usage[field]
+        lines.append(f"{label:<16}{usage['rss'] / mb:>12.1f}{usage['pss'] / mb:>12.1f}{usage['uss'] / mb:>12.1f}{usage['shared'] / mb:>14.1f}")
+    lines.append(f"{'total':<16}{totals['rss'] / mb:>12.1f}{totals['pss'] / mb:>12.1f}{totals['uss'] / mb:>12.1f}{totals['shared'] / mb:>14.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,64 @@
+import json
+import base64
+import numpy as np
+
+from dataclasses import dataclass, asdict, replace
+
+# Number of recommended properties returned per page, the largest page a client may ask for,
+# and the most properties a single streamed response returns
+RECOMMENDATION_PAGE_SIZE = 10
+RECOMMENDATION_MAX_PAGE_SIZE = 100
+RECOMMENDATION_STREAM_LIMIT = 1000
+
+
+# Position in the ranked recommendations of one property, encoded as an opaque cursor for the next page.
+# The cursor carries the input point and the artifact version, so later pages need no geocoding and are
+# rejected once a reload could have changed the clusters.
+@dataclass(frozen=True)
+class RecommendationQuery:
+    longitude: float
+    latitude: float
+    price: float
+    version: str
+    offset: int = 0
+
+    def encode(self):
+        payload = json.dumps(asdict(self), separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor):
+        # Raises ValueError for anything that is not a cursor produced by encode
+        try:
+            payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            fields = json.loads(payload)
+            query = cls(
+                longitude=float(fields["longitude"]),
+                latitude=float(fields["latitude"]),
+                price=float(fields["price"]),
+                version=str(fields["version"]),
+                offset=int(fields["offset"]),
+            )
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError("Invalid recommendations cursor.") from e
+        if query.offset < 0:
+            raise ValueError("Invalid recommendations cursor.")
+        return query
+
+    def advance(self, count):
+        return replace(self, offset=self.offset + count)
+
+
+def rank(scaled, point, rows, stop):
+    # Returns the first `stop` of `rows` ordered by their distance to `point` in the scaled
+    # (Longitude, Latitude, Price) space, so both location and price count.
+    # Only rows up to the stop-th distance are sorted, and ties are broken by row position, which keeps the order
+    # identical across pages.
+    distances = np.sqrt(np.sum((scaled[rows] - point) ** 2, axis=1))
+    if stop < len(rows):
+        kth = np.partition(distances, stop - 1)[stop - 1]
+        candidates = np.flatnonzero(distances <= kth)
+    else:
+        candidates = np.arange(len(rows))
+    order = candidates[np.lexsort((rows[candidates], distances[candidates]))]
+    return rows[order[:stop]]
@@ -0,0 +1,96 @@
+import os
+import asyncio
+import hashlib
+import json
+
+from collections import OrderedDict
+
+# Memory and entry caps of the response cache per worker process, overridable by environment
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+
+# LRU cache of serialized API responses with single-flight coalescing.
+# A prediction only depends on the normalized request, the Melbourne date and the model version, so identical
+# requests on the same day share one response, and concurrent identical requests wait for a single computation.
+class ResponseCache:
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.maxBytes = max_bytes
+        self.maxEntries = max_entries
+        self.entries = OrderedDict()
+        self.totalBytes = 0
+        self.inflight = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    @staticmethod
+    def key(fields, *context):
+        # Hashes the request fields plus any context (date, model version, flags) into a cache key.
+        # Strings are lower-cased with commas and repeated whitespace removed, and numbers are compared as floats.
+        normalized = {}
+        for name, value in fields.items():
+            if isinstance(value, str):
+                value = " ".join(value.replace(",", " ").lower().split())
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = float(value)
+            normalized[name] = value
+        payload = json.dumps([normalized, list(context)], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, key):
+        # Returns the cached body for a key, or None
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        return body
+
+    def set(self, key, body):
+        # Stores a serialized body and evicts the least recently used entries beyond the memory or entry cap
+        if len(body) > self.maxBytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.totalBytes -= len(previous)
+        self.entries[key] = body
+        self.totalBytes += len(body)
+        while self.totalBytes > self.maxBytes or len(self.entries) > self.maxEntries:
+            _, evicted = self.entries.popitem(last=False)
+            self.totalBytes -= len(evicted)
+            self.counters["evictions"] += 1
+
+    async def get_or_compute(self, key, compute):
+        # Returns the cached body, waits for an identical computation already in flight, or runs compute().
+        # compute is an async callable returning bytes; exceptions are passed to every waiter and not cached.
+        body = self.get(key)
+        if body is not None:
+            self.counters["hits"] += 1
+            return body
+
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        self.counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            body = await compute()
+            self.set(key, body)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Marks the exception as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self.inflight[key]
+
+    def clear(self):
+        self.entries.clear()
+        self.totalBytes = 0
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats["entries"] = len(self.entries)
+        stats["bytes"] = self.totalBytes
+        return stats
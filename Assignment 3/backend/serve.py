@@ -0,0 +1,138 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+import uvicorn
+
+from processMemory import memory_usage, format_memory_table
+from macroFeatures import MacroFeatureStore
+
+logger = logging.getLogger("serve")
+
+# Pre-fork multi-worker server. The API module, and with it the dataset, model artifacts, neighbour index,
+# gazetteer and macro-economic series, is loaded once in this process, which then forks the workers. The workers
+# share those pages copy-on-write instead of each building a private copy, so adding a worker costs little more
+# than its own per-request memory. `uvicorn --workers` cannot do this, because it starts every worker from scratch.
+# Linux/macOS only (os.fork). Run from the backend directory: python serve.py --workers 4
+
+SERVE_HOST = "0.0.0.0"
+SERVE_PORT = 8000
+SERVE_WORKERS = 2
+MEMORY_REPORT_DELAY = 5.0  # Seconds after start before the first per-worker memory report
+
+
+def bind_socket(host, port):
+    # Opens the listening socket in the parent so that every worker accepts on the same port
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    # Imports the API and loads everything it serves from, then freezes the loaded objects so that the garbage
+    # collector never writes to their pages and un-shares them in the workers
+    import main
+    main.model.load_artifacts()
+    main.geography.gazetteer
+    MacroFeatureStore.shared()
+    gc.collect()
+    gc.freeze()
+    return main
+
+
+def run_worker(api, sock, workers):
+    # Body of a forked worker: serves the preloaded app on the shared socket until told to stop
+    from geographyProcess import Geography, TokenBucket, NOMINATIM_RATE
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Each worker has its own rate limiter, so they split the allowed Nominatim rate between them
+    Geography.rateLimiter = TokenBucket(rate=NOMINATIM_RATE / workers)
+
+    config = uvicorn.Config(api.app, log_config=None, access_log=False, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(api, sock, workers):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(api, sock, workers)
+        except BaseException:
+            logger.exception("Worker %d crashed.", os.getpid())
+            status = 1
+        finally:
+            os._exit(status)
+    logger.info("Started worker %d.", pid)
+    return pid
+
+
+def report_memory(pids):
+    # Logs the memory of the parent and each worker; the workers' USS is what each one costs on its own
+    usages = {"parent": memory_usage()}
+    usages.update({f"worker {pid}": memory_usage(pid) for pid in pids})
+    logger.info("Memory per process\n%s", format_memory_table(usages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server sharing the loaded model between workers")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--memory-report-interval", type=float, default=0.0,
+                        help="seconds between per-worker memory reports after the first one (0: only report once)")
+    args = parser.parse_args()
+
+    api = preload()
+    sock = bind_socket(args.host, args.port)
+    pids = {fork_worker(api, sock, args.workers) for _ in range(args.workers)}
+    logger.info("Serving on %s:%d with %d workers.", args.host, args.port, args.workers)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    nextReport = time.monotonic() + MEMORY_REPORT_DELAY
+    while pids:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if nextReport is not None and time.monotonic() >= nextReport:
+                report_memory(sorted(pids))
+                nextReport = time.monotonic() + args.memory_report_interval if args.memory_report_interval > 0 else None
+            time.sleep(0.2)
+            continue
+
+        pids.discard(pid)
+        if not stopping:
+            # Replace a worker that died; the new one is forked from the same preloaded state
+            logger.warning("Worker %d exited with status %d; starting a new one.", pid, os.waitstatus_to_exitcode(status))
+            pids.add(fork_worker(api, sock, args.workers))
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
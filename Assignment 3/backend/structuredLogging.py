@@ -0,0 +1,40 @@
+import os
+import json
+import logging
+
+from datetime import datetime, timezone
+
+# Log level and output format ("json" for one JSON object per line, "text" for plain lines), overridable by environment
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT")
+
+# Attributes every LogRecord has; anything else was passed through `extra` and becomes a field of the JSON line
+STANDARD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "taskName"}
+
+
+# Formats records as single-line JSON objects with the message, level, logger and any `extra` fields
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in record.__dict__.items():
+            if name not in STANDARD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(default_format="json", level=LOG_LEVEL):
+    # Sends every logger to stderr in the chosen format. The API logs JSON by default and the command line tools text;
+    # LOG_FORMAT overrides both.
+    handler = logging.StreamHandler()
+    if (LOG_FORMAT or default_format) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
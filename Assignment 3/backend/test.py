@@ -1,13 +1,15 @@
 from model import MLmodel
+from geographyProcess import Geography
 import pandas as pd
 
 address = '155 Macquarie Street, Sydney, NSW 2000'
 
 model = MLmodel()
 
+location = Geography().resolve(address)
 
-prediction, distance, coordinates, centerCoor, median_price, shap_df = model.predict(address , type = 'unit', bathrooms = 1, bedrooms = 1, cars = 0, building_area = 70, land_size = 100)
-recommend = model.recommend_nearby_houses(address, prediction)
+prediction, distance, coordinates, centerCoor, median_price, shap_df = model.predict(address , type = 'unit', bathrooms = 1, bedrooms = 1, cars = 0, building_area = 70, land_size = 100, location = location)
+recommend = model.recommend_nearby_houses(address, prediction, location = location)
 
 print('---------------------------------')
 print(f"The predicted price is", prediction)
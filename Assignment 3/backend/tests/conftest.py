@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules are imported by their flat names, as when running from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
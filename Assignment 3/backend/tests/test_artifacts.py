@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from sklearn.cluster import DBSCAN
+from sklearn.preprocessing import MinMaxScaler
+from artifacts import ArtifactRegistry
+from custom_encoder import CustomLabelEncoder
+
+
+def train_artifacts(seed):
+    # One complete artifact set on random data; the seed changes the model's predictions
+    rng = np.random.default_rng(seed)
+    X = rng.random((200, 19))
+    y = rng.random(200)
+    points = rng.random((100, 3))
+    return {
+        "model": xgb.XGBRegressor(n_estimators=5, max_depth=3).fit(X, y),
+        "suburb_encoder": CustomLabelEncoder().fit(['abbotsford', 'richmond']),
+        "city_encoder": CustomLabelEncoder().fit(['melbourne', 'sydney']),
+        "council_area_encoder": CustomLabelEncoder().fit(['yarra']),
+        "type_encoder": CustomLabelEncoder().fit(['h', 't', 'u']),
+        "scaler_X": MinMaxScaler().fit(X),
+        "scaler_y": MinMaxScaler().fit(y.reshape(-1, 1)),
+        "dbscan": DBSCAN(eps=0.2, min_samples=3).fit(points),
+        "dbscan_scaler": MinMaxScaler().fit(points),
+    }, X[:5]
+
+
+def test_publish_activate_reload_and_rollback(tmp_path):
+    registry = ArtifactRegistry(str(tmp_path))
+    first, X = train_artifacts(0)
+    firstVersion = registry.publish(first, manifest={"mode": "full", "rows": 200})
+    firstSet = registry.load()
+    assert registry.versions() == [firstVersion]
+    assert registry.reload_if_changed() is False
+
+    # An incremental version only writes the model; the rest is linked from the active version
+    second, _ = train_artifacts(1)
+    secondVersion = registry.publish({"model": second["model"]}, manifest={"mode": "incremental"})
+    assert registry.versions() == [firstVersion, secondVersion]
+    manifest = registry.manifest()
+    assert manifest["parent"] == firstVersion and manifest["rows"] == 200 and manifest["updated"] == ["model"]
+
+    assert registry.reload_if_changed() is True
+    secondSet = registry.current
+    assert secondSet.version != firstSet.version
+    np.testing.assert_allclose(secondSet.predictor.predict(X), second["model"].predict(X), rtol=1e-6)
+    assert secondSet.scaler_X.data_max_.tolist() == first["scaler_X"].data_max_.tolist()
+
+    # Rolling back makes the first version's files active again
+    registry.activate(firstVersion)
+    assert registry.reload_if_changed() is True
+    assert registry.current.version == firstSet.version
+    np.testing.assert_allclose(registry.current.predictor.predict(X), first["model"].predict(X), rtol=1e-6)
+
+    # The set a request already holds is not affected by later reloads
+    np.testing.assert_allclose(secondSet.predictor.predict(X), second["model"].predict(X), rtol=1e-6)
+
+
+def test_publish_without_activating_and_unknown_artifacts(tmp_path):
+    registry = ArtifactRegistry(str(tmp_path))
+    first, _ = train_artifacts(0)
+    firstVersion = registry.publish(first)
+    registry.load()
+
+    staged = registry.publish({"model": train_artifacts(1)[0]["model"]}, activate=False)
+    assert staged in registry.versions()
+    assert registry.manifest()["version"] == firstVersion
+    assert registry.reload_if_changed() is False
+
+    with pytest.raises(ValueError):
+        registry.publish({"model_v2": first["model"]})
+    with pytest.raises(ValueError):
+        registry.activate("no-such-version")
@@ -0,0 +1,51 @@
+import numpy as np
+
+from sklearn.cluster import DBSCAN
+from clusterIndex import ClusterIndex
+
+
+def fitted_dbscan():
+    # Two well separated blobs and a few isolated points, in the scaled (Longitude, Latitude, Price) space
+    rng = np.random.default_rng(1)
+    X = np.concatenate([
+        [0.2, 0.2, 0.2] + rng.normal(scale=0.01, size=(200, 3)),
+        [0.7, 0.7, 0.5] + rng.normal(scale=0.01, size=(200, 3)),
+        [[0.9, 0.1, 0.9], [0.1, 0.9, 0.9], [0.5, 0.5, 0.95]],
+    ])
+    return X, DBSCAN(eps=0.03, min_samples=5).fit(X)
+
+
+def test_predict_reproduces_dbscan_labels():
+    X, dbscan = fitted_dbscan()
+    index = ClusterIndex.from_dbscan(dbscan)
+
+    assert set(dbscan.labels_) == {-1, 0, 1}
+    np.testing.assert_array_equal(index.predict(X), dbscan.labels_)
+
+
+def test_new_points_join_the_cluster_of_a_core_sample_within_eps():
+    X, dbscan = fitted_dbscan()
+    index = ClusterIndex.from_dbscan(dbscan)
+    core = dbscan.components_[0]
+    label = dbscan.labels_[dbscan.core_sample_indices_[0]]
+
+    near = core + [index.eps * 0.9, 0, 0]
+    far = [0.5, 0.1, 0.1]
+    assert index.predict([near, far]).tolist() == [label, -1]
+
+    # Refitting DBSCAN with the new point gives it the same cluster
+    refit = DBSCAN(eps=dbscan.eps, min_samples=dbscan.min_samples).fit(np.vstack([X, near]))
+    same = refit.labels_[dbscan.core_sample_indices_[0]]
+    assert refit.labels_[-1] == same
+
+
+def test_extend_and_members():
+    X, dbscan = fitted_dbscan()
+    index = ClusterIndex.from_dbscan(dbscan)
+    extended = index.extend(X[:3])
+
+    assert len(extended.labels) == len(X) + 3
+    np.testing.assert_array_equal(extended.labels[-3:], dbscan.labels_[:3])
+    label = dbscan.labels_[0]
+    assert set(extended.members(label)) == set(np.flatnonzero(dbscan.labels_ == label)) | {len(X), len(X) + 1, len(X) + 2}
+    assert len(index.members(99)) == 0
@@ -0,0 +1,18 @@
+import numpy as np
+
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score
+from clusterTraining import ClusterTrainer
+
+
+def test_sampled_fit_labels_every_row_like_a_full_fit():
+    rng = np.random.default_rng(0)
+    centers = np.array([[0.2, 0.2, 0.2], [0.8, 0.8, 0.2], [0.5, 0.2, 0.8]])
+    X = np.concatenate([center + rng.normal(scale=0.02, size=(3000, 3)) for center in centers])
+
+    dbscan, clusterIndex, report = ClusterTrainer(X, fit_memory_mb=1).fit(eps=0.05, min_samples=5)
+
+    assert report["fit_rows"] < len(X)
+    assert len(clusterIndex.labels) == len(X)
+    full = DBSCAN(eps=0.05, min_samples=5).fit(X).labels_
+    assert adjusted_rand_score(full, clusterIndex.labels) > 0.99
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from sklearn.preprocessing import LabelEncoder
+from custom_encoder import CustomLabelEncoder
+
+
+def loop_transform(encoder, y):
+    # The per-label transform CustomLabelEncoder used before it was vectorized
+    unseen_label = len(encoder.classes_) - 1
+    transformed = []
+    for label in y:
+        if label in encoder.classes_:
+            transformed.append(LabelEncoder.transform(encoder, [label])[0])
+        else:
+            transformed.append(unseen_label)
+    return np.array(transformed)
+
+
+def test_vectorized_transform_matches_the_loop():
+    rng = np.random.default_rng(3)
+    suburbs = np.array(['abbotsford', 'brunswick', 'carlton', 'docklands', 'richmond', 'southbank', 'zetland'])
+    encoder = CustomLabelEncoder().fit(rng.choice(suburbs, 500))
+
+    # Known labels, unseen ones sorting before, between and after them, and '<unknown>' itself
+    labels = np.concatenate([rng.choice(suburbs, 200), ['aaa', 'collingwood', 'zzz', '', '<unknown>']])
+    np.testing.assert_array_equal(encoder.transform(labels), loop_transform(encoder, labels))
+    np.testing.assert_array_equal(encoder.transform(pd.Series(labels)), loop_transform(encoder, labels))
+    np.testing.assert_array_equal(encoder.transform(['collingwood']), [encoder.unknown_code])
+
+
+def test_extended_encoder_keeps_existing_codes():
+    encoder = CustomLabelEncoder().fit(['carlton', 'richmond'])
+    before = encoder.transform(['carlton', 'richmond', 'brunswick'])
+
+    assert encoder.extend(['brunswick', 'carlton']).tolist() == ['brunswick']
+    assert encoder.transform(['carlton', 'richmond']).tolist() == before[:2].tolist()
+    assert encoder.transform(['brunswick'])[0] == len(encoder.classes_) - 1
+    assert encoder.transform(['fitzroy'])[0] == encoder.unknown_code == before[2]
@@ -0,0 +1,30 @@
+import math
+import numpy as np
+import pandas as pd
+
+from datasetIngest import DatasetIngest, TRAINING_COLUMNS
+from datasetSnapshot import DatasetSnapshot
+
+
+def write_combined(path):
+    # Three sales in the layout of dataset/origin_combined_data.csv, the last one a duplicate of the first
+    rows = [
+        ['abbotsford', 'h', 1035000.0, 2.5, math.log(3067), 2, 1, 0, 156.0, 79.0, 'yarra', -37.8079, 144.9934, 'melbourne', 1.5, 129.4, 145.8, 4, 2, 2016],
+        ['sydney', 'u', 950000.0, 0.3, math.log(2000), 1, 1, 1, 0.0, 60.0, 'sydney', -33.8688, 151.2093, 'sydney', 0.1, 218.7, 179.4, 31, 12, 2021],
+        ['abbotsford', 'h', 1035000.0, 2.5, math.log(3067), 2, 1, 0, 156.0, 79.0, 'yarra', -37.8079, 144.9934, 'melbourne', 1.5, 129.4, 145.8, 4, 2, 2016],
+    ]
+    pd.DataFrame(rows, columns=TRAINING_COLUMNS).to_csv(path)
+    return pd.read_csv(path, index_col=0)
+
+
+def test_postcode_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = write_combined("combined.csv")
+
+    snapshot, reports = DatasetIngest(output="training_data", chunk_rows=2, workers=1).run(["combined.csv"])
+
+    assert reports[0]["written"] == 2 and reports[0]["duplicates"] == 1
+    written = DatasetSnapshot.open("training_data").frame()
+    assert written["Postcode"].dtype == np.float64
+    np.testing.assert_array_equal(written["Postcode"].to_numpy(), source["Postcode"].to_numpy()[:2])
+    assert list(written.columns) == TRAINING_COLUMNS
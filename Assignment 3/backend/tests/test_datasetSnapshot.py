@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from datasetSnapshot import DatasetSnapshot, SnapshotWriter
+from custom_encoder import CustomLabelEncoder
+
+
+def sales():
+    # The last category in sorted order is 'yarra', which a wrapped-around code -1 would decode to
+    return pd.DataFrame({
+        'Suburb': ['abbotsford', 'richmond', 'abbotsford'],
+        'CouncilArea': ['yarra', None, 'melbourne'],
+        'Price': [1035000.0, 900000.0, 1200000.0],
+    })
+
+
+def test_built_snapshot_keeps_missing_categories_missing(tmp_path):
+    sales().to_csv(tmp_path / "sales.csv")
+    snapshot = DatasetSnapshot.build(str(tmp_path / "sales.csv"), str(tmp_path / "snapshot"))
+
+    assert snapshot.decode('CouncilArea').tolist() == ['yarra', None, 'melbourne']
+    assert snapshot.decode('CouncilArea', rows=np.array([1, 2])).tolist() == [None, 'melbourne']
+    assert snapshot.frame()['CouncilArea'].isna().tolist() == [False, True, False]
+
+
+def test_written_snapshot_keeps_missing_categories_missing(tmp_path):
+    writer = SnapshotWriter(str(tmp_path / "snapshot"), {'Suburb': "category", 'CouncilArea': "category", 'Price': np.float64})
+    writer.append(sales().iloc[:2])
+    writer.append(sales().iloc[2:])
+    snapshot = writer.close()
+
+    assert snapshot.decode('CouncilArea').tolist() == ['yarra', None, 'melbourne']
+    assert snapshot.decode('Suburb').tolist() == ['abbotsford', 'richmond', 'abbotsford']
+
+
+def test_missing_labels_are_encoded_as_unknown():
+    encoder = CustomLabelEncoder()
+    codes = encoder.fit_transform(np.array(['yarra', None, 'melbourne'], dtype=object))
+
+    assert encoder.classes_.tolist() == ['melbourne', 'yarra', '<unknown>']
+    assert codes.tolist() == [1, encoder.unknown_code, 0]
+    assert len(encoder.extend(np.array([None, 'boroondara'], dtype=object))) == 1
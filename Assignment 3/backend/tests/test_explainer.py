@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from explainer import Explainer, ATTRIBUTION_FEATURES
+
+
+def train_model():
+    # A small regressor on 19 scaled features, the width of the price model's input
+    rng = np.random.default_rng(4)
+    X = rng.random((400, 19))
+    y = X[:, 1] * 0.5 + X[:, 4] ** 2 - X[:, 10] * X[:, 11] + rng.normal(scale=0.01, size=400)
+    model = xgb.XGBRegressor(n_estimators=40, max_depth=4, learning_rate=0.2)
+    model.fit(X, y)
+    return model, X
+
+
+def test_native_contributions_match_shap():
+    model, X = train_model()
+    explainer = Explainer(model)
+
+    native = explainer.contributions(X[:50], "native")
+    assert native.shape == (50, 19)
+    np.testing.assert_allclose(native, explainer.contributions(X[:50], "shap"), atol=1e-5)
+    assert explainer.max_difference(X[:50]) < 1e-5
+
+    # The contributions plus the bias add up to the prediction
+    bias = model.get_booster().predict(xgb.DMatrix(X[:50]), pred_contribs=True)[:, -1]
+    np.testing.assert_allclose(native.sum(axis=1) + bias, model.predict(X[:50]), atol=1e-5)
+
+
+def test_frame_and_unknown_method():
+    model, X = train_model()
+    explainer = Explainer(model)
+
+    frame = explainer.to_frame(explainer.contributions(X[:1])[0])
+    assert frame['Feature'].tolist() == ATTRIBUTION_FEATURES
+    assert (frame['SHAP Value'] >= 0).all()
+    with pytest.raises(ValueError):
+        explainer.contributions(X[:1], "lime")
@@ -0,0 +1,54 @@
+import math
+import warnings
+import numpy as np
+import pandas as pd
+
+from types import SimpleNamespace
+from datetime import date as Date
+from sklearn.preprocessing import MinMaxScaler
+from custom_encoder import CustomLabelEncoder
+from featurePipeline import FeaturePipeline, FEATURE_COLUMNS, dataset_postcodes
+from macroFeatures import MacroFeatureStore
+from model import MLmodel
+
+
+def fitted_artifacts():
+    # Encoders and scaler_X fitted on two sales in the dataset layout, with Postcode stored as log(postcode)
+    data = pd.DataFrame({
+        'Suburb': ['abbotsford', 'sydney'], 'Type': ['h', 'u'], 'Distance': [2.5, 0.3],
+        'Postcode': [math.log(3067), math.log(2000)], 'Bedroom': [2, 1], 'Bathroom': [1, 1], 'Car': [0, 1],
+        'Landsize': [156.0, 0.0], 'BuildingArea': [79.0, 60.0], 'CouncilArea': ['yarra', 'sydney'],
+        'Lattitude': [-37.8079, -33.8688], 'Longtitude': [144.9934, 151.2093], 'City': ['melbourne', 'sydney'],
+        'CashRate': [0.1, 2.0], 'Residential Property Price Index': [127.3, 218.7],
+        'Attached Dwellings Price Index': [114.0, 179.4], 'DaySold': [1, 31], 'MonthSold': [1, 12], 'YearSold': [2016, 2021],
+    }, columns=FEATURE_COLUMNS)
+    artifacts = {}
+    for field, column in [('suburb_encoder', 'Suburb'), ('type_encoder', 'Type'), ('council_area_encoder', 'CouncilArea'), ('city_encoder', 'City')]:
+        artifacts[field] = CustomLabelEncoder()
+        data[column] = artifacts[field].fit_transform(data[column])
+    artifacts['scaler_X'] = MinMaxScaler().fit(data)
+    return SimpleNamespace(**artifacts)
+
+
+def test_transform_matches_preprocess(monkeypatch):
+    monkeypatch.setattr(MacroFeatureStore, "_shared", MacroFeatureStore.fallback())
+    artifacts = fitted_artifacts()
+    pipeline = FeaturePipeline.from_artifacts(artifacts)
+    model = MLmodel.__new__(MLmodel)
+
+    cases = [
+        ((-37.8079, 144.9934), 2.5, "Abbotsford", "Melbourne", "City of Yarra", "3067", 'h', 1, 2, 0, 79.0, 156.0),
+        ((-33.8688, 151.2093), 0.3, "Sydney", "Sydney", "Council of the City of Sydney", "2000", 'u', 1, 1, 1, 60.0, 0.0),
+        # Unknown suburb, council area, city and type all fall back to the '<unknown>' codes
+        ((-27.4698, 153.0251), 1.0, "Fortitude Valley", "Brisbane", "Brisbane City Council", "4006", 'x', 2, 3, 2, 120.0, 300.0),
+    ]
+    for case in cases:
+        for day in (Date(2016, 3, 4), Date(2021, 12, 31)):
+            expected = model.preprocess(*case, artifacts=artifacts, date=day)
+            np.testing.assert_array_equal(pipeline.transform(*case, date=day), expected)
+
+
+def test_dataset_postcodes_only_exponentiates_logs():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert dataset_postcodes([math.log(3000), 3000.0, 800.0]) == ["3000", "3000", "0800"]
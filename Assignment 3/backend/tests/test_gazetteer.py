@@ -0,0 +1,39 @@
+import math
+import pandas as pd
+
+from gazetteer import Gazetteer
+from neighbourIndex import haversine_km
+
+
+def write_dataset(path):
+    # Two suburbs in the dataset layout, with Postcode stored as log(postcode) like dataset/origin_combined_data.csv
+    pd.DataFrame({
+        'Suburb': ['melbourne', 'melbourne', 'sydney'],
+        'Postcode': [math.log(3000), math.log(3000), math.log(2000)],
+        'CouncilArea': ['melbourne', 'melbourne', 'sydney'],
+        'City': ['melbourne', 'melbourne', 'sydney'],
+        'Lattitude': [-37.8136, -37.8140, -33.8688],
+        'Longtitude': [144.9631, 144.9635, 151.2093],
+    }).to_csv(path)
+
+
+def test_lookup_returns_real_postcodes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dataset("data.csv")
+    gazetteer = Gazetteer.from_sources("data.csv", sydney_path=None)
+
+    entry = gazetteer.lookup(-37.8137, 144.9632)
+    assert entry.postcode == "3000"
+    assert len(entry.postcode) == 4 and entry.postcode.isdigit()
+    assert gazetteer.lookup(-33.8689, 151.2094).postcode == "2000"
+    assert gazetteer.postcode("Melbourne") == "3000"
+    assert gazetteer.suburbs_in("2000") == ["sydney"]
+
+
+def test_cbd_distance_uses_the_shared_haversine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dataset("data.csv")
+    gazetteer = Gazetteer.from_sources("data.csv", sydney_path=None)
+
+    entry = gazetteer.lookup(-37.8140, 144.9635)
+    assert entry.distance == haversine_km(-37.8136, 144.9631, -37.8140, 144.9635)
@@ -0,0 +1,107 @@
+import time
+import asyncio
+import threading
+
+import geographyProcess
+from geographyProcess import TokenBucket, GeocodeCache
+
+
+def test_sync_and_async_callers_share_one_rate():
+    bucket = TokenBucket(rate=20.0)
+    start = time.monotonic()
+
+    threads = [threading.Thread(target=bucket.acquire_sync) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+
+    async def acquire_all():
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+    asyncio.run(acquire_all())
+    for thread in threads:
+        thread.join()
+
+    # The first token is available at once and the other nine are spaced 1/20 s apart
+    assert time.monotonic() - start >= 9 / 20.0 - 0.01
+
+
+# Wraps the SQLite connection of a cache to record the threads it is used from
+class RecordingConnection:
+    def __init__(self, db):
+        self.db = db
+        self.threads = set()
+
+    def execute(self, *args):
+        self.threads.add(threading.get_ident())
+        return self.db.execute(*args)
+
+    def commit(self):
+        self.threads.add(threading.get_ident())
+        return self.db.commit()
+
+
+def test_async_lookups_keep_sqlite_off_the_event_loop(tmp_path):
+    cache = GeocodeCache(path=str(tmp_path / "cache.sqlite"))
+    cache.db = RecordingConnection(cache.db)
+
+    async def lookups():
+        loop = threading.get_ident()
+        await cache.set_async("forward:1 main st", [{"lat": "-37.8"}])
+        cache.memory.clear()
+        found, value = await cache.get_async("forward:1 main st")  # Disk hit, promoted into memory
+        assert found and value == [{"lat": "-37.8"}]
+        assert await cache.get_async("forward:1 main st") == (True, value)  # Memory hit
+        assert await cache.get_async("forward:missing") == (False, None)
+        return loop
+
+    loop = asyncio.run(lookups())
+    assert cache.db.threads and loop not in cache.db.threads
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+
+# Replaces time.time in the cache module with a clock the test moves forward
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(geographyProcess.time, "time", lambda: self.now)
+
+
+def test_entries_expire_after_their_ttl(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    cache = GeocodeCache(path=str(tmp_path / "cache.sqlite"), ttl=100, negative_ttl=10)
+    cache.set("forward:found", [{"lat": "-37.8"}])
+    cache.set("forward:nowhere", [], negative=True)
+
+    clock.now += 11
+    assert cache.get("forward:found") == (True, [{"lat": "-37.8"}])
+    assert cache.get("forward:nowhere") == (False, None)  # Negative answers expire first
+
+    clock.now += 90
+    assert cache.get("forward:found") == (False, None)
+    assert cache.stats()["disk_entries"] == 0  # Expired rows are removed from disk too
+
+
+def test_lru_evictions_fall_through_to_sqlite(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    cache = GeocodeCache(path=str(tmp_path / "cache.sqlite"), memory_entries=2, disk_entries=3)
+    for i in range(3):
+        clock.now += 1
+        cache.set(f"reverse:{i}", f"{i} Main St")
+    cache.get("reverse:1")  # Memory now holds 2, then 1 as the most recently used
+
+    assert "reverse:0" not in cache.memory and list(cache.memory) == ["reverse:2", "reverse:1"]
+    assert cache.get("reverse:0") == (True, "0 Main St")  # Answered from SQLite and promoted
+    assert list(cache.memory) == ["reverse:1", "reverse:0"]
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1 and stats["disk_hits"] == 1
+
+    # The disk tier drops its least recently read or written row beyond its limit. Memory hits do not touch the
+    # disk, so that is reverse:1: it was written before reverse:2, and reverse:0 has been read back from disk since.
+    clock.now += 1
+    cache.set("reverse:3", "3 Main St")
+    cache.memory.clear()
+    assert cache.get("reverse:1") == (False, None)
+    assert cache.get("reverse:2") == (True, "2 Main St")
+
+    # Entries survive a restart through the SQLite file
+    assert GeocodeCache(path=str(tmp_path / "cache.sqlite")).get("reverse:3") == (True, "3 Main St")
@@ -0,0 +1,33 @@
+import numpy as np
+import xgboost as xgb
+
+from inference import BoosterPredictor
+
+
+def train_model():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 6)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    y = np.nan_to_num(X[:, 0]) * 3 - np.nan_to_num(X[:, 1]) ** 2 + rng.normal(scale=0.1, size=500)
+    model = xgb.XGBRegressor(n_estimators=30, max_depth=4, learning_rate=0.3)
+    model.fit(X, y)
+    return model, X
+
+
+def test_flat_forest_matches_inplace_predict():
+    model, X = train_model()
+    predictor = BoosterPredictor(model, flatten=True)
+
+    expected = model.get_booster().inplace_predict(X)
+    np.testing.assert_allclose(predictor.predict(X), expected, rtol=1e-5, atol=1e-4)
+    assert np.isclose(predictor.predict_one(X[0]), expected[0], rtol=1e-5, atol=1e-4)
+
+
+def test_thread_count_is_pinned_on_a_private_copy():
+    model, _ = train_model()
+    model.get_booster().set_param({"nthread": 4})
+    predictor = BoosterPredictor(model, nthread=1)
+
+    assert predictor.booster is not model.get_booster()
+    assert '"nthread":"4"' in model.get_booster().save_config().replace(" ", "")
+    assert '"nthread":"1"' in predictor.booster.save_config().replace(" ", "")
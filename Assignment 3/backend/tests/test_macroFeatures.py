@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from datetime import date as Date
+from macroFeatures import MacroFeatureStore, day_numbers
+
+
+def write_series(tmp_path):
+    # A cash rate file and an ABS-style property index file with two quarters for Melbourne
+    cashRate = tmp_path / "cash_rate.csv"
+    pd.DataFrame({"date": ["01/01/2016", "04/05/2016"], "value": [2.0, 1.75]}).to_csv(cashRate, index=False)
+
+    propertyIndex = tmp_path / "property_index.csv"
+    propertyIndex.write_text(
+        ",Residential Property Price Index ;  Melbourne ;,Attached Dwellings Price Index ;  Melbourne ;\n"
+        "Unit,Index Numbers,Index Numbers\n"
+        "Series ID,A1,A2\n"
+        "Mar-2016,120.0,110.0\n"
+        "Jun-2016,125.0,112.0\n"
+    )
+    return MacroFeatureStore.load(str(cashRate), str(propertyIndex))
+
+
+def test_cash_rate_changes_on_its_decision_day(tmp_path):
+    store = write_series(tmp_path)
+    assert store.features("melbourne", Date(2016, 5, 3))[0] == 2.0
+    assert store.features("melbourne", Date(2016, 5, 4))[0] == 1.75
+    # Before the first observation the first value applies
+    assert store.features("melbourne", Date(2015, 6, 1))[0] == 2.0
+
+
+def test_quarterly_index_covers_its_own_quarter(tmp_path):
+    store = write_series(tmp_path)
+    # The Jun-2016 value applies from 1 April, and the last value is held after its quarter ends
+    cases = {
+        Date(2016, 3, 1): 120.0,
+        Date(2016, 3, 31): 120.0,
+        Date(2016, 4, 1): 125.0,
+        Date(2016, 6, 1): 125.0,
+        Date(2016, 6, 30): 125.0,
+        Date(2016, 9, 1): 125.0,
+    }
+    for day, expected in cases.items():
+        assert store.features("melbourne", day)[1] == expected, day
+
+    # The vectorized lookup agrees, and cities without their own series use Melbourne's
+    many = store.features_many(np.array(["sydney"] * len(cases)), day_numbers(np.array(list(cases), dtype="datetime64[D]")))
+    assert many["Residential Property Price Index"].tolist() == list(cases.values())
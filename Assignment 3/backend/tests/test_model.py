@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from model import MLmodel
+from addressIndex import AddressIndex
+from datasetSnapshot import DatasetSnapshot
+from geographyProcess import Geography, GeocodeCache
+
+
+def test_unindexed_recommendations_are_never_reverse_geocoded(monkeypatch):
+    def request(kind, url):
+        raise AssertionError("Nominatim was queried while serving recommendations")
+    monkeypatch.setattr(Geography, "request", staticmethod(request))
+
+    geography = Geography(cache=GeocodeCache(path=None))
+    geography.cache.set(GeocodeCache.reverse_key(-37.81, 144.96), "1 Cached Street")
+    model = MLmodel.__new__(MLmodel)
+    model.addressIndex = AddressIndex({AddressIndex.key(-37.80, 144.95): "2 Indexed Street"})
+
+    houses = pd.DataFrame({'Latitude': [-37.80, -37.81, -37.82], 'Longitude': [144.95, 144.96, 144.97]})
+    assert model.lookup_addresses(houses, geography) == ["2 Indexed Street", "1 Cached Street", None]
+
+
+def test_training_frame_keeps_missing_council_areas_missing(tmp_path):
+    pd.DataFrame({
+        'Suburb': ['abbotsford', 'richmond'],
+        'CouncilArea': ['yarra city', None],
+        'Price': [1035000.0, 900000.0],
+    }).to_csv(tmp_path / "sales.csv")
+    model = MLmodel.__new__(MLmodel)
+    model.dataset = DatasetSnapshot.build(str(tmp_path / "sales.csv"), str(tmp_path / "snapshot"))
+
+    councilAreas = model.training_frame()['CouncilArea']
+    assert councilAreas[0] == 'yarra ' and pd.isna(councilAreas[1])
+    assert model.training_frame(np.array([1]))['CouncilArea'].isna().all()
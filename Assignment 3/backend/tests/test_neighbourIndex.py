@@ -0,0 +1,46 @@
+import numpy as np
+
+from sklearn.preprocessing import MinMaxScaler
+from neighbourIndex import NeighbourIndex, haversine_km
+
+
+def build_index(n=2000):
+    rng = np.random.default_rng(2)
+    longitude = rng.uniform(144.5, 145.5, n)
+    latitude = rng.uniform(-38.2, -37.5, n)
+    price = rng.uniform(300000, 3000000, n)
+    types = rng.choice(['h', 'u', 't'], n)
+    scaler = MinMaxScaler().fit(np.column_stack([longitude, latitude, price]))
+    return NeighbourIndex(longitude, latitude, price, types, scaler)
+
+
+def brute_force(index, longitude, latitude, price, k, mask=None):
+    # Ranks every row by its scaled distance to the query, keeping the rows that pass the mask
+    point = index.transform([[longitude, latitude, price]])[0]
+    distances = np.sqrt(((index.scaled - point) ** 2).sum(axis=1))
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(len(index))
+    rows = rows[np.argsort(distances[rows], kind='stable')][:k]
+    return rows, distances[rows]
+
+
+def test_query_matches_brute_force():
+    index = build_index()
+    for longitude, latitude, price in [(145.0, -37.8, 1200000.0), (144.6, -38.1, 350000.0), (146.0, -37.0, 5000000.0)]:
+        rows, distances = index.query(longitude, latitude, price, k=25)
+        expectedRows, expectedDistances = brute_force(index, longitude, latitude, price, 25)
+        np.testing.assert_array_equal(rows, expectedRows)
+        np.testing.assert_allclose(distances, expectedDistances)
+
+
+def test_filtered_query_matches_brute_force():
+    index = build_index()
+    longitude, latitude, price = 145.0, -37.8, 1200000.0
+    mask = (index.types == 'u') & (index.price >= 800000) & (index.price <= 1500000)
+    mask &= haversine_km(latitude, longitude, index.latitude, index.longitude) <= 20
+
+    rows, _ = index.query(longitude, latitude, price, k=10, max_km=20, property_type='u', min_price=800000, max_price=1500000)
+    np.testing.assert_array_equal(rows, brute_force(index, longitude, latitude, price, 10, mask)[0])
+
+    # Asking for more matches than exist returns all of them
+    rows, _ = index.query(longitude, latitude, price, k=len(index), max_km=20, property_type='u', min_price=800000, max_price=1500000)
+    np.testing.assert_array_equal(rows, brute_force(index, longitude, latitude, price, len(index), mask)[0])
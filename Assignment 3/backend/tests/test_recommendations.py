@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from types import SimpleNamespace
+from sklearn.cluster import DBSCAN
+from sklearn.preprocessing import MinMaxScaler
+from recommendations import RecommendationQuery, rank
+from clusterIndex import ClusterIndex
+from addressIndex import AddressIndex
+from datasetSnapshot import DatasetSnapshot
+from geographyProcess import Geography, GeocodeCache
+from model import MLmodel
+
+
+def test_cursor_round_trip():
+    query = RecommendationQuery(144.9631, -37.8136, 1234567.89, "abc123", offset=20)
+    cursor = query.encode()
+    assert RecommendationQuery.decode(cursor) == query
+    assert RecommendationQuery.decode(cursor).advance(10) == RecommendationQuery(144.9631, -37.8136, 1234567.89, "abc123", offset=30)
+
+    for cursor in ["", "not a cursor", RecommendationQuery(1.0, 2.0, 3.0, "v", offset=-1).encode(), cursor[:-4]]:
+        with pytest.raises(ValueError):
+            RecommendationQuery.decode(cursor)
+
+
+def test_rank_pages_are_stable_with_ties():
+    rng = np.random.default_rng(5)
+    scaled = np.round(rng.random((500, 3)), 1)  # Coarse values, so many rows are at the same distance
+    rows = rng.permutation(500)[:300]
+    point = np.array([0.5, 0.5, 0.5])
+
+    full = rank(scaled, point, rows, len(rows))
+    pages = [rank(scaled, point, rows, min(offset + 7, len(rows)))[offset:] for offset in range(0, len(rows), 7)]
+    np.testing.assert_array_equal(np.concatenate(pages), full)
+    assert sorted(full.tolist()) == sorted(rows.tolist())
+
+
+def recommendation_model(tmp_path):
+    # An MLmodel over a small dataset snapshot with two price/location clusters, without trained price artifacts
+    rng = np.random.default_rng(6)
+    n = 300
+    centers = np.where(np.arange(n)[:, None] < 150, [144.95, -37.80, 800000.0], [145.05, -37.90, 1600000.0])
+    data = pd.DataFrame({
+        'Longtitude': centers[:, 0] + rng.normal(scale=0.002, size=n),
+        'Lattitude': centers[:, 1] + rng.normal(scale=0.002, size=n),
+        'Price': np.round(centers[:, 2] + rng.normal(scale=20000, size=n), -4),
+        'Type': rng.choice(['h', 'u', 't'], n),
+    })
+    data.to_csv(tmp_path / "sales.csv")
+
+    model = MLmodel.__new__(MLmodel)
+    model.dataset = DatasetSnapshot.build(str(tmp_path / "sales.csv"), str(tmp_path / "snapshot"))
+    model.originData = model.dataset.frame()
+    model.addressIndex = AddressIndex()
+    model.neighbourIndex = None
+
+    X = data[['Longtitude', 'Lattitude', 'Price']].to_numpy()
+    scaler = MinMaxScaler().fit(X)
+    dbscan = DBSCAN(eps=0.1, min_samples=5).fit(scaler.transform(X))
+    artifacts = SimpleNamespace(version="v1", dbscan_scaler=scaler, cluster_index=ClusterIndex.from_dbscan(dbscan))
+    return model, artifacts, Geography(cache=GeocodeCache(path=None))
+
+
+@pytest.mark.parametrize("point", [(144.95, -37.80, 800000.0), (144.50, -37.20, 5000000.0)], ids=["cluster", "noise"])
+def test_pages_have_no_duplicates_or_gaps(tmp_path, point):
+    model, artifacts, geography = recommendation_model(tmp_path)
+    query = RecommendationQuery(*point, artifacts.version)
+
+    first, _, total = model.recommendation_page(query, 1000, artifacts, geography)
+    seen = []
+    pages = 0
+    while query is not None:
+        page, query, pageTotal = model.recommendation_page(RecommendationQuery.decode(query.encode()), 7, artifacts, geography)
+        assert pageTotal == total and len(page) <= 7
+        seen.extend(page.index.tolist())
+        pages += 1
+
+    assert seen == first.index.tolist()
+    assert len(set(seen)) == len(seen) == min(total, 1000)
+    assert pages == -(-len(seen) // 7)
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+
+from datetime import date as Date
+from responseCache import ResponseCache
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    cache = ResponseCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return b'{"predicted_price":1}'
+
+    async def requests():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(10)))
+
+    bodies = asyncio.run(requests())
+    assert calls == 1
+    assert bodies == [b'{"predicted_price":1}'] * 10
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 9
+
+    asyncio.run(requests())
+    assert calls == 1 and cache.stats()["hits"] == 10
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = ResponseCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("geocoding failed")
+
+    async def requests():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(requests()))
+    assert calls == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("key", compute))
+    assert calls == 2
+
+
+def test_key_changes_with_version_and_macro_signature():
+    fields = {"address": "1 Main St, Richmond", "bathrooms": 2}
+    today = Date(2026, 10, 18)
+    key = ResponseCache.key(fields, True, today, "v1", ((10, 1), (20, 2)))
+
+    assert ResponseCache.key({"address": "1 main st  richmond", "bathrooms": 2.0}, True, today, "v1", ((10, 1), (20, 2))) == key
+    assert ResponseCache.key(fields, True, today, "v2", ((10, 1), (20, 2))) != key
+    assert ResponseCache.key(fields, True, today, "v1", ((10, 1), (20, 3))) != key
+    assert ResponseCache.key(fields, True, today, "v1", None) != key